@@ -0,0 +1,106 @@
+from collections import deque
+
+class AhoCorasick:
+    def __init__(self, words: list[str]):
+        '''
+        A multi-word matcher that finds every given word inside a piece of text in a single pass,
+        instead of searching the text once per word.\n
+
+        words: The words to search for
+        '''
+        # Each state is a node in a trie of the words. goto[state] maps a character to the next state.
+        self.goto: list[dict[str, int]] = [{}]
+
+        # The word that ends at each state (or None)
+        self.output: list[str | None] = [None]
+
+        # Where to continue from when the next character doesn't match
+        self.fail: list[int] = [0]
+
+        # The closest state reachable through fail links that ends a word (or 0 if there is none)
+        self.output_link: list[int] = [0]
+
+        for word in words:
+            self.add_word(word)
+        self.build_links()
+
+    def add_word(self, word: str):
+        '''
+        Adds a word to the trie. build_links must be called after all the words are added.
+        '''
+        if (word == ""):
+            return
+
+        state = 0
+        for character in word:
+            next_state = self.goto[state].get(character)
+            if (next_state == None):
+                next_state = len(self.goto)
+                self.goto[state][character] = next_state
+                self.goto.append({})
+                self.output.append(None)
+                self.fail.append(0)
+                self.output_link.append(0)
+            state = next_state
+
+        self.output[state] = word
+
+    def build_links(self):
+        '''
+        Fills in the fail and output links with a breadth first walk of the trie.
+        '''
+        states = deque(self.goto[0].values())
+        while (len(states) > 0):
+            state = states.popleft()
+            for character, next_state in self.goto[state].items():
+                states.append(next_state)
+
+                # Follow the fail links of the parent until a state can take this character
+                fail_state = self.fail[state]
+                while (fail_state != 0 and not character in self.goto[fail_state]):
+                    fail_state = self.fail[fail_state]
+                fail_state = self.goto[fail_state].get(character, 0)
+
+                self.fail[next_state] = fail_state
+                if (self.output[fail_state] != None):
+                    self.output_link[next_state] = fail_state
+                else:
+                    self.output_link[next_state] = self.output_link[fail_state]
+
+    def step(self, state: int, character: str) -> int:
+        '''
+        Returns the state reached by reading the given character from the given state.
+        '''
+        while (state != 0 and not character in self.goto[state]):
+            state = self.fail[state]
+        return self.goto[state].get(character, 0)
+
+    def find_all(self, text: str) -> list[tuple[int, str]]:
+        '''
+        Finds every word that appears anywhere in the given text.\n
+
+        Returns: A list of (offset, word) for every match, in the order the matches end
+        '''
+        matches = []
+        state = 0
+        for i in range(len(text)):
+            state = self.step(state, text[i])
+
+            match_state = state if self.output[state] != None else self.output_link[state]
+            while (match_state != 0):
+                word = self.output[match_state]
+                matches.append((i + 1 - len(word), word))
+                match_state = self.output_link[match_state]
+
+        return matches
+
+    def contains_any(self, text: str) -> bool:
+        '''
+        Returns whether or not any of the words appear anywhere in the given text
+        '''
+        state = 0
+        for character in text:
+            state = self.step(state, character)
+            if (self.output[state] != None or self.output_link[state] != 0):
+                return True
+        return False
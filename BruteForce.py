@@ -1,30 +1,261 @@
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 import time
 from WordDictionary import WordDictionary
+from vigenere import get_cipher_funcs
+from WorkerPool import WorkerPool, default_backend, get_parallelism
+from TopResults import TopResults
+from Checkpoint import Checkpoint
+from ResultWriter import ResultWriter
+from IncrementalDecoder import IncrementalDecoder
+from LazyEvaluator import LazyEvaluator
+from Progress import Progress, format_duration
+from StageProfiler import StageProfiler
+from functools import partial
 import os
-import threading
+from typing import TYPE_CHECKING
+
+# numpy (and the modules built on it) is only needed for batching and top results, so it is imported where those are used
+if TYPE_CHECKING:
+    from QuadgramScorer import QuadgramScorer
+
+# How many chunks of the keyspace to aim for per worker. More chunks keeps the workers
+# evenly loaded, at the cost of a little more queue traffic.
+CHUNKS_PER_WORKER = 32
+
+class WorkerState:
+    def __init__(self, output_1, output_2, output_3, worker_index: int = 0, progress: Progress | None = None):
+        '''
+        Everything a single worker keeps while it tests keys.\n
+
+        output_1, output_2, output_3: The worker's open output files, see BruteForce.check_solution.
+            These are None if the worker streams its results instead\n
+        worker_index: The index of the worker, for its progress counters\n
+        progress: The Progress of the run, or None if progress isn't being tracked
+        '''
+        self.output_1 = output_1
+        self.output_2 = output_2
+        self.output_3 = output_3
+        self.worker_index = worker_index
+        self.progress = progress
+
+        # Keys tested (or skipped), hits found and keys skipped since the counts were last added to progress
+        self.keys_tested = 0
+        self.hits_found = 0
+        self.keys_skipped = 0
+
+        # Keys waiting to be batch decoded, or None if batching is off
+        self.key_buffer: list[str] | None = None
+
+        # The best scoring keys found so far, or None if every valid key is logged instead
+        self.top_results: TopResults | None = None
+
+        # Decodes sibling keys a column at a time, or None if incremental decoding is off
+        self.decoder: IncrementalDecoder | None = None
+
+        # Checks keys a word at a time on each encoded text, or None if lazy evaluation is off
+        self.evaluators: list[LazyEvaluator] | None = None
+
+        # The (text_index, key, decoded_text, is_valid) results waiting to be streamed, or None if they are written to the output files
+        self.hits: list[tuple[int, str, str, tuple[bool, bool, bool]]] | None = None
+
+    def get_outputs(self) -> list:
+        '''
+        Returns the worker's three output files.
+        '''
+        return [self.output_1, self.output_2, self.output_3]
+
+    def flush(self):
+        '''
+        Flushes all three output files, and adds the worker's counts to progress.
+        '''
+        for output in self.get_outputs():
+            if (output != None):
+                output.flush()
+
+        if (self.progress != None):
+            self.progress.add(self.worker_index, self.keys_tested, self.hits_found, self.keys_skipped)
+        self.keys_tested = 0
+        self.hits_found = 0
+        self.keys_skipped = 0
 
 class BruteForce:
-    def __init__(self, encoded_text: str, cipher_func: Callable[[str, str], str], num_digits, word_dict: WordDictionary = WordDictionary(),num_cores: int = 16, separators: tuple[bool, bool, bool] = (4, 6, 12), starting_key_part: list[str]=[""]):
+    def __init__(self, encoded_text: str | list[str], cipher_func: Callable[[str, str], str] | str, num_digits, word_dict: WordDictionary | None = None,num_cores: int = 16, separators: tuple[bool, bool, bool] = (4, 6, 12), starting_key_part: list[str]=[""], batch_size: int = 0, backend: str | None = None, prune_word_index: int | None = None, top_results: int = 0, scorer: 'QuadgramScorer | None' = None, incremental: bool = False, lazy: bool = False, shard: tuple[int, int] | None = None, progress_interval: float = 10.0, progress_path: str | None = None, profile_sample_rate: int = 0):
         '''
         Will try and solve the given cipher using keys generated by trying every possible combination of characters.\n
+        Keys that decode exactly the same as a shorter key that is also tested are skipped: keys made of a shorter key
+        repeated (ex: "abab" is the same as "ab"), and keys longer than the number of letters in the text.\n
 
-        encoded_text: The encoded string of text\n
-        cipher_func: The cipher function to call that encodes a given string\n
+        encoded_text: The encoded string of text, or a list of encoded texts thought to share a key. Every key is then
+            tested on every text in the same pass through the keyspace, see iter_batch_solutions. Pruning only looks at
+            the first text, and incremental and top_results only work with a single text\n
+        cipher_func: The cipher function to call that decodes a given string, or the name of a cipher in vigenere.CIPHER_FUNCS\n
         num_digits: The number of digits to test. The higher this value, the longer the test will take.\n
 
-        word_dict: The associated WordDictionary\n
-        num_cores: The number of separate threads to run at once\n
+        word_dict: The associated WordDictionary. By default this is a new WordDictionary of word_lists/words.csv\n
+        num_cores: The number of separate workers to run at once\n
         separators: Breakpoints for how long the valid word in the decoded text must be to be logged (each section will be in a different file)\n
-        starting_key_part: If given, this will add the given string to the beginning of each key
+        starting_key_part: If given, this will add the given string to the beginning of each key\n
+        batch_size: If above 0, keys will be decoded in blocks of this size using the batch version of cipher_func
+            (only used if cipher_func has a batch version in vigenere_batch.BATCH_DECODERS and every encoded text is ascii)\n
+        backend: How to run the workers, one of WorkerPool.BACKENDS ("thread", "process" or "free_threaded").
+            By default this is the fastest one available.\n
+        prune_word_index: If given, the encoded word at this index (counting only runs of alphabet characters) is assumed to
+            decode to a valid word, and any key prefix that makes that impossible has all of its longer keys skipped\n
+        top_results: If above 0, every key is scored by how much its decoded text looks like real language, and only
+            this many of the best are kept (in top_results.txt) instead of logging every key with a valid word\n
+        scorer: The QuadgramScorer used for top_results. By default this is built from the words in word_dict\n
+        incremental: If True, keys that only differ in their last letter share the decoding of every other letter, and
+            only the words touching the last letter's column are checked again. Only works for ciphers where each letter of
+            the key shifts its own column of the text, and isn't used with batch_size or top_results\n
+        lazy: If True, each key is checked by decoding the encoded words one at a time from longest to shortest, stopping at
+            the first valid one, and the full decoded text is only built for keys that are logged (see LazyEvaluator). Only works
+            for ciphers where each letter of the key shifts its own column of the text, and isn't used with batch_size,
+            top_results or incremental\n
+        shard: If given as (shard_index, num_shards), only that shard of the keyspace is tested (see get_shard_range), so one
+            search can be split across machines that each run their own shard with the same settings\n
+        progress_interval: How many seconds between progress reports (keys tested, keys per second and time left)
+            while solving, or 0 to only report at the end\n
+        progress_path: If given, every progress report is also added to this file as a line of json\n
+        profile_sample_rate: If above 0, the time spent decoding keys, checking them for valid words and logging them is
+            profiled by timing one in every this many calls, and a breakdown is printed at the end of solving
         '''
-        self.encoded_text = encoded_text
-        self.cipher_func = cipher_func
+        self.encoded_texts = [encoded_text] if isinstance(encoded_text, str) else list(encoded_text)
+        self.encoded_text = self.encoded_texts[0]
+        self.cipher_func = get_cipher_funcs(cipher_func)[1] if isinstance(cipher_func, str) else cipher_func
         self.num_digits = num_digits
-        self.word_dict = word_dict
+        self.word_dict = word_dict if word_dict != None else WordDictionary()
         self.num_cores = num_cores
         self.separators = separators
         self.starting_key_part = starting_key_part
+        self.batch_size = batch_size
+
+        # Only alphabet characters move the key along, so no key letter past this many is ever used
+        self.text_length = max(sum(1 for character in text.lower() if character in self.word_dict.ALPHABET) for text in self.encoded_texts)
+
+        # Every starting key part along with the longest key made from it, see get_redundant_letter
+        self.key_start_lengths = [(key_start, len(key_start) + self.get_num_digits(key_start)) for key_start in starting_key_part]
+        self.backend = backend if backend != None else default_backend()
+
+        # The batch decode function to use, or None if keys should be decoded one at a time.
+        # Non ascii text is always decoded one key at a time, see vigenere_batch.is_batchable
+        self.batch_cipher_func = None
+        self.prepared_texts = None
+        if (batch_size > 0 and all(text.isascii() for text in self.encoded_texts)):
+            from vigenere_batch import BATCH_DECODERS, PreparedText
+            self.batch_cipher_func = BATCH_DECODERS.get(self.cipher_func)
+            self.prepared_texts = [PreparedText(text) for text in self.encoded_texts] if self.batch_cipher_func != None else None
+        self.prepared_text = self.prepared_texts[0] if self.batch_cipher_func != None else None
+
+        self.top_results = top_results
+        self.incremental = incremental
+        self.lazy = lazy
+        self.shard = shard
+        self.scorer = scorer
+        if (top_results > 0 and scorer == None):
+            from QuadgramScorer import QuadgramScorer
+            self.scorer = QuadgramScorer.from_words(self.word_dict.all_words, self.word_dict.ALPHABET)
+
+        self.progress_interval = progress_interval
+        self.progress_path = progress_path
+
+        # The Progress of the current run, set while solving
+        self.progress: Progress | None = None
+
+        # The StageProfiler of the current run, set while solving if profiling is on
+        self.profile_sample_rate = profile_sample_rate
+        self.profiler: StageProfiler | None = None
+
+        # The encoded word used for pruning, and how many letters come before it in the text
+        self.prune_word = None
+        self.prune_offset = 0
+        if (prune_word_index != None):
+            self.prune_word, self.prune_offset = self.get_encoded_word(prune_word_index)
+            if (not self.word_dict.is_packed()):
+                self.word_dict.get_trie()
+
+        if (len(self.encoded_texts) > 1 and (incremental or top_results > 0)):
+            raise ValueError("incremental and top_results only work with a single encoded text")
+
+    def get_encoded_word(self, word_index: int) -> tuple[str, int]:
+        '''
+        Finds an encoded word of the first encoded text, counting only runs of alphabet characters as words.\n
+
+        Returns: (word, offset) where offset is the number of alphabet characters before the word
+        '''
+        words = []
+        offsets = []
+        letter_count = 0
+        current_word = ""
+        for character in self.encoded_text.lower() + " ":
+            if (character in self.word_dict.ALPHABET):
+                current_word += character
+                letter_count += 1
+                continue
+
+            if (current_word != ""):
+                words.append(current_word)
+                offsets.append(letter_count - len(current_word))
+            current_word = ""
+
+        return (words[word_index], offsets[word_index])
+
+    def get_num_digits(self, key_start: str) -> int:
+        '''
+        Returns how many letters are added to the given starting key part. This is num_digits, unless that
+        would make keys longer than the text, which decode the same as the key cut down to the length of the text.
+        '''
+        return max(0, min(self.num_digits, self.text_length - len(key_start)))
+
+    def get_redundant_letter(self, text: str) -> str | None:
+        '''
+        Finds the letter that makes text + letter a shorter key repeated, where that shorter key is also in the
+        keyspace (so it decodes exactly the same and has already been tested). At most one letter can do this.\n
+
+        Returns: The letter, or None if every letter makes a key worth testing
+        '''
+        key_length = len(text) + 1
+        for key_start, max_length in self.key_start_lengths:
+            if (not text.startswith(key_start)):
+                continue
+
+            # The shorter key must also start with the starting key part, and not be too long for the keyspace
+            for root_length in range(max(len(key_start), 1), min(max_length, key_length // 2) + 1):
+                if (key_length % root_length == 0 and text[root_length:] == text[:len(text) - root_length]):
+                    return text[len(text) - root_length]
+
+        return None
+
+    def is_redundant_key(self, key: str) -> bool:
+        '''
+        Returns whether or not the key decodes the same as a shorter key in the keyspace, see get_redundant_letter.
+        '''
+        if (self.word_dict.is_promising_key(key) == 0):
+            return False
+        return self.get_redundant_letter(key[:-1]) == key[-1]
+
+    def count_keys_past_text_length(self) -> int:
+        '''
+        Returns how many keys of the full keyspace are skipped for being longer than the text.
+        '''
+        return sum(self.count_keys(self.num_digits) - self.count_keys(self.get_num_digits(key_start)) for key_start in self.starting_key_part)
+
+    def can_extend(self, key: str) -> bool:
+        '''
+        Returns whether or not any key starting with the given key could decode the prune word
+        into a valid word. Always True if pruning is off.
+        '''
+        if (self.prune_word == None):
+            return True
+
+        # Every longer key shares this key's letters, so they fix the start of the prune word's plaintext
+        num_fixed = min(len(key) - self.prune_offset, len(self.prune_word))
+        if (num_fixed <= 0):
+            return True
+
+        key_part = key[self.prune_offset:self.prune_offset + num_fixed]
+        plain_start = self.cipher_func(self.prune_word[:num_fixed], key_part)
+        return self.word_dict.has_prefix(plain_start, len(self.prune_word))
     
     
     def contains_valid_word_by_size(self, text: str) -> tuple[bool, bool, bool]:
@@ -34,12 +265,13 @@ class BruteForce:
         '''
         out1 = False
         out2 = False
+        word_set = self.word_dict.word_set
         text_ar = text.replace('.', '').split(' ')
         for word in text_ar:
             if (len(word) < self.separators[0]):
                 continue
 
-            if (self.word_dict.is_word(word)):
+            if (word in word_set):
                 out1 = True
 
                 if (len(word) > self.separators[1]):
@@ -66,137 +298,707 @@ class BruteForce:
         if (is_valid[2]):
             file_3.write(output_text)
 
-    def get_estimated_run_time(self):
-        startTime = time.time_ns()
+    def report_solution(self, key: str, decoded_text: str, is_valid: tuple[bool, bool, bool], worker: WorkerState, text_index: int = 0):
+        '''
+        Logs a tested key in the worker's output files, or keeps it to be streamed if the worker streams its results.\n
+
+        text_index: Which of the encoded texts the key decoded
+        '''
+        if (is_valid[0]):
+            worker.hits_found += 1
+
+        if (worker.hits == None):
+            self.check_solution(key, decoded_text, worker.output_1, worker.output_2, worker.output_3, is_valid)
+        elif (is_valid[0]):
+            worker.hits.append((text_index, key, decoded_text, is_valid))
+
+    def get_estimated_run_time(self, chunks: list[tuple[str, int]] | None = None) -> float:
+        '''
+        Estimates how many nanoseconds testing the given chunks (by default the whole keyspace) will take, by timing
+        a few keys and scaling up to the size of the keyspace. Pruning can make the real run much shorter.
+        '''
+        if (chunks == None):
+            chunks = self.get_chunks()
+
+        start_time = time.time_ns()
 
         # Run a couple checks and see how long that takes
-        for i in range(26):
-            word = self.starting_key_part[0] + self.word_dict.ALPHABET[i]
-            decoded_text = self.cipher_func(self.encoded_text, word)
-            self.word_dict.contains_valid_word(decoded_text)
+        for letter in self.word_dict.ALPHABET:
+            word = self.starting_key_part[0] + letter
+            for encoded_text in self.encoded_texts:
+                decoded_text = self.cipher_func(encoded_text, word)
+                self.contains_valid_word_by_size(decoded_text)
 
-        endTime = time.time_ns()
+        time_per_key = (time.time_ns() - start_time) / len(self.word_dict.ALPHABET)
 
-        timeMult = ((len(self.starting_key_part) * len(self.word_dict.ALPHABET)) ** self.num_digits) / self.num_cores / 2
+        return time_per_key * self.get_keyspace_size(chunks) / get_parallelism(self.num_cores, self.backend)
+    
+    def print_estimated_run_time(self, chunks: list[tuple[str, int]] | None = None):
+        '''
+        Prints how long testing the given chunks (by default the whole keyspace) is estimated to take.
+        '''
+        estimated_time_ns = self.get_estimated_run_time(chunks)
+        print(f'Estimated Completion Time: {format_duration(estimated_time_ns / 1_000_000_000)}')
 
-        return (endTime - startTime) * timeMult
     
-    def print_estimated_run_time(self):
-        estimated_time_ns = self.get_estimated_run_time()
-        
-        seconds = estimated_time_ns // 1_000_000_000
-        minutes = seconds // 60
-        hours = minutes // 60
+    def test_key(self, key: str, worker: WorkerState):
+        '''
+        Tests a single key on every encoded text, logging the result if it is valid (or keeping it if it scores well enough,
+        when top_results is on).\n
+        If batching is on, the key is added to the worker's key_buffer and tested once there are batch_size keys waiting.
+        '''
+        if (worker.key_buffer != None):
+            worker.key_buffer.append(key)
+            if (len(worker.key_buffer) >= self.batch_size):
+                self.test_key_batch(worker.key_buffer, worker)
+                worker.key_buffer.clear()
+            return
 
-        seconds %= 60
-        minutes %= 60
-        hours %= 60
+        worker.keys_tested += 1
+        if (worker.top_results != None):
+            decoded_text = self.cipher_func(self.encoded_text, key)
+            worker.top_results.add(self.scorer.score(decoded_text), key, decoded_text)
+            return
 
-        print(f'TEST: {estimated_time_ns}')
-        print(f'Estimated Completion Time: {hours}h {minutes}m {seconds}s')
+        # Only build the full decoded text for keys that are going to be logged
+        if (worker.evaluators != None):
+            for text_index in range(len(self.encoded_texts)):
+                is_valid = worker.evaluators[text_index].check(key)
+                if (is_valid[0]):
+                    self.report_solution(key, self.cipher_func(self.encoded_texts[text_index], key), is_valid, worker, text_index)
+            return
+
+        for text_index in range(len(self.encoded_texts)):
+            decoded_text = self.cipher_func(self.encoded_texts[text_index], key)
+            is_valid = self.contains_valid_word_by_size(decoded_text)
+            self.report_solution(key, decoded_text, is_valid, worker, text_index)
+
+    def test_key_batch(self, keys: list[str], worker: WorkerState):
+        '''
+        Decodes every key in the block at once on each encoded text using the batch cipher function, then checks each result.
+        '''
+        if (len(keys) == 0):
+            return
+        from vigenere_batch import matrix_to_strings
+
+        worker.keys_tested += len(keys)
+        for text_index in range(len(self.prepared_texts)):
+            decoded_matrix = self.batch_cipher_func(self.prepared_texts[text_index], keys)
+
+            # Score every key at once, and only build the strings for the ones worth keeping
+            if (worker.top_results != None):
+                scores = self.scorer.score_matrix(decoded_matrix, self.prepared_text.letter_positions)
+                for i in range(len(keys)):
+                    if (worker.top_results.is_worth_adding(scores[i])):
+                        worker.top_results.add(float(scores[i]), keys[i], decoded_matrix[i].tobytes().decode('ascii'))
+                return
+
+            decoded_texts = matrix_to_strings(decoded_matrix)
+            for i in range(len(keys)):
+                is_valid = self.contains_valid_word_by_size(decoded_texts[i])
+                self.report_solution(keys[i], decoded_texts[i], is_valid, worker, text_index)
+
+    def loop_through_all_chars_recursive(self, text: str, num_digits: int, worker: WorkerState):
+        '''
+        Tests every key made by adding up to num_digits letters to the given text.
+        '''
+        # Every key tested at this level shares all but its last letter, so decode the shared part once
+        decoder_state = worker.decoder.prepare(text) if worker.decoder != None else None
+
+        # The one letter (if any) that makes a repeat of a shorter key, which can be skipped
+        redundant_letter = self.get_redundant_letter(text)
 
-    
-    def loop_through_all_chars_recursive(self, text: str, num_digits: int, output_1, output_2, output_3):
         for letter in self.word_dict.ALPHABET:
             new_text = text + letter
 
             if num_digits == 4:
-                output_1.flush()
-                output_2.flush()
-                output_3.flush()
+                worker.flush()
 
             if num_digits > 1:
-                self.loop_through_all_chars_recursive(new_text, num_digits - 1, output_1, output_2, output_3)
+                if self.can_extend(new_text):
+                    self.loop_through_all_chars_recursive(new_text, num_digits - 1, worker)
+                else:
+                    # Skipped keys still count towards the progress through the keyspace
+                    worker.keys_tested += self.count_keys(num_digits - 1) - 1
             
+            # Skipped keys still count towards the progress through the keyspace
+            if (letter == redundant_letter):
+                worker.keys_tested += 1
+                worker.keys_skipped += 1
+                continue
+
             # Test the combination as a key
-            decoded_text = self.cipher_func(self.encoded_text, new_text)
-            is_valid = self.contains_valid_word_by_size(decoded_text)
-            self.check_solution(new_text, decoded_text, output_1, output_2, output_3, is_valid)
+            if (decoder_state == None):
+                self.test_key(new_text, worker)
+                continue
+
+            # Only build the full decoded text for keys that are going to be logged
+            worker.keys_tested += 1
+            is_valid = worker.decoder.check(decoder_state, letter)
+            if (is_valid[0]):
+                decoded_text = self.cipher_func(self.encoded_text, new_text)
+                self.report_solution(new_text, decoded_text, is_valid, worker)
+
+    def test_chunk(self, chunk: tuple[str, int], worker: WorkerState):
+        '''
+        Tests a single chunk of the keyspace. A chunk is (key, num_digits): the key itself is tested,
+        followed by every key made by adding up to num_digits letters to it.
+        '''
+        key, num_digits = chunk
+
+        if (self.is_redundant_key(key)):
+            worker.keys_tested += 1
+            worker.keys_skipped += 1
+        else:
+            self.test_key(key, worker)
+
+        if (num_digits > 0):
+            if (self.can_extend(key)):
+                self.loop_through_all_chars_recursive(key, num_digits, worker)
+            else:
+                worker.keys_tested += self.count_keys(num_digits) - 1
+
+        worker.flush()
 
-    def thread_func(self, start: int, end: int, thread_index: int, print_progress=True):
+    def iter_chunk_hits(self, chunk: tuple[str, int], worker: WorkerState) -> Iterator[tuple[int, str, str, tuple[bool, bool, bool]]]:
         '''
-        Tests all possible combinations of letters for key
+        Tests a single chunk of the keyspace like test_chunk, but yields the worker's hits after every piece of at most
+        3 added letters (the same place loop_through_all_chars_recursive flushes), so a big chunk doesn't pile them all up.
+        '''
+        key, num_digits = chunk
+
+        # A chunk is its own key followed by a chunk for each letter added to it, so big ones can be split the same way
+        if (num_digits > 3 and self.can_extend(key)):
+            self.test_chunk((key, 0), worker)
+            yield from worker.hits
+            worker.hits.clear()
+
+            for letter in self.word_dict.ALPHABET:
+                yield from self.iter_chunk_hits((key + letter, num_digits - 1), worker)
+            return
+
+        self.test_chunk(chunk, worker)
+        yield from worker.hits
+        worker.hits.clear()
+
+    def count_keys(self, num_digits: int) -> int:
+        '''
+        Returns how many keys a chunk with the given num_digits covers: its own key, plus every key made
+        by adding up to num_digits letters to it.
+        '''
+        return sum(len(self.word_dict.ALPHABET) ** digits for digits in range(num_digits + 1))
+
+    def get_keyspace_size(self, chunks: list[tuple[str, int]]) -> int:
+        '''
+        Returns how many keys the given chunks cover.
+        '''
+        return sum(self.count_keys(num_digits) for key, num_digits in chunks)
+
+    def get_output_file_paths(self, worker_index: int) -> list[str]:
+        '''
+        Returns the paths of the three output files of the given worker.
+        '''
+        return [f'output_{separator + 1}_letters_{worker_index}.txt' for separator in self.separators]
+
+    def get_final_output_file_paths(self) -> list[str]:
+        '''
+        Returns the paths of the three final output files, or of every encoded text's three output files
+        one after another if there are several (ex: output_5_letters_text_0.txt).
+        '''
+        if (len(self.encoded_texts) == 1):
+            return [f'output_{separator + 1}_letters.txt' for separator in self.separators]
+        return [f'output_{separator + 1}_letters_text_{text_index}.txt' for text_index in range(len(self.encoded_texts)) for separator in self.separators]
+
+    def create_worker_state(self, output_1, output_2, output_3, worker_index: int) -> WorkerState:
+        '''
+        Sets up a worker with the output files, and whichever of batching, top results and incremental decoding are on.
+        '''
+        worker = WorkerState(output_1, output_2, output_3, worker_index, self.progress)
+        if (self.profiler != None):
+            self.profiler.start_worker(worker_index)
+
+        # Keys waiting to be batch decoded, if batching is on
+        if (self.batch_cipher_func != None):
+            worker.key_buffer = []
+
+        # The best scoring keys this worker has found, if only the top results are being kept. Keeping a key is what
+        # logging it would be otherwise, so it is profiled as output
+        if (self.top_results > 0):
+            worker.top_results = TopResults(self.top_results)
+            if (self.profiler != None):
+                worker.top_results.add = self.profiler.wrap("output", worker.top_results.add)
+
+        # Keys are decoded a column at a time if incremental decoding is on (and nothing else needs the full text)
+        if (self.incremental and worker.key_buffer == None and worker.top_results == None):
+            worker.decoder = IncrementalDecoder(self.encoded_text, self.cipher_func, self.word_dict.ALPHABET, self.word_dict.word_set, self.separators)
+
+            # The decoder decodes and checks the last column in one step, so it is profiled as checking
+            if (self.profiler != None):
+                worker.decoder.check = self.profiler.wrap("validity", worker.decoder.check)
+
+        # Keys are checked a word at a time if lazy evaluation is on (and nothing else needs the full text)
+        if (self.lazy and worker.key_buffer == None and worker.top_results == None and worker.decoder == None):
+            worker.evaluators = [LazyEvaluator(encoded_text, self.cipher_func, self.word_dict, self.separators) for encoded_text in self.encoded_texts]
+
+            # Each evaluator decodes and checks in one step, so it is profiled as checking
+            if (self.profiler != None):
+                for evaluator in worker.evaluators:
+                    evaluator.check = self.profiler.wrap("validity", evaluator.check)
+
+        return worker
+
+    def worker_func(self, chunks, worker_index: int, print_progress=True, checkpoint: Checkpoint | None = None) -> list[tuple[float, str, str]] | None:
+        '''
+        Tests every chunk of the keyspace it is handed, until there are none left.\n
+        This is run by each worker in the WorkerPool. If a checkpoint is given, every finished chunk is recorded in it.\n
+
+        Returns: The best results the worker found as (score, key, decoded_text) if top_results is on, otherwise None
         '''
 
         # Log the start
         if (print_progress):
-            print("Starting thread " + str(thread_index))
-        
+            print("Starting worker " + str(worker_index))
+
+        # A resumed run adds on to the output files of the earlier runs
+        file_mode = 'a' if checkpoint != None and checkpoint.run > 0 else 'w'
+        file_paths = self.get_output_file_paths(worker_index)
+
         # Specific number of letter keys
-        with open(f'output_{self.separators[0] + 1}_letters_{thread_index}.txt', 'w') as output_1, open(f'output_{self.separators[1] + 1}_letters_{thread_index}.txt', 'w') as output_2, open(f'output_{self.separators[2] + 1}_letters_{thread_index}.txt', 'w') as output_3:
-            for keyStart in self.starting_key_part:
-                if (self.starting_key_part != ""):
-                    word = keyStart
-                    decoded_text = self.cipher_func(self.encoded_text, word)
-                    is_valid = self.contains_valid_word_by_size(decoded_text)
-                    self.check_solution(word, decoded_text, output_1, output_2, output_3, is_valid)
-
-                for i in range(end - start + 1):
-                    index = start + i
-                    letter1 = self.word_dict.ALPHABET[index]
-                    word = keyStart + letter1
-                    decoded_text = self.cipher_func(self.encoded_text, word)
-                    is_valid = self.contains_valid_word_by_size(decoded_text)
-                    self.check_solution(word, decoded_text, output_1, output_2, output_3, is_valid)
-
-                    self.loop_through_all_chars_recursive(keyStart + self.word_dict.ALPHABET[index], self.num_digits - 1, output_1, output_2, output_3)
+        with open(file_paths[0], file_mode) as output_1, open(file_paths[1], file_mode) as output_2, open(file_paths[2], file_mode) as output_3:
+            worker = self.create_worker_state(output_1, output_2, output_3, worker_index)
+
+            for chunk in chunks:
+                self.test_chunk(chunk, worker)
+
+                if (checkpoint != None):
+                    # The chunk isn't finished until its last partial batch is tested
+                    if (worker.key_buffer != None):
+                        self.test_key_batch(worker.key_buffer, worker)
+                        worker.key_buffer.clear()
+                        worker.flush()
+                    checkpoint.mark_complete(chunk, worker_index, worker.get_outputs(), worker.top_results)
+
+            # Test any keys left over in the last partial batch
+            if (worker.key_buffer != None):
+                self.test_key_batch(worker.key_buffer, worker)
+                worker.flush()
     
         if (print_progress):
-            print(f'Ending thread {thread_index}')
+            print(f'Ending worker {worker_index}')
+
+        if (worker.top_results != None):
+            return worker.top_results.get_sorted()
+        return None
     
-    def get_bounds(self) -> list[tuple[int, int]]:
+    def stream_worker_func(self, chunks, worker_index: int, print_progress=True) -> Iterator[tuple[int, str, str, tuple[bool, bool, bool]]]:
+        '''
+        Tests every chunk of the keyspace it is handed like worker_func, but yields its results
+        as (text_index, key, decoded_text, is_valid) as it goes (see iter_chunk_hits) instead of writing them to its own files.
+        '''
+        if (print_progress):
+            print("Starting worker " + str(worker_index))
+
+        worker = self.create_worker_state(None, None, None, worker_index)
+        worker.hits = []
+        for chunk in chunks:
+            yield from self.iter_chunk_hits(chunk, worker)
+
+        # Test any keys left over in the last partial batch
+        if (worker.key_buffer != None):
+            self.test_key_batch(worker.key_buffer, worker)
+            worker.flush()
+            yield from worker.hits
+
+        if (print_progress):
+            print(f'Ending worker {worker_index}')
+
+    def get_chunks(self) -> list[tuple[str, int]]:
+        '''
+        Splits the keyspace into many small chunks for the workers to share, so that no worker
+        runs out of work while others are still busy. Keys longer than the text are left out, see get_num_digits.\n
+
+        Returns: A list of (key, num_digits) chunks, see test_chunk
+        '''
+        if (self.shard != None):
+            return self.get_index_range_chunks(*self.get_shard_range(*self.shard))
+
+        chunks = []
+        for key_start in self.starting_key_part:
+            num_digits = self.get_num_digits(key_start)
+
+            # Find how many letters the chunk prefixes need so there are plenty of chunks per worker
+            prefix_length = 0
+            while (prefix_length < num_digits and len(self.word_dict.ALPHABET) ** prefix_length < self.num_cores * CHUNKS_PER_WORKER):
+                prefix_length += 1
+
+            # Keys shorter than the prefix length are tested on their own
+            prefixes = [key_start]
+            if (key_start != ""):
+                chunks.append((key_start, 0))
+
+            for length in range(1, prefix_length + 1):
+                prefixes = [prefix + letter for prefix in prefixes for letter in self.word_dict.ALPHABET]
+                if (length < prefix_length):
+                    chunks.extend((prefix, 0) for prefix in prefixes)
+
+            # Keys at the prefix length carry the rest of the digits with them
+            if (prefix_length > 0):
+                chunks.extend((prefix, num_digits - prefix_length) for prefix in prefixes)
+
+        return chunks
+
+    def count_indexed_keys(self) -> int:
+        '''
+        Returns how many keys there are in the whole keyspace, which is how many indices index_to_key takes.
+        '''
+        return sum(self.count_keys(self.get_num_digits(key_start)) - (1 if key_start == "" else 0) for key_start in self.starting_key_part)
+
+    def index_to_key(self, index: int) -> str:
+        '''
+        Returns the key at the given index of the keyspace. The keyspace is every starting key part in order, each
+        followed by every key made from it in the same order they are reached by adding letters one at a time
+        (ex: "a", "aa", "aaa", ..., "aaz", "ab", ...). Each letter of a key is a digit whose place value is the number
+        of keys made from a key of that length, so a key's index is worked out directly from its letters.
+        '''
+        if (index < 0):
+            raise IndexError(f'Key index {index} is out of range')
+
+        for key_start in self.starting_key_part:
+            num_digits = self.get_num_digits(key_start)
+
+            # The empty starting key part is never tested itself, so its block starts at its first child
+            position = index + 1 if key_start == "" else index
+            if (position >= self.count_keys(num_digits)):
+                index -= self.count_keys(num_digits) - (1 if key_start == "" else 0)
+                continue
+
+            key = key_start
+            while (position > 0):
+                position -= 1
+                num_digits -= 1
+                letter_index, position = divmod(position, self.count_keys(num_digits))
+                key += self.word_dict.ALPHABET[letter_index]
+            return key
+
+        raise IndexError(f'Key index is out of range, there are only {self.count_indexed_keys()} keys')
+
+    def key_to_index(self, key: str) -> int:
         '''
-        Returns a list of size num_cores. This list contains tuples of (start_index, end_index)\n
-        CURRENTLY UNDER CONSTRUCTION
+        Returns the index of the given key in the keyspace, the reverse of index_to_key. If more than one starting
+        key part can make the key, the index under the first one is returned.
+        Raises a ValueError if the key isn't in the keyspace.
         '''
-        pass
+        offset = 0
+        for key_start in self.starting_key_part:
+            num_digits = self.get_num_digits(key_start)
+            if (key.startswith(key_start) and len(key) - len(key_start) <= num_digits and key != ""):
+                position = -1 if key_start == "" else 0
+                for letter in key[len(key_start):]:
+                    num_digits -= 1
+                    position += 1 + self.word_dict.ALPHABET.index(letter) * self.count_keys(num_digits)
+                return offset + position
+
+            offset += self.count_keys(num_digits) - (1 if key_start == "" else 0)
+
+        raise ValueError(f'The key {key} is not in the keyspace')
+
+    def get_shard_range(self, shard_index: int, num_shards: int) -> tuple[int, int]:
+        '''
+        Splits the keyspace into num_shards ranges of indices that are the same size to within one key.\n
+
+        Returns: (start_index, end_index) of the given shard, where end_index is not included
+        '''
+        if (num_shards < 1 or shard_index < 0 or shard_index >= num_shards):
+            raise ValueError(f'Shard {shard_index} of {num_shards} does not exist')
+
+        num_keys = self.count_indexed_keys()
+        return (num_keys * shard_index // num_shards, num_keys * (shard_index + 1) // num_shards)
+
+    def get_index_range_chunks(self, start: int, end: int) -> list[tuple[str, int]]:
+        '''
+        Splits the keys from index start up to (but not including) end into chunks that cover exactly those keys,
+        small enough that there are plenty of chunks per worker like get_chunks.\n
+
+        Returns: A list of (key, num_digits) chunks, see test_chunk
+        '''
+        # The most digits a chunk can have and still be small enough
+        max_chunk_digits = 0
+        while (max_chunk_digits < self.num_digits and self.count_keys(max_chunk_digits + 1) * self.num_cores * CHUNKS_PER_WORKER <= end - start):
+            max_chunk_digits += 1
+
+        chunks = []
+        offset = 0
+        for key_start in self.starting_key_part:
+            num_digits = self.get_num_digits(key_start)
+
+            # The empty starting key part is never tested itself, so it sits just before its block
+            position = offset - 1 if key_start == "" else offset
+            self.add_index_range_chunks(key_start, num_digits, position, start, end, max_chunk_digits, key_start != "", chunks)
+            offset += self.count_keys(num_digits) - (1 if key_start == "" else 0)
+
+        return chunks
+
+    def add_index_range_chunks(self, key: str, num_digits: int, position: int, start: int, end: int, max_chunk_digits: int, is_tested: bool, chunks: list[tuple[str, int]]):
+        '''
+        Adds the chunks covering the keys from index start up to end that are made from the given key, where
+        the key is at the given index and has num_digits letters left to add. A key that isn't tested (the empty key)
+        is never added as a chunk itself.
+        '''
+        num_keys = self.count_keys(num_digits)
+        if (num_digits < 0 or position >= end or position + num_keys <= start):
+            return
+
+        # Every key made from this key is in the range, so they can all be one chunk
+        if (is_tested and start <= position and position + num_keys <= end and num_digits <= max_chunk_digits):
+            chunks.append((key, num_digits))
+            return
+
+        if (is_tested and start <= position):
+            chunks.append((key, 0))
+
+        num_child_keys = self.count_keys(num_digits - 1)
+        for i in range(len(self.word_dict.ALPHABET)):
+            self.add_index_range_chunks(key + self.word_dict.ALPHABET[i], num_digits - 1, position + 1 + i * num_child_keys, start, end, max_chunk_digits, True, chunks)
+
+    def concat_output_files(self, num_workers: int | None = None):
+        '''
+        Combines the output files of every worker into one file per separator, deleting the old files.\n
+        num_workers: How many worker indices have output files. By default this is num_cores
+        '''
+        if (num_workers == None):
+            num_workers = self.num_cores
 
-    def concat_output_files(self):
         for i in range(3):
             filenames = []
-            for j in range(self.num_cores):
-                filenames.append(f'output_{self.separators[i] + 1}_letters_{j}.txt')
+            for j in range(num_workers):
+                filenames.append(self.get_output_file_paths(j)[i])
             with open(f'output_{self.separators[i] + 1}_letters.txt', 'a') as outfile:
                 for fname in filenames:
+                    if (not os.path.exists(fname)):
+                        continue
+
                     with open(fname) as infile:
                         for line in infile:
                             outfile.write(line)
 
                     os.remove(fname)                    
 
+    def get_checkpoint_fingerprint(self) -> str:
+        '''
+        Returns a hash of every setting that changes which keys are tested or how results are reported.
+        '''
+        return Checkpoint.get_fingerprint([self.encoded_text, self.cipher_func.__name__, self.num_digits, self.separators,
+                                           self.starting_key_part, self.word_dict.ALPHABET, self.prune_word, self.top_results, self.shard])
 
-    ### SOLVING FUNCTIONS ###
-    
-    def solve(self, print_progress=True):
-        # Create all the threads
-        threads = []
-        section_size = 2
-        for i in range(self.num_cores):
-            start_index = section_size * i
-            end_index = start_index + section_size - 1
-            if i > 9:
-                start_index = section_size * 9
-                start_index = start_index + i - 8
-                end_index = start_index
-            if i == 15:
-                start_index = 25
-                end_index = 25
-            
-            if (print_progress):
-                print(f'({start_index}, {end_index})')
-            new_thread = threading.Thread(target=self.thread_func, args=(start_index, end_index, i, print_progress))
-            threads.append(new_thread)
+    def run_chunks(self, chunks: list[tuple[str, int]], checkpoint: Checkpoint | None, print_progress=True):
+        '''
+        Tests the given chunks across all the workers, then combines and reports the results.
+        '''
+        if (print_progress):
+            print(f'Split the keyspace into {len(chunks)} chunks across {self.num_cores} {self.backend} workers')
+            self.print_skipped_long_keys()
+
+        self.print_estimated_run_time(chunks)
 
-        self.print_estimated_run_time()
+        self.start_progress(chunks, print_progress)
+        is_profiling = self.start_profiling()
+        try:
+            pool = WorkerPool(self.num_cores, self.backend)
+            with self.word_dict.sharing(pool.backend):
+                results = pool.run(partial(self.worker_func, print_progress=print_progress, checkpoint=checkpoint), chunks)
+        finally:
+            if (is_profiling):
+                self.stop_profiling()
+            self.stop_progress()
         
-        #Start the threads
-        for thread in threads:
-            thread.start()
+        if (checkpoint == None):
+            self.concat_output_files()
+        else:
+            self.concat_output_files(checkpoint.get_num_workers(self.num_cores))
+
+        if (self.top_results > 0):
+            if (checkpoint != None):
+                results.append(checkpoint.get_saved_top_results())
+            self.report_top_results(results, print_progress)
+
+        if (checkpoint != None):
+            checkpoint.remove()
+
+
+    ### SOLVING FUNCTIONS ###
+
+    def iter_solutions(self, print_progress=True, max_pending: int = 1024) -> Iterator[tuple[str, str, tuple[bool, bool, bool]]]:
+        '''
+        Tests every key in the keyspace, yielding every key with a valid word as (key, decoded_text, is_valid)
+        as soon as a worker finds it. Nothing is written to the output files. Stopping early stops the workers.\n
 
-        # Wait for the threads to join
+        max_pending: The most results that can wait to be read before the workers wait for the reader
+        '''
+        if (len(self.encoded_texts) > 1):
+            raise ValueError("There are several encoded texts, use iter_batch_solutions to know which text each result is for")
+
+        for text_index, key, decoded_text, is_valid in self.iter_batch_solutions(print_progress, max_pending):
+            yield (key, decoded_text, is_valid)
+
+    def iter_batch_solutions(self, print_progress=True, max_pending: int = 1024) -> Iterator[tuple[int, str, str, tuple[bool, bool, bool]]]:
+        '''
+        Tests every key in the keyspace on every encoded text like iter_solutions, yielding every key with a valid word
+        as (text_index, key, decoded_text, is_valid). Each key is only made once, however many texts there are.\n
+
+        max_pending: The most results that can wait to be read before the workers wait for the reader
+        '''
+        if (self.top_results > 0):
+            raise ValueError("The top results are only known once every key is tested, use solve instead")
+
+        chunks = self.get_chunks()
         if (print_progress):
-            print("Now waiting for threads to finish")
-        for thread in threads:
-            thread.join()
-        
-        self.concat_output_files()
\ No newline at end of file
+            print(f'Split the keyspace into {len(chunks)} chunks across {self.num_cores} {self.backend} workers')
+            self.print_skipped_long_keys()
+
+        self.start_progress(chunks, print_progress)
+        is_profiling = self.start_profiling()
+        try:
+            pool = WorkerPool(self.num_cores, self.backend)
+            with self.word_dict.sharing(pool.backend):
+                yield from pool.stream(partial(self.stream_worker_func, print_progress=print_progress), chunks, max_pending)
+        finally:
+            if (is_profiling):
+                self.stop_profiling()
+            self.stop_progress()
+
+    def start_progress(self, chunks: list[tuple[str, int]], print_progress=True):
+        '''
+        Starts tracking the progress of the workers through the given chunks, see Progress.
+        '''
+        self.progress = Progress(self.get_keyspace_size(chunks), self.num_cores, self.progress_interval if print_progress else 0,
+                                 self.progress_path, print_reports=print_progress)
+        self.progress.start()
+
+    def stop_progress(self):
+        '''
+        Stops tracking progress, reporting the final progress of the run and how many repeating keys were skipped.
+        '''
+        if (self.progress == None):
+            return
+
+        snapshot = self.progress.stop()
+        if (self.progress.print_reports and snapshot["total_keys"] > 0):
+            print(f'Skipped {snapshot["keys_skipped"]:,} repeating keys ({100 * snapshot["keys_skipped"] / snapshot["total_keys"]:.2f}% of the keyspace)')
+        self.progress = None
+
+    def print_skipped_long_keys(self):
+        '''
+        Prints how many keys are left out of the keyspace for being longer than the text, if there are any.
+        '''
+        num_skipped = self.count_keys_past_text_length()
+        if (num_skipped > 0):
+            print(f'Skipping {num_skipped:,} keys longer than the {self.text_length} letters of the text, which decode the same as shorter keys')
+
+    def start_profiling(self) -> bool:
+        '''
+        If profiling is on, swaps the functions for each stage of testing a key for profiled versions, see StageProfiler.\n
+
+        Returns: Whether or not profiling was started here, False if it is off or was already started (ex: by solve,
+            so it also covers the ResultWriter). Only the caller that started it should stop it
+        '''
+        if (self.profile_sample_rate <= 0 or self.profiler != None):
+            return False
+
+        self.profiler = StageProfiler(self.num_cores, self.profile_sample_rate)
+        self.cipher_func = self.profiler.wrap("cipher", self.cipher_func)
+        if (self.batch_cipher_func != None):
+            self.batch_cipher_func = self.profiler.wrap("cipher", self.batch_cipher_func)
+        self.contains_valid_word_by_size = self.profiler.wrap("validity", self.contains_valid_word_by_size)
+        self.report_solution = self.profiler.wrap("output", self.report_solution)
+        return True
+
+    @contextmanager
+    def open_result_writer(self, file_paths: list[str]) -> Iterator[ResultWriter]:
+        '''
+        Opens a ResultWriter for streamed results. The results are logged by the writer's thread, so if profiling is on
+        it is started here and lasts until the writer has written every result.
+        '''
+        is_profiling = self.start_profiling()
+        try:
+            with ResultWriter(file_paths) as writer:
+                if (is_profiling):
+                    self.profiler.wrap_writer(writer)
+                yield writer
+        finally:
+            if (is_profiling):
+                self.stop_profiling()
+
+    def stop_profiling(self):
+        '''
+        Prints the stage breakdown and puts the original functions back, if profiling is on.
+        '''
+        if (self.profiler == None):
+            return
+
+        self.profiler.print_breakdown()
+        self.cipher_func = self.cipher_func.func
+        if (self.batch_cipher_func != None):
+            self.batch_cipher_func = self.batch_cipher_func.func
+        del self.contains_valid_word_by_size
+        del self.report_solution
+        self.profiler = None
+
+    def solve(self, print_progress=True, checkpoint_path: str | None = None):
+        '''
+        Tests every key in the keyspace. With several encoded texts, each text has its own output files, see get_final_output_file_paths.\n
+
+        checkpoint_path: If given, every finished chunk of the keyspace is recorded in this file, so the run
+            can be picked back up with resume if it is stopped. The file is deleted once the run finishes.
+        '''
+        # Without a checkpoint or top results, every result goes straight to the final output files
+        if (checkpoint_path == None and self.top_results == 0):
+            self.print_estimated_run_time()
+            with self.open_result_writer(self.get_final_output_file_paths()) as writer:
+                for text_index, key, decoded_text, is_valid in self.iter_batch_solutions(print_progress):
+                    writer.write(key, decoded_text, is_valid, text_index)
+            return
+
+        if (len(self.encoded_texts) > 1):
+            raise ValueError("Checkpoints only work with a single encoded text")
+
+        chunks = self.get_chunks()
+
+        checkpoint = None
+        if (checkpoint_path != None):
+            checkpoint = Checkpoint.create(checkpoint_path, self.get_checkpoint_fingerprint(), chunks)
+
+        self.run_chunks(chunks, checkpoint, print_progress)
+
+    def resume(self, checkpoint_path: str, print_progress=True):
+        '''
+        Picks a stopped run back up from its checkpoint, skipping every finished chunk and
+        adding on to the existing output files. The BruteForce must have the same settings as the stopped run.
+        '''
+        if (len(self.encoded_texts) > 1):
+            raise ValueError("Checkpoints only work with a single encoded text")
+
+        checkpoint = Checkpoint.load(checkpoint_path, self.get_checkpoint_fingerprint())
+        checkpoint.restore_outputs(self.get_output_file_paths, self.num_cores)
+
+        chunks = checkpoint.get_remaining_chunks()
+        if (print_progress):
+            print(f'Resuming from {checkpoint_path}, {len(checkpoint.chunks) - len(chunks)} of {len(checkpoint.chunks)} chunks already finished')
+
+        self.run_chunks(chunks, checkpoint, print_progress)
+
+    def report_top_results(self, worker_results: list[list[tuple[float, str, str]]], print_progress=True) -> list[tuple[float, str, str]]:
+        '''
+        Merges the best results of every worker, writing the overall best to top_results.txt.\n
+
+        Returns: The overall best results as (score, key, decoded_text), from best to worst
+        '''
+        top_results = TopResults(self.top_results)
+        for results in worker_results:
+            top_results.merge(results)
+
+        top_results.write('top_results.txt')
+        if (print_progress):
+            for score, key, decoded_text in top_results.get_sorted():
+                print(f'score: {score:.2f} | key: {key} | text: {decoded_text}')
+
+        return top_results.get_sorted()
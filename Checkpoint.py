@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+
+class Checkpoint:
+    def __init__(self, path: str, fingerprint: str, chunks: list, run: int = 0):
+        '''
+        Keeps track of which chunks of a long run are finished, so the run can be picked back up
+        after a crash without losing or repeating any results.\n
+        The checkpoint is a file of json lines: a header describing the run, then one line for every
+        finished chunk recording how far each output file had been written at that point.
+        Use create to start a new checkpoint and load to pick up an existing one.\n
+
+        path: Where the checkpoint file is\n
+        fingerprint: A hash of the settings of the run, see get_fingerprint\n
+        chunks: Every chunk of the run, in the order they are handed out\n
+        run: How many times this checkpoint has been resumed
+        '''
+        self.path = path
+        self.fingerprint = fingerprint
+        self.chunks = chunks
+        self.run = run
+
+        # The chunks that are already finished, as json text
+        self.completed: set[str] = set()
+
+        # The size of every output file of each worker index, as of its last finished chunk
+        self.output_sizes: dict[int, list[int]] = {}
+
+        # The best results of every worker of every earlier run, if top_results was on
+        self.saved_top_results: dict[tuple[int, int], list[tuple[float, str, str]]] = {}
+
+    @staticmethod
+    def get_fingerprint(settings: list) -> str:
+        '''
+        Returns a hash of the given settings, used to make sure a checkpoint is only resumed by the same run.
+        '''
+        return hashlib.sha256(repr(settings).encode()).hexdigest()
+
+    @classmethod
+    def create(cls, path: str, fingerprint: str, chunks: list) -> 'Checkpoint':
+        '''
+        Starts a new checkpoint file, replacing any that is already there.
+        '''
+        checkpoint = cls(path, fingerprint, chunks)
+        with open(path, 'w') as checkpoint_file:
+            checkpoint_file.write(json.dumps({"fingerprint": fingerprint, "chunks": chunks}) + "\n")
+        return checkpoint
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str) -> 'Checkpoint':
+        '''
+        Loads an existing checkpoint file. Raises a ValueError if it was made by a run with different settings.
+        '''
+        with open(path) as checkpoint_file:
+            header = json.loads(checkpoint_file.readline())
+            if (header["fingerprint"] != fingerprint):
+                raise ValueError(f'The checkpoint {path} was made by a run with different settings')
+
+            checkpoint = cls(path, fingerprint, [tuple(chunk) for chunk in header["chunks"]])
+            last_run = -1
+            for line in checkpoint_file:
+                # A line cut off by a crash never finished its chunk
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+
+                checkpoint.completed.add(json.dumps(record["chunk"]))
+                checkpoint.output_sizes[record["worker"]] = record["sizes"]
+                if (record.get("top") != None):
+                    checkpoint.saved_top_results[(record["run"], record["worker"])] = [tuple(result) for result in record["top"]]
+                last_run = max(last_run, record["run"])
+
+        checkpoint.run = last_run + 1
+        return checkpoint
+
+    def get_remaining_chunks(self) -> list:
+        '''
+        Returns every chunk that isn't finished yet.
+        '''
+        return [chunk for chunk in self.chunks if not json.dumps(chunk) in self.completed]
+
+    def get_num_workers(self, num_workers: int) -> int:
+        '''
+        Returns how many worker indices have output files, including those of earlier runs.
+        '''
+        return max([num_workers] + [worker_index + 1 for worker_index in self.output_sizes])
+
+    def restore_outputs(self, get_file_paths, num_workers: int):
+        '''
+        Cuts every worker's output files back to how they were after its last finished chunk,
+        removing anything written by a chunk that didn't finish.\n
+
+        get_file_paths: A function that returns the output file paths of a worker index
+        '''
+        for worker_index in range(self.get_num_workers(num_workers)):
+            file_paths = get_file_paths(worker_index)
+            sizes = self.output_sizes.get(worker_index, [0] * len(file_paths))
+            for i in range(len(file_paths)):
+                with open(file_paths[i], 'a') as output_file:
+                    output_file.truncate(sizes[i])
+
+    def mark_complete(self, chunk, worker_index: int, files: list, top_results=None):
+        '''
+        Records that a chunk is finished. Every output file is flushed to disk first, so the
+        recorded sizes only ever cover results that were actually written.\n
+
+        files: The worker's open output files\n
+        top_results: The worker's TopResults, if top_results is on
+        '''
+        sizes = []
+        for output_file in files:
+            output_file.flush()
+            os.fsync(output_file.fileno())
+            sizes.append(output_file.tell())
+
+        record = {"chunk": chunk, "worker": worker_index, "run": self.run, "sizes": sizes}
+        if (top_results != None):
+            record["top"] = top_results.get_sorted()
+
+        # A single small append is atomic, so workers can share the file without a lock
+        with open(self.path, 'a') as checkpoint_file:
+            checkpoint_file.write(json.dumps(record) + "\n")
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+
+    def get_saved_top_results(self) -> list[tuple[float, str, str]]:
+        '''
+        Returns the best results found by every worker of every earlier run.
+        '''
+        results = []
+        for saved_results in self.saved_top_results.values():
+            results.extend(saved_results)
+        return results
+
+    def remove(self):
+        '''
+        Deletes the checkpoint file, once the run is fully finished.
+        '''
+        if (os.path.exists(self.path)):
+            os.remove(self.path)
@@ -0,0 +1,254 @@
+from collections.abc import Callable
+import itertools
+import numpy as np
+from vigenere import ALPHABET, get_cipher_funcs
+
+class CribDrag:
+    def __init__(self, encoded_text: str, cipher_func: Callable[[str, str], str] | str, rev_cipher_func: Callable[[str, str], str] | None = None, max_key_length: int = 20, alphabet: list[str] = ALPHABET):
+        '''
+        Will try and solve the given cipher from a crib, a piece of text thought to be somewhere in the plaintext
+        (ex: a character's name). The crib is slid across every position of the encoded text, and at each one
+        the key letters that would turn the crib into the encoded text there are worked out. Every position is
+        worked out at once with numpy, so dragging a crib across a long text is quick.\n
+        At the right position, the key fragment is a piece of the real key, so if the crib is longer than the key
+        the fragment repeats every key length letters. Fragments are ranked by how well they repeat, and a fragment
+        that repeats gives the whole key. A crib shorter than the key still narrows the keys worth trying, see
+        get_starting_key_parts (for BruteForce) and get_matching_keys (for DictCompare).\n
+        Only alphabet characters move the key along, so the crib is only matched against the letters of the encoded
+        text and anything else in the crib (like spaces) is ignored.\n
+
+        encoded_text: The encoded string of text\n
+        cipher_func: The cipher function to call that decodes a given string, or the name of a cipher in vigenere.CIPHER_FUNCS
+            (which also sets rev_cipher_func, if it isn't given)\n
+        rev_cipher_func: A function to reverse engineer a key given the plaintext and the ciphertext\n
+        max_key_length: The longest key length to consider\n
+        alphabet: A list of characters representing the possible characters in the alphabet.
+        '''
+        # A cipher given by name brings its own reverse function
+        if (isinstance(cipher_func, str)):
+            cipher_func, cipher_rev_func = get_cipher_funcs(cipher_func)[1:]
+            if (rev_cipher_func == None):
+                rev_cipher_func = cipher_rev_func
+        if (rev_cipher_func == None):
+            raise ValueError("CribDrag needs rev_cipher_func to work out key fragments")
+
+        self.encoded_text = encoded_text
+        self.cipher_func = cipher_func
+        self.rev_cipher_func = rev_cipher_func
+        self.max_key_length = max_key_length
+        self.alphabet = alphabet
+        self.lookup = {alphabet[i]: i for i in range(len(alphabet))}
+
+        # The encoded letters as alphabet indices
+        self.letters = np.array([self.lookup[character] for character in encoded_text.lower() if character in self.lookup], dtype=np.intp)
+
+        # The key letter index of every (plaintext letter index, ciphertext letter index) pair, from rev_cipher_func
+        alphabet_text = "".join(alphabet)
+        self.reverse_table = np.array([[self.lookup[letter] for letter in rev_cipher_func(plain_letter * len(alphabet), alphabet_text)]
+                                       for plain_letter in alphabet], dtype=np.intp)
+
+    def get_crib_letters(self, crib: str) -> np.ndarray:
+        '''
+        Returns the alphabet indices of the letters of the crib, leaving out anything not in the alphabet.
+        '''
+        return np.array([self.lookup[character] for character in crib.lower() if character in self.lookup], dtype=np.intp)
+
+    def drag(self, crib: str) -> np.ndarray:
+        '''
+        Works out the key fragment that turns the crib into the encoded letters at every position at once.\n
+
+        Returns: A matrix of key letter indices with one row per position (the row index is the index of the
+        encoded letter the crib starts on) and one column per letter of the crib
+        '''
+        crib_letters = self.get_crib_letters(crib)
+        if (len(crib_letters) == 0 or len(crib_letters) > len(self.letters)):
+            return np.zeros((0, len(crib_letters)), dtype=np.intp)
+
+        windows = np.lib.stride_tricks.sliding_window_view(self.letters, len(crib_letters))
+        return self.reverse_table[crib_letters[None, :], windows]
+
+    def fragment_to_string(self, fragment: np.ndarray) -> str:
+        '''
+        Converts a row of key letter indices back into a string.
+        '''
+        return "".join(self.alphabet[i] for i in fragment)
+
+    def fragment_to_key(self, fragment: np.ndarray, offset: int, key_length: int) -> str:
+        '''
+        Returns the key of the given length that a fragment found at the given offset spells out, lined up so
+        the key starts on the first letter of the text. The fragment must be at least key_length letters long.
+        '''
+        return "".join(self.alphabet[fragment[(column - offset) % key_length]] for column in range(key_length))
+
+    def score_periods(self, fragments: np.ndarray, key_lengths: list[int]) -> np.ndarray:
+        '''
+        Scores how well every fragment repeats at each key length: the number of letters that match the letter
+        key_length further along, less the number that would match by chance. A crib at the right position with
+        the right key length matches every time, and shorter key lengths have more letters to match, so the real key
+        length beats its multiples.\n
+
+        Returns: A matrix with one row per fragment and one column per key length. Key lengths that aren't shorter
+        than the crib can't be checked and score 0
+        '''
+        scores = np.zeros((len(fragments), len(key_lengths)), dtype=np.float64)
+        crib_length = fragments.shape[1]
+        for i in range(len(key_lengths)):
+            key_length = key_lengths[i]
+            if (key_length < crib_length):
+                matches = np.count_nonzero(fragments[:, :-key_length] == fragments[:, key_length:], axis=1)
+                scores[:, i] = matches - (crib_length - key_length) / len(self.alphabet)
+
+        return scores
+
+    def rank_fragments(self, crib: str, key_lengths: list[int] | None = None, num_results: int | None = None) -> list[tuple[int, int, float, str]]:
+        '''
+        Drags the crib across the encoded text and ranks every position by how well its key fragment repeats.\n
+
+        key_lengths: The key lengths to consider, ex: the best guesses from FrequencySolver.estimate_key_lengths.
+            By default this is every length up to max_key_length\n
+        num_results: If given, only this many of the best positions are returned
+
+        Returns: A list of (offset, key_length, score, fragment) from best to worst, where offset is the index of
+        the encoded letter the crib starts on and key_length is the length the fragment repeats best at
+        '''
+        if (key_lengths == None):
+            key_lengths = list(range(1, self.max_key_length + 1))
+
+        fragments = self.drag(crib)
+        if (len(fragments) == 0 or len(key_lengths) == 0):
+            return []
+
+        scores = self.score_periods(fragments, key_lengths)
+        best_lengths = np.argmax(scores, axis=1)
+        best_scores = scores[np.arange(len(fragments)), best_lengths]
+
+        # Stable, so positions that score the same stay in the order they appear in the text
+        order = np.argsort(-best_scores, kind='stable')
+        if (num_results != None):
+            order = order[:num_results]
+
+        return [(int(offset), key_lengths[best_lengths[offset]], float(best_scores[offset]), self.fragment_to_string(fragments[offset])) for offset in order]
+
+    def get_keys(self, crib: str, key_lengths: list[int] | None = None, num_results: int | None = None) -> list[tuple[str, float]]:
+        '''
+        Returns the whole keys spelled out by the positions where the crib's key fragment repeats, which
+        needs the crib to be longer than the key.\n
+
+        Returns: A list of (key, score) from best to worst
+        '''
+        keys = []
+        seen_keys = set()
+        fragments = self.drag(crib)
+        for offset, key_length, score, fragment in self.rank_fragments(crib, key_lengths):
+            # Nothing repeated more than chance, so the rest of the positions don't give a key
+            if (score <= 0 or (num_results != None and len(keys) >= num_results)):
+                break
+
+            key = self.fragment_to_key(fragments[offset], offset, key_length)
+            if (key in seen_keys):
+                continue
+            seen_keys.add(key)
+            keys.append((key, score))
+
+        return keys
+
+    def get_starting_key_parts(self, crib: str, key_length: int, max_free_letters: int = 2) -> list[str]:
+        '''
+        Returns the start of the key of the given length at every position of the crib, ready to pass to
+        BruteForce as starting_key_part, which then only has to fill in the rest of the key. Positions where the
+        crib is longer than the key but doesn't repeat at key_length are left out.\n
+        Where the crib covers the first letter of the key, the start is the crib's key letters from there on. Where it
+        doesn't (the crib is shorter than the key and lands after its first letter), the letters before the crib
+        could be anything, so the start is every combination of those free letters followed by the crib's key letters.\n
+
+        max_free_letters: The most free letters a start can have. Each one multiplies the starts of a position by the
+            size of the alphabet, so positions with more free letters than this are left out. Nothing is left out as
+            long as the crib has at most this many fewer letters than the key
+
+        Returns: The distinct key starts, longest first
+        '''
+        fragments = self.drag(crib)
+        if (len(fragments) == 0):
+            return []
+
+        crib_length = fragments.shape[1]
+        offsets = np.arange(len(fragments))
+        if (key_length < crib_length):
+            offsets = offsets[np.all(fragments[:, :-key_length] == fragments[:, key_length:], axis=1)]
+
+        alphabet_text = "".join(self.alphabet)
+        key_starts = set()
+        for offset in offsets:
+            # The first crib letter that lines up with the first letter of the key
+            first = (-int(offset)) % key_length
+            if (first < crib_length):
+                key_starts.add(self.fragment_to_string(fragments[offset, first:first + key_length]))
+                continue
+
+            # The crib starts this many letters into the key and ends before the key repeats
+            num_free = key_length - first
+            if (num_free <= max_free_letters):
+                fragment = self.fragment_to_string(fragments[offset])
+                key_starts.update("".join(free_letters) + fragment for free_letters in itertools.product(alphabet_text, repeat=num_free))
+
+        return sorted(key_starts, key=lambda key_start: (-len(key_start), key_start))
+
+    def get_matching_keys(self, crib: str, keys: list[str], max_keys_per_block: int = 1024) -> list[str]:
+        '''
+        Finds the keys that would decode the crib somewhere in the encoded text, ready to pass to DictCompare as
+        keys_to_test. Keys of each length are checked against every position at once, a block at a time.\n
+
+        keys: The keys to check, ex: word_dict.all_words\n
+        max_keys_per_block: How many keys of the same length to check at once. Lower this if memory is tight
+
+        Returns: The matching keys, in the order they were given
+        '''
+        fragments = self.drag(crib)
+        if (len(fragments) == 0):
+            return []
+
+        crib_length = fragments.shape[1]
+        offsets = np.arange(len(fragments))
+
+        # Keys with a character not in the alphabet leave the text unchanged, so they can't decode the crib
+        keys_by_length: dict[int, list[str]] = {}
+        for key in keys:
+            if (len(key) > 0 and all(character in self.lookup for character in key)):
+                keys_by_length.setdefault(len(key), []).append(key)
+
+        matching = set()
+        for key_length, same_length_keys in keys_by_length.items():
+            # The key column each crib letter lines up with, at every position
+            columns = (offsets[:, None] + np.arange(crib_length)[None, :]) % key_length
+
+            for start in range(0, len(same_length_keys), max_keys_per_block):
+                block = same_length_keys[start:start + max_keys_per_block]
+                key_matrix = np.array([[self.lookup[character] for character in key] for key in block], dtype=np.intp)
+
+                # (keys, positions, crib letters), a key matches if every letter lines up at any position
+                is_match = np.any(np.all(key_matrix[:, columns] == fragments[None, :, :], axis=2), axis=1)
+                matching.update(block[i] for i in np.flatnonzero(is_match))
+
+        return [key for key in keys if key in matching]
+
+    ### SOLVING FUNCTIONS ###
+
+    def solve(self, crib: str, key_lengths: list[int] | None = None, num_results: int = 10, print_progress=True) -> list[tuple[str, float, str]]:
+        '''
+        Drags the crib across the encoded text and decodes the text with every whole key it gives.\n
+
+        crib: A piece of text thought to be in the plaintext. It needs to be longer than the key to give a whole key\n
+        key_lengths: The key lengths to consider. By default this is every length up to max_key_length\n
+        num_results: How many of the best keys to return
+
+        Returns: A list of (key, score, decoded_text) from best to worst
+        '''
+        results = [(key, score, self.cipher_func(self.encoded_text, key)) for key, score in self.get_keys(crib, key_lengths, num_results)]
+
+        if (print_progress):
+            if (len(results) == 0):
+                print(f'No key repeats within "{crib}", try a longer crib or see get_starting_key_parts')
+            for key, score, decoded_text in results:
+                print(f'Key: {key} | Score: {score:.1f} | Decoded: {decoded_text}')
+
+        return results
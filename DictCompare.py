@@ -1,186 +1,623 @@
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+import itertools
 import os
 import time
 from WordDictionary import WordDictionary
-import threading
+from vigenere import get_cipher_funcs
+from WorkerPool import WorkerPool, default_backend, get_parallelism
+from TopResults import TopResults
+from Checkpoint import Checkpoint
+from ResultWriter import ResultWriter
+from Progress import Progress, format_duration
+from StageProfiler import StageProfiler
+from LazyEvaluator import LazyEvaluator
+from functools import partial
+from typing import TYPE_CHECKING
+
+# numpy (and the modules built on it) is only needed for batching, top results and the quick solve alignment search,
+# so it is imported where those are used
+if TYPE_CHECKING:
+    import numpy as np
+    from QuadgramScorer import QuadgramScorer
+
+# How many chunks of keys_to_test to aim for per worker. More chunks keeps the workers
+# evenly loaded, at the cost of a little more queue traffic.
+CHUNKS_PER_WORKER = 8
 
 class DictCompare:
-    def __init__(self, encoded_text: str, cipher_func: Callable[[str, str], str], rev_cipher_func: Callable[[str, str], str] | None=None, word_dict: WordDictionary = WordDictionary(), num_cores: int = 16, min_valid_word_length = 5, separators: tuple[bool, bool, bool] = (4, 6, 12), starting_key_part: list[str]=[""], keys_to_test=None):
+    def __init__(self, encoded_text: str | list[str], cipher_func: Callable[[str, str], str] | str, rev_cipher_func: Callable[[str, str], str] | None=None, word_dict: WordDictionary | None = None, num_cores: int = 16, min_valid_word_length = 5, separators: tuple[bool, bool, bool] = (4, 6, 12), starting_key_part: list[str]=[""], keys_to_test=None, batch_size: int = 0, backend: str | None = None, top_results: int = 0, scorer: 'QuadgramScorer | None' = None, lazy: bool = False, progress_interval: float = 10.0, progress_path: str | None = None, profile_sample_rate: int = 0):
         '''
         Will try and solve the given cipher using keys determined from the dictionary of words.\n
 
-        encoded_text: The encoded string of text\n
-        cipher_func: The cipher function to call that encodes a given string\n
+        encoded_text: The encoded string of text, or a list of encoded texts thought to share a key. solve and
+            solve_two_word_keys then test every key on every text in the same pass through the keys (see iter_batch_solutions).
+            quick_solve and solve_two_word_keys_constrained only look at the first text, and checkpoints and top_results
+            only work with a single text\n
+        cipher_func: The cipher function to call that decodes a given string, or the name of a cipher in vigenere.CIPHER_FUNCS
+            (which also sets rev_cipher_func, if it isn't given)\n
 
         rev_cipher_func: A function to reverse engineer a key given the plaintext and the ciphertext\n
-        word_dict: The associated WordDictionary\n
-        num_cores: The number of separate threads to run at once\n
+        word_dict: The associated WordDictionary. By default this is a new WordDictionary of word_lists/words.csv\n
+        num_cores: The number of separate workers to run at once\n
         starting_key_part: If given, this will add the given string to the beginning of each key.\n
         keys_to_test: This is a list of keys to test. By default this will be the word dictionary's all_words list.\n
+        batch_size: If above 0, keys will be decoded in blocks of this size using the batch version of cipher_func
+            (only used if cipher_func has a batch version in vigenere_batch.BATCH_DECODERS and every encoded text is ascii)\n
+        backend: How to run the workers, one of WorkerPool.BACKENDS ("thread", "process" or "free_threaded").
+            By default this is the fastest one available.\n
+        top_results: If above 0, every key is scored by how much its decoded text looks like real language, and only
+            this many of the best are kept (in top_results.txt) instead of logging every key with a valid word\n
+        scorer: The QuadgramScorer used for top_results. By default this is built from the words in word_dict\n
+        lazy: If True, each key is checked by decoding the encoded words one at a time from longest to shortest, stopping at
+            the first valid one, and the full decoded text is only built for keys that are logged (see LazyEvaluator). Only works
+            for ciphers where each letter of the key shifts its own column of the text, and isn't used with batch_size or top_results\n
+        progress_interval: How many seconds between progress reports (keys tested, keys per second and time left)
+            while solving, or 0 to only report at the end\n
+        progress_path: If given, every progress report is also added to this file as a line of json\n
+        profile_sample_rate: If above 0, the time spent decoding keys, checking them for valid words and logging them is
+            profiled by timing one in every this many calls, and a breakdown is printed at the end of solving
         '''
-        self.encoded_text = encoded_text
+        self.encoded_texts = [encoded_text] if isinstance(encoded_text, str) else list(encoded_text)
+        self.encoded_text = self.encoded_texts[0]
+        # A cipher given by name brings its own reverse function
+        if (isinstance(cipher_func, str)):
+            cipher_func, cipher_rev_func = get_cipher_funcs(cipher_func)[1:]
+            if (rev_cipher_func == None):
+                rev_cipher_func = cipher_rev_func
         self.cipher_func = cipher_func
 
         self.rev_cipher_func = rev_cipher_func
-        self.word_dict = word_dict
+        self.word_dict = word_dict if word_dict != None else WordDictionary()
         self.num_cores = num_cores
         self.min_valid_word_length = min_valid_word_length
         self.separators = separators
         self.starting_key_part = starting_key_part
 
         if (keys_to_test == None):
-            self.keys_to_test = word_dict.all_words
+            self.keys_to_test = self.word_dict.all_words
         else:
             self.keys_to_test = keys_to_test
+
+        self.batch_size = batch_size
+        self.backend = backend if backend != None else default_backend()
+
+        self.top_results = top_results
+        self.scorer = scorer
+        if (top_results > 0 and scorer == None):
+            from QuadgramScorer import QuadgramScorer
+            self.scorer = QuadgramScorer.from_words(self.word_dict.all_words, self.word_dict.ALPHABET)
+        if (top_results > 0 and len(self.encoded_texts) > 1):
+            raise ValueError("top_results only works with a single encoded text")
+
+        self.lazy = lazy
+
+        self.progress_interval = progress_interval
+        self.progress_path = progress_path
+
+        # The Progress of the current run, set while solving
+        self.progress: Progress | None = None
+
+        # The StageProfiler of the current run, set while solving if profiling is on
+        self.profile_sample_rate = profile_sample_rate
+        self.profiler: StageProfiler | None = None
+
+        # The batch decode function to use, or None if keys should be decoded one at a time.
+        # Non ascii text is always decoded one key at a time, see vigenere_batch.is_batchable
+        self.batch_cipher_func = None
+        self.prepared_texts = None
+        if (batch_size > 0 and all(text.isascii() for text in self.encoded_texts)):
+            from vigenere_batch import BATCH_DECODERS, PreparedText
+            self.batch_cipher_func = BATCH_DECODERS.get(cipher_func)
+            self.prepared_texts = [PreparedText(text) for text in self.encoded_texts] if self.batch_cipher_func != None else None
+        self.prepared_text = self.prepared_texts[0] if self.batch_cipher_func != None else None
     
-    def get_size_of_section(self, start: int, total_length: int):
-        '''
-        Used by threads to determine the size of data that a single thread gets.\n
-        Note: This is not exact, just gives a good estimate.
-        '''
-        length = total_length - start
-        return length // self.num_cores
-    
-    def get_estimated_run_time(self):
+    def get_estimated_run_time(self, is_two_word=False, chunks: list[tuple[int, int]] | None = None) -> float:
         '''
-        Try and estimate how long the current testing will take.\n
-        Note: THIS IS VERY INACCURATE ATM, BUT IT DOES GIVE A CLOSE ESTIMATE.
+        Estimates how many nanoseconds testing the given chunks of keys_to_test (by default all of them) will take,
+        by timing a few keys and scaling up to the real number of keys.
         '''
-        startTime = time.time_ns()
+        num_samples = min(20, len(self.keys_to_test))
+        if (num_samples == 0):
+            return 0
+
+        start_time = time.time_ns()
 
         # Run a couple checks and see how long that takes
-        for i in range(20):
+        for i in range(num_samples):
             word = self.starting_key_part[0] + self.keys_to_test[i]
-            decoded_text = self.cipher_func(self.encoded_text, word)
-            decoded_text_filtered = self.word_dict.filter_string(decoded_text, self.min_valid_word_length)
-            self.word_dict.contains_valid_word(decoded_text_filtered)
+            if (is_two_word):
+                word += self.keys_to_test[-1 - i]
+            for encoded_text in self.encoded_texts:
+                decoded_text = self.cipher_func(encoded_text, word)
+                self.contains_valid_word(decoded_text)
 
-        endTime = time.time_ns()
+        time_per_key = (time.time_ns() - start_time) / num_samples
 
-        timeMult = len(self.starting_key_part) * len(self.keys_to_test) / self.num_cores
-
-        return (endTime - startTime) * timeMult
+        return time_per_key * self.get_keyspace_size(is_two_word, chunks) / get_parallelism(self.num_cores, self.backend)
     
-    def print_estimated_run_time(self, is_two_word=False):
+    def print_estimated_run_time(self, is_two_word=False, chunks: list[tuple[int, int]] | None = None):
         '''
-        Try and display how long the current testing will take.\n
-        Note: THIS IS VERY INACCURATE ATM, BUT IT DOES GIVE A CLOSE ESTIMATE.
+        Prints how long testing the given chunks of keys_to_test (by default all of them) is estimated to take.
         '''
-        estimated_time_ns = self.get_estimated_run_time()
+        estimated_time_ns = self.get_estimated_run_time(is_two_word, chunks)
+        print(f'Estimated Completion Time: {format_duration(estimated_time_ns / 1_000_000_000)}')
+
+    def get_keyspace_size(self, is_two_word=False, chunks: list[tuple[int, int]] | None = None) -> int:
+        '''
+        Returns how many keys testing the given chunks of keys_to_test (by default all of them) covers.
+        '''
+        if (chunks == None):
+            chunks = [(0, len(self.keys_to_test))]
+
+        keys_per_index = len(self.starting_key_part)
         if (is_two_word):
-            estimated_time_ns = estimated_time_ns ** 2
-        
-        seconds = estimated_time_ns // 1_000_000_000
-        minutes = seconds // 60
-        hours = minutes // 60
+            keys_per_index *= len(self.keys_to_test)
+        return sum(end - start for start, end in chunks) * keys_per_index
 
-        seconds %= 60
-        minutes %= 60
-        hours %= 60
+    def test_keys(self, start: int, end: int, top_results: TopResults | None = None, evaluators: list[LazyEvaluator] | None = None) -> list[tuple[int, str, str, tuple[bool, bool, bool]]]:
+        '''
+        Tests every key from start up to (but not including) end on every encoded text, finding any
+        results that contain a valid word (or keeping them if they score well enough, when top_results is given).\n
+        If evaluators are given (see get_evaluators), keys are checked with those instead of decoding the whole text.\n
 
-        print(f'TEST: {estimated_time_ns}')
-        print(f'Estimated Completion Time: {hours}h {minutes}m {seconds}s')
-    
+        Returns: A list of (text_index, key, decoded_text, is_valid) for every result that contains a valid word,
+            see get_single_word_validity
+        '''
+        hits = []
+        for keyStart in self.starting_key_part:
+            if (self.batch_cipher_func != None):
+                hits.extend(self.test_key_batches(keyStart, start, end, top_results))
+                continue
 
-    
-    def thread_func(self, start: int, end: int, thread_index: int):
+            for i in range(end - start):
+                index = start + i
+                word = keyStart + self.keys_to_test[index]
+                for text_index in range(len(self.encoded_texts)):
+                    # Only build the full decoded text for keys that are going to be logged
+                    if (evaluators != None):
+                        is_valid = evaluators[text_index].check(word)
+                        if (is_valid[0]):
+                            hits.append((text_index, word, self.cipher_func(self.encoded_texts[text_index], word), is_valid))
+                        continue
+
+                    decoded_text = self.cipher_func(self.encoded_texts[text_index], word)
+                    if (top_results != None):
+                        top_results.add(self.scorer.score(decoded_text), word, decoded_text)
+                        continue
+
+                    if (self.contains_valid_word(decoded_text)):
+                        hits.append((text_index, word, decoded_text, self.get_single_word_validity(decoded_text)))
+
+        return hits
+
+    def test_key_batches(self, key_start: str, start: int, end: int, top_results: TopResults | None = None) -> list[tuple[int, str, str, tuple[bool, bool, bool]]]:
+        '''
+        Tests the keys within the given indices in blocks of batch_size, decoding each block at once
+        on each encoded text with the batch cipher function.\n
+
+        Returns: A list of (text_index, key, decoded_text, is_valid) for every result that contains a valid word
+        '''
+        from vigenere_batch import matrix_to_strings
+
+        hits = []
+        for block_start in range(start, end, self.batch_size):
+            block_end = min(block_start + self.batch_size, end)
+            keys = [key_start + key for key in self.keys_to_test[block_start:block_end]]
+            for text_index in range(len(self.prepared_texts)):
+                decoded_matrix = self.batch_cipher_func(self.prepared_texts[text_index], keys)
+
+                # Score every key at once, and only build the strings for the ones worth keeping
+                if (top_results != None):
+                    scores = self.scorer.score_matrix(decoded_matrix, self.prepared_text.letter_positions)
+                    for i in range(len(keys)):
+                        if (top_results.is_worth_adding(scores[i])):
+                            top_results.add(float(scores[i]), keys[i], decoded_matrix[i].tobytes().decode('ascii'))
+                    continue
+
+                decoded_texts = matrix_to_strings(decoded_matrix)
+
+                for i in range(len(keys)):
+                    if (self.contains_valid_word(decoded_texts[i])):
+                        hits.append((text_index, keys[i], decoded_texts[i], self.get_single_word_validity(decoded_texts[i])))
+
+        return hits
+
+    def test_two_word_keys(self, start: int, end: int, output_1, output_2, output_3, top_results: TopResults | None = None, worker_index: int | None = None, evaluators: list[LazyEvaluator] | None = None) -> list[tuple[int, str, str, tuple[bool, bool, bool]]]:
         '''
-        This is the function that is meant to be run by each thread. This will
-        test keys within the given indices (inclusive).
+        Tests every key from start up to (but not including) end, adding every key on top of it, on every encoded text.
+        If top_results is given, results are kept in it if they score well enough instead of being logged.
+        If the output files are None, results are only returned.\n
+
+        worker_index: The index of the worker running this, for its progress counters\n
+        evaluators: If given (see get_evaluators), keys are checked with these instead of decoding the whole text
+
+        Returns: A list of (text_index, key, decoded_text, is_valid) for every result that was logged
+        '''
+        hits = []
+        num_hits = 0
+        for keyStart in self.starting_key_part:
+            for i in range(end - start):
+                index = start + i
+                # Add a second word to the key
+                for j in range(len(self.keys_to_test)):
+                    word = keyStart + self.keys_to_test[index] + self.keys_to_test[j]
+                    for text_index in range(len(self.encoded_texts)):
+                        # Only build the full decoded text for keys that are going to be logged
+                        if (evaluators != None):
+                            is_valid = evaluators[text_index].check(word)
+                            if (is_valid[0]):
+                                decoded_text = self.cipher_func(self.encoded_texts[text_index], word)
+                                if (output_1 != None):
+                                    self.check_solution(word, decoded_text, output_1, output_2, output_3, is_valid)
+                                hits.append((text_index, word, decoded_text, is_valid))
+                            continue
+
+                        decoded_text = self.cipher_func(self.encoded_texts[text_index], word)
+                        if (top_results != None):
+                            top_results.add(self.scorer.score(decoded_text), word, decoded_text)
+                        else:
+                            is_valid = self.contains_valid_word_by_size(decoded_text)
+                            if (output_1 != None):
+                                self.check_solution(word, decoded_text, output_1, output_2, output_3, is_valid)
+                            if (is_valid[0]):
+                                hits.append((text_index, word, decoded_text, is_valid))
+            
+                    if (j % 100000 == 0 and output_1 != None):
+                        output_1.flush()
+                        output_2.flush()
+                        output_3.flush()
+                        print(f'Checking {word}')
+
+                if (self.progress != None and worker_index != None):
+                    self.progress.add(worker_index, len(self.keys_to_test), len(hits) - num_hits)
+                    num_hits = len(hits)
+
+        return hits
+
+    def worker_func(self, chunks, worker_index: int) -> list[tuple[str, str]] | list[tuple[float, str, str]]:
+        '''
+        This is the function that is meant to be run by each worker. This will
+        test the keys in every (start_index, end_index) chunk it is handed.\n
+
+        Returns: The (text_index, key, decoded_text, is_valid) results with a valid word, or the best (score, key, decoded_text) results if top_results is on
         '''
         # Log start
-        print("Starting thread: " + str(thread_index))
+        print("Starting worker: " + str(worker_index))
+        if (self.profiler != None):
+            self.profiler.start_worker(worker_index)
         
-        # Check all words in section
-        with open(f'one_word_output_{thread_index}.txt', 'a') as out_file:
-            for keyStart in self.starting_key_part:
-                for i in range(end - start):
-                    index = start + i
-                    word = keyStart + self.keys_to_test[index]
-                    decoded_text = self.cipher_func(self.encoded_text, word)
-                    decoded_text_filtered = self.word_dict.filter_string(decoded_text, self.min_valid_word_length)
-                    if (self.word_dict.contains_valid_word(decoded_text_filtered)):
-                        output_text = f'key: {word} | text: {decoded_text}\n'
-                        print(output_text)
-                        out_file.write(output_text)
+        # Check all words in every section
+        hits = []
+        top_results = self.create_top_results()
+        evaluators = self.get_evaluators()
+        for start, end in chunks:
+            chunk_hits = self.test_keys(start, end, top_results, evaluators)
+            hits.extend(chunk_hits)
+            self.add_progress(worker_index, start, end, len(chunk_hits))
             
-        print(f'Ending thread: {thread_index}')
+        print(f'Ending worker: {worker_index}')
+
+        if (top_results != None):
+            return top_results.get_sorted()
+        return hits
     
-    def thread_func_two_word_keys(self, start: int, end: int, thread_index: int):
+    def stream_worker_func(self, chunks, worker_index: int) -> Iterator[tuple[int, str, str, tuple[bool, bool, bool]]]:
+        '''
+        Tests the keys in every chunk it is handed like worker_func, but yields the results
+        with a valid word as (text_index, key, decoded_text, is_valid) after every chunk.
         '''
-        This is the function that is meant to be run by each thread. This will
-        test keys within the given indices (inclusive), adding every key on top of 
-        it.
+        print("Starting worker: " + str(worker_index))
+        if (self.profiler != None):
+            self.profiler.start_worker(worker_index)
+
+        evaluators = self.get_evaluators()
+        for start, end in chunks:
+            chunk_hits = self.test_keys(start, end, None, evaluators)
+            self.add_progress(worker_index, start, end, len(chunk_hits))
+            yield from chunk_hits
+
+        print(f'Ending worker: {worker_index}')
+
+    def get_evaluators(self, is_two_word=False) -> list[LazyEvaluator] | None:
+        '''
+        Sets up a LazyEvaluator for each encoded text if lazy evaluation is on. Single word keys are checked like
+        contains_valid_word, and two word keys like contains_valid_word_by_size.\n
+
+        Returns: The evaluators, or None if keys should be checked on the whole decoded text
+        '''
+        if (not self.lazy or self.batch_cipher_func != None or self.top_results > 0):
+            return None
+
+        if (is_two_word):
+            evaluators = [LazyEvaluator(encoded_text, self.cipher_func, self.word_dict, self.separators) for encoded_text in self.encoded_texts]
+        else:
+            separators = (self.min_valid_word_length, self.separators[1], self.separators[2])
+            evaluators = [LazyEvaluator(encoded_text, self.cipher_func, self.word_dict, separators, True) for encoded_text in self.encoded_texts]
+
+        # Each evaluator decodes and checks in one step, so it is profiled as checking
+        if (self.profiler != None):
+            for evaluator in evaluators:
+                evaluator.check = self.profiler.wrap("validity", evaluator.check)
+
+        return evaluators
+
+    def create_top_results(self) -> TopResults | None:
+        '''
+        Returns a new TopResults for a worker to keep its best results in, or None if top_results is off. Keeping a
+        key is what logging it would be otherwise, so it is profiled as output.
+        '''
+        if (self.top_results <= 0):
+            return None
+
+        top_results = TopResults(self.top_results)
+        if (self.profiler != None):
+            top_results.add = self.profiler.wrap("output", top_results.add)
+        return top_results
+
+    def add_progress(self, worker_index: int, start: int, end: int, num_hits: int):
+        '''
+        Adds a finished chunk of single word keys to the worker's progress counters.
+        '''
+        if (self.progress != None):
+            self.progress.add(worker_index, (end - start) * len(self.starting_key_part), num_hits)
+
+    def get_two_word_output_file_paths(self, worker_index: int) -> list[str]:
+        '''
+        Returns the paths of the three two word output files of the given worker.
+        '''
+        return [f'two_word_output_{separator + 1}_letters_{worker_index}.txt' for separator in self.separators]
+
+    def worker_func_two_word_keys(self, chunks, worker_index: int, checkpoint: Checkpoint | None = None, collect_hits: bool = False) -> list[tuple[str, str]] | list[tuple[float, str, str]]:
+        '''
+        This is the function that is meant to be run by each worker. This will
+        test the keys in every (start_index, end_index) chunk it is handed, adding
+        every key on top of each one. If a checkpoint is given, every finished chunk is recorded in it.\n
+
+        collect_hits: If True, every logged result is also kept and returned
+
+        Returns: The logged (text_index, key, decoded_text, is_valid) results (or an empty list if collect_hits is off),
+            or the best (score, key, decoded_text) results if top_results is on
         '''
         # Log start
-        print("Starting thread: " + str(thread_index))
+        print("Starting worker: " + str(worker_index))
+        if (self.profiler != None):
+            self.profiler.start_worker(worker_index)
         
-        # Check all words in section
-        with open(f'two_word_output_{self.separators[0] + 1}_letters_{thread_index}.txt', 'w') as output_1, open(f'two_word_output_{self.separators[1] + 1}_letters_{thread_index}.txt', 'w') as output_2, open(f'two_word_output_{self.separators[2] + 1}_letters_{thread_index}.txt', 'w') as output_3:
-            for keyStart in self.starting_key_part:
-                for i in range(end - start):
-                    index = start + i
-                    # Add a second word to the key
-                    for j in range(len(self.keys_to_test)):
-                        word = keyStart + self.keys_to_test[index] + self.keys_to_test[j]
-                        decoded_text = self.cipher_func(self.encoded_text, word)
-                        is_valid = self.contains_valid_word_by_size(decoded_text)
-                        self.check_solution(word, decoded_text, output_1, output_2, output_3, is_valid)
-                
-                        if (j % 100000 == 0):
-                            output_1.flush()
-                            output_2.flush()
-                            output_3.flush()
-                            print(f'Checking {word}')
+        # Check all words in every section
+        hits = []
+        top_results = self.create_top_results()
+        evaluators = self.get_evaluators(is_two_word=True)
+        # A resumed run adds on to the output files of the earlier runs
+        file_mode = 'a' if checkpoint != None and checkpoint.run > 0 else 'w'
+        file_paths = self.get_two_word_output_file_paths(worker_index)
+        with open(file_paths[0], file_mode) as output_1, open(file_paths[1], file_mode) as output_2, open(file_paths[2], file_mode) as output_3:
+            for start, end in chunks:
+                chunk_hits = self.test_two_word_keys(start, end, output_1, output_2, output_3, top_results, worker_index, evaluators)
+                if (collect_hits):
+                    hits.extend(chunk_hits)
+                if (checkpoint != None):
+                    checkpoint.mark_complete((start, end), worker_index, [output_1, output_2, output_3], top_results)
             
-        print(f'Ending thread: {thread_index}')
-
-    def run_func_across_dict(self, func: Callable[[int, int, int], any]):
-        '''
-        Run the given function across every word in the given WordDictionary.\n
-        The function must accept a start_index, end_index, and thread_id as parameters.
-        '''
-        # Make the threads
-        threads = []
-        section_size = self.get_size_of_section(0, len(self.keys_to_test))
-        for i in range(self.num_cores - 1):
-            start_index = section_size * i
-            end_index = start_index + section_size - 1
-            print(f'{start_index}, {end_index}')
-            new_thread = threading.Thread(target=func, args=(start_index, end_index, i))
-            threads.append(new_thread)
+        print(f'Ending worker: {worker_index}')
+
+        if (top_results != None):
+            return top_results.get_sorted()
+        return hits
+
+    def stream_worker_func_two_word_keys(self, chunks, worker_index: int) -> Iterator[tuple[int, str, str, tuple[bool, bool, bool]]]:
+        '''
+        Tests the two word keys in every chunk it is handed like worker_func_two_word_keys, but yields the
+        results with a valid word as (text_index, key, decoded_text, is_valid) after every chunk.
+        '''
+        print("Starting worker: " + str(worker_index))
+        if (self.profiler != None):
+            self.profiler.start_worker(worker_index)
+
+        evaluators = self.get_evaluators(is_two_word=True)
+        for start, end in chunks:
+            yield from self.test_two_word_keys(start, end, None, None, None, None, worker_index, evaluators)
+
+        print(f'Ending worker: {worker_index}')
+
+    def get_key_costs(self, is_two_word=False) -> list[int]:
+        '''
+        Estimates how much work testing each key in keys_to_test is, using key length times the length of the ciphertexts.\n
+        For two word keys, this is the cost of testing the key with every key added on top of it.
+        '''
+        text_length = sum(len(encoded_text) for encoded_text in self.encoded_texts)
+        key_start_length = sum(len(key_start) for key_start in self.starting_key_part)
+        num_key_starts = len(self.starting_key_part)
+
+        if (not is_two_word):
+            return [(key_start_length + num_key_starts * len(key)) * text_length for key in self.keys_to_test]
         
-        last_thread_start_index = len(self.keys_to_test) - section_size - 15
-        last_thread_end_index = len(self.keys_to_test) - 1
-        print(f'{last_thread_start_index}, {last_thread_end_index}')
-        last_thread = threading.Thread(target=func, args=(last_thread_start_index, last_thread_end_index, self.num_cores - 1))
-        threads.append(last_thread)
+        total_key_length = sum(len(key) for key in self.keys_to_test)
+        num_keys = len(self.keys_to_test)
+        return [(num_keys * (key_start_length + num_key_starts * len(key)) + num_key_starts * total_key_length) * text_length for key in self.keys_to_test]
 
-        # Start the threads
-        for thread in threads:
-            thread.start()
+    def get_chunks(self, costs: list[int], num_chunks: int) -> list[tuple[int, int]]:
+        '''
+        Splits keys_to_test into at most num_chunks pieces of roughly equal cost. Every index is
+        in exactly one chunk, with no gaps or overlaps.\n
+
+        Returns: A list of (start_index, end_index) chunks, where end_index is not included
+        '''
+        total_cost = sum(costs)
+        chunks = []
+        start = 0
+        running_cost = 0
+        for i in range(len(costs)):
+            running_cost += costs[i]
+
+            # Close the chunk once it reaches its share of the total cost
+            if (running_cost * num_chunks >= total_cost * (len(chunks) + 1)):
+                chunks.append((start, i + 1))
+                start = i + 1
+        
+        if (start < len(costs)):
+            chunks.append((start, len(costs)))
 
-        # Wait for the threads to join
-        print("Now waiting for threads to finish")
-        for thread in threads:
-            thread.join()
+        return chunks
 
-    def concat_output_files(self, fname_prefix="two_word_output"):
+    def run_func_across_dict(self, func: Callable[[Iterator, int], list], is_two_word=False, chunks: list[tuple[int, int]] | None = None) -> list[tuple[str, str]]:
         '''
-        Combines multiple text files created by different threads into one,
-        deleting the old files.
+        Run the given function across every key in keys_to_test, using num_cores workers.\n
+        The function must accept an iterator of (start_index, end_index) chunks and a worker index as parameters,
+        and return a list of its results.\n
+
+        chunks: The chunks to run the function on. By default keys_to_test is split up with get_chunks\n
+
+        Returns: The results of every worker merged into one list
         '''
+        if (chunks == None):
+            chunks = self.get_chunks(self.get_key_costs(is_two_word), self.num_cores * CHUNKS_PER_WORKER)
+        print(f'Split {len(self.keys_to_test)} keys into {len(chunks)} chunks across {self.num_cores} {self.backend} workers')
+
+        self.start_progress(is_two_word, chunks)
+        is_profiling = self.start_profiling()
+        try:
+            pool = WorkerPool(self.num_cores, self.backend)
+            with self.word_dict.sharing(pool.backend):
+                results = pool.run(func, chunks)
+        finally:
+            if (is_profiling):
+                self.stop_profiling()
+            self.stop_progress()
+
+        merged = []
+        for worker_results in results:
+            merged.extend(worker_results)
+        return merged
+
+    def stream_func_across_dict(self, func: Callable[[Iterator, int], Iterator], is_two_word=False, max_pending: int = 1024) -> Iterator:
+        '''
+        Run the given generator function across every key in keys_to_test like run_func_across_dict,
+        yielding everything it yields as soon as a worker yields it.\n
+
+        max_pending: The most results that can wait to be read before the workers wait for the reader
+        '''
+        if (self.top_results > 0):
+            raise ValueError("The top results are only known once every key is tested, use the solve functions instead")
+
+        chunks = self.get_chunks(self.get_key_costs(is_two_word), self.num_cores * CHUNKS_PER_WORKER)
+        print(f'Split {len(self.keys_to_test)} keys into {len(chunks)} chunks across {self.num_cores} {self.backend} workers')
+
+        self.start_progress(is_two_word, chunks)
+        is_profiling = self.start_profiling()
+        try:
+            pool = WorkerPool(self.num_cores, self.backend)
+            with self.word_dict.sharing(pool.backend):
+                yield from pool.stream(func, chunks, max_pending)
+        finally:
+            if (is_profiling):
+                self.stop_profiling()
+            self.stop_progress()
+
+    def start_progress(self, is_two_word: bool, chunks: list[tuple[int, int]]):
+        '''
+        Starts tracking the progress of the workers through the given chunks, see Progress.
+        '''
+        self.progress = Progress(self.get_keyspace_size(is_two_word, chunks), self.num_cores, self.progress_interval, self.progress_path)
+        self.progress.start()
+
+    def stop_progress(self):
+        '''
+        Stops tracking progress, reporting the final progress of the run.
+        '''
+        if (self.progress != None):
+            self.progress.stop()
+            self.progress = None
+
+    def start_profiling(self) -> bool:
+        '''
+        If profiling is on, swaps the functions for each stage of testing a key for profiled versions, see StageProfiler.\n
+
+        Returns: Whether or not profiling was started here, False if it is off or was already started (ex: by solve,
+            so it also covers the ResultWriter). Only the caller that started it should stop it
+        '''
+        if (self.profile_sample_rate <= 0 or self.profiler != None):
+            return False
+
+        self.profiler = StageProfiler(self.num_cores, self.profile_sample_rate)
+        self.cipher_func = self.profiler.wrap("cipher", self.cipher_func)
+        if (self.batch_cipher_func != None):
+            self.batch_cipher_func = self.profiler.wrap("cipher", self.batch_cipher_func)
+        self.contains_valid_word = self.profiler.wrap("validity", self.contains_valid_word)
+        self.contains_valid_word_by_size = self.profiler.wrap("validity", self.contains_valid_word_by_size)
+        self.check_solution = self.profiler.wrap("output", self.check_solution)
+        return True
+
+    def stop_profiling(self):
+        '''
+        Prints the stage breakdown and puts the original functions back, if profiling is on.
+        '''
+        if (self.profiler == None):
+            return
+
+        self.profiler.print_breakdown()
+        self.cipher_func = self.cipher_func.func
+        if (self.batch_cipher_func != None):
+            self.batch_cipher_func = self.batch_cipher_func.func
+        del self.contains_valid_word
+        del self.contains_valid_word_by_size
+        del self.check_solution
+        self.profiler = None
+
+    def concat_output_files(self, fname_prefix="two_word_output", num_workers: int | None = None):
+        '''
+        Combines multiple text files created by different workers into one,
+        deleting the old files.\n
+        num_workers: How many worker indices have output files. By default this is num_cores
+        '''
+        if (num_workers == None):
+            num_workers = self.num_cores
+
         filenames = []
-        for i in range(self.num_cores):
+        for i in range(num_workers):
             filenames.append(f'{fname_prefix}_{i}.txt')
         with open(f'{fname_prefix}.txt', 'a') as outfile:
             for fname in filenames:
+                if (not os.path.exists(fname)):
+                    continue
+
                 with open(fname) as infile:
                     for line in infile:
                         outfile.write(line)
 
                 os.remove(fname)
 
+    def report_top_results(self, results: list[tuple[float, str, str]]) -> list[tuple[str, str]]:
+        '''
+        Merges the best results of every worker, writing the overall best to top_results.txt.\n
+
+        Returns: A list of (key, decoded_text) for the overall best results, from best to worst
+        '''
+        top_results = TopResults(self.top_results)
+        top_results.merge(results)
+        top_results.write('top_results.txt')
+
+        for score, key, decoded_text in top_results.get_sorted():
+            print(f'score: {score:.2f} | key: {key} | text: {decoded_text}')
+
+        return [(key, decoded_text) for score, key, decoded_text in top_results.get_sorted()]
+
+    def contains_valid_word(self, text: str) -> bool:
+        '''
+        Returns whether or not the given text has a valid word at least min_valid_word_length long.
+        '''
+        return self.word_dict.contains_valid_word(self.word_dict.filter_string(text, self.min_valid_word_length))
+
+    def get_single_word_validity(self, text: str) -> tuple[bool, bool, bool]:
+        '''
+        Returns the three bools of a single word key's result like contains_valid_word_by_size, except that the first is
+        the same as contains_valid_word: words are counted from min_valid_word_length letters, with any character
+        not in the alphabet dropped from them.
+        '''
+        words = self.word_dict.filter_string(text, self.min_valid_word_length).split(' ')
+        longest = max((len(word) for word in words if word != "" and word in self.word_dict.word_set), default=0)
+        return (longest > 0, longest > self.separators[1], longest > self.separators[2])
+
     def contains_valid_word_by_size(self, text: str) -> tuple[bool, bool, bool]:
         '''
         Returns three bools of decreasing security, using the separators property to separate the output by 
@@ -188,12 +625,13 @@ class DictCompare:
         '''
         out1 = False
         out2 = False
+        word_set = self.word_dict.word_set
         text_ar = text.replace('.', '').split(' ')
         for word in text_ar:
             if (len(word) < self.separators[0]):
                 continue
 
-            if (self.word_dict.is_word(word)):
+            if (word in word_set):
                 out1 = True
 
                 if (len(word) > self.separators[1]):
@@ -263,7 +701,168 @@ class DictCompare:
         
         return possible_keys
 
-    
+
+    def get_encoded_words(self) -> list[tuple[str, int]]:
+        '''
+        Gets every encoded word along with where it starts in the encoded text, counting only alphabet characters
+        (which are the only characters that move the key along).\n
+
+        Returns: A list of (word, offset)
+        '''
+        words = []
+        offset = 0
+        for word in self.word_dict.filter_string(self.encoded_text, 1).split(' '):
+            if (word != ""):
+                words.append((word, offset))
+            offset += len(word)
+        return words
+
+    def build_key_indexes(self) -> tuple[dict[int, list[str]], dict[tuple[int, str], list[str]], dict[tuple[int, str], list[str]], dict[tuple[int, int, str], set[str]]]:
+        '''
+        Indexes keys_to_test by length, by length and every prefix and suffix, and by length and the letter at each position.\n
+
+        Returns: (keys_by_size, prefix_index, suffix_index, letter_index)
+        '''
+        keys_by_size = {}
+        prefix_index = {}
+        suffix_index = {}
+        letter_index = {}
+        for key in sorted(set(self.keys_to_test)):
+            keys_by_size.setdefault(len(key), []).append(key)
+            for i in range(len(key)):
+                prefix_index.setdefault((len(key), key[:i + 1]), []).append(key)
+                suffix_index.setdefault((len(key), key[-i - 1:]), []).append(key)
+                letter_index.setdefault((len(key), i, key[i]), set()).add(key)
+
+        return (keys_by_size, prefix_index, suffix_index, letter_index)
+
+    def get_matching_keys(self, size: int, constraints: dict[int, str], key_indexes) -> list[str]:
+        '''
+        Gets every key of the given size that has the given letters at the given offsets.\n
+
+        constraints: A dictionary of offset -> letter\n
+        key_indexes: The indexes returned by build_key_indexes
+        '''
+        keys_by_size, prefix_index, suffix_index, letter_index = key_indexes
+        if (len(constraints) == 0):
+            return keys_by_size.get(size, [])
+
+        # The longest run of constraints at the start or end of the key can be looked up directly
+        prefix_length = 0
+        while (prefix_length in constraints):
+            prefix_length += 1
+        suffix_length = 0
+        while (size - 1 - suffix_length in constraints):
+            suffix_length += 1
+
+        if (prefix_length >= suffix_length and prefix_length > 0):
+            candidates = prefix_index.get((size, "".join(constraints[i] for i in range(prefix_length))), [])
+            remaining = [i for i in constraints if i >= prefix_length]
+        elif (suffix_length > 0):
+            candidates = suffix_index.get((size, "".join(constraints[i] for i in range(size - suffix_length, size))), [])
+            remaining = [i for i in constraints if i < size - suffix_length]
+        else:
+            candidates = keys_by_size.get(size, [])
+            remaining = list(constraints)
+
+        if (len(remaining) == 0 or len(candidates) == 0):
+            return candidates
+
+        # Any other constraints are checked by intersecting with the keys that have each letter in place
+        matching = set(candidates).intersection(*[letter_index.get((size, i, constraints[i]), ()) for i in remaining])
+        return sorted(matching)
+
+    def get_aligned_words(self, min_word_size: int) -> 'list[tuple[str, int, np.ndarray, list[str]]]':
+        '''
+        Gets every encoded word at least min_word_size letters long along with its key fragments from get_possible_keys,
+        as a matrix of alphabet indices (one row per fragment) so they can be checked against a key all at once.\n
+
+        Returns: A list of (encoded_word, offset, fragments, valid_words), where offset is where the word starts in the
+            letters of the encoded text (see get_encoded_words) and valid_words[i] is the word that fragments[i] decodes it to
+        '''
+        import numpy as np
+
+        # Maps an ascii code to its index in the alphabet
+        alphabet = self.word_dict.ALPHABET
+        code_to_index = np.zeros(256, dtype=np.int64)
+        code_to_index[[ord(letter) for letter in alphabet]] = np.arange(len(alphabet))
+
+        encoded_words = [(word, offset) for word, offset in self.get_encoded_words() if len(word) >= min_word_size]
+        aligned_words = []
+        for (encoded_word, offset), keys in zip(encoded_words, self.get_possible_keys(min_word_size)):
+            codes = np.frombuffer("".join(keys).encode('ascii'), dtype=np.uint8)
+            fragments = code_to_index[codes].reshape(len(keys), len(encoded_word))
+            aligned_words.append((encoded_word, offset, fragments, list(self.word_dict.get_words_of_size(len(encoded_word)))))
+
+        return aligned_words
+
+    def get_word_columns(self, aligned_words: 'list[tuple[str, int, np.ndarray, list[str]]]', key_length: int) -> 'list[tuple[np.ndarray, np.ndarray, list[str]]]':
+        '''
+        Lines every aligned word up with a key of the given length. A word longer than the key uses some key letters
+        more than once, so only the fragments that repeat every key_length letters can be part of the key.\n
+
+        Returns: A list of (columns, fragment_bits, valid_words) for every aligned word, where columns is the key column
+            each letter of the word is shifted by, and fragment_bits has a row for every fragment that fits with the
+            bit of each of its letters (1 << alphabet index)
+        '''
+        import numpy as np
+
+        word_columns = []
+        for encoded_word, offset, fragments, valid_words in aligned_words:
+            columns = (offset + np.arange(len(encoded_word))) % key_length
+            if (len(encoded_word) > key_length):
+                fits = np.flatnonzero(np.all(fragments[:, :-key_length] == fragments[:, key_length:], axis=1))
+                fragments = fragments[fits]
+                valid_words = [valid_words[i] for i in fits]
+
+            word_columns.append((columns, np.left_shift(1, fragments), valid_words))
+
+        return word_columns
+
+    def search_alignment(self, columns_bits: 'np.ndarray', word_columns: 'list[tuple[np.ndarray, np.ndarray, list[str]]]') -> 'Iterator[tuple[np.ndarray, list[int]]]':
+        '''
+        Finds every key where every one of the given words decodes to a valid word. Each column of the key has a bitset
+        of the letters it could still be. Every word narrows each column it touches down to the letters its fitting
+        fragments have there, which can rule out fragments of other words, so this is repeated until nothing changes.
+        If a word still has more than one fragment left, each of them is tried in turn, starting with the word with the fewest.\n
+
+        columns_bits: The bitset of letters each column of the key could be\n
+        word_columns: The words to decode, from get_word_columns
+
+        Returns: An iterator of (columns_bits, fragment_rows) for every key found, where every column has a single letter
+            and fragment_rows is the row of the fragment each word uses
+        '''
+        import numpy as np
+
+        changed = True
+        while (changed):
+            changed = False
+            compatible_rows = []
+            for columns, fragment_bits, valid_words in word_columns:
+                # A fragment fits if every one of its letters is still allowed in its column
+                rows = np.flatnonzero(np.all(fragment_bits & columns_bits[columns] != 0, axis=1))
+                if (len(rows) == 0):
+                    return
+                compatible_rows.append(rows)
+
+                narrowed = columns_bits.copy()
+                np.bitwise_and.at(narrowed, columns, np.bitwise_or.reduce(fragment_bits[rows], axis=0))
+                if (np.any(narrowed != columns_bits)):
+                    columns_bits = narrowed
+                    changed = True
+
+        open_words = [i for i in range(len(word_columns)) if len(compatible_rows[i]) > 1]
+        if (len(open_words) == 0):
+            yield (columns_bits, [int(rows[0]) for rows in compatible_rows])
+            return
+
+        word_index = min(open_words, key=lambda i: len(compatible_rows[i]))
+        columns, fragment_bits, valid_words = word_columns[word_index]
+        for row in compatible_rows[word_index]:
+            branch_bits = columns_bits.copy()
+            branch_bits[columns] = fragment_bits[row]
+            yield from self.search_alignment(branch_bits, word_columns)
+
     ### SOLVING FUNCTIONS ###
     
     def quick_solve(self, min_word_size=5):
@@ -279,34 +878,420 @@ class DictCompare:
             print("Error: No reverse cipher function provided")
             return
 
+        last_word = None
+        for word, key, matches in self.iter_quick_solve(min_word_size):
+            if (word != last_word):
+                print(f'Checking {word}')
+                last_word = word
+
+            print(f'\033[31mPossible key for {word}:')
+            print(f'\tKey: {key}')
+            print(f'\tWords in key: {", ".join(f"{match} (at {offset})" for offset, match in matches)}')
+            print(f'\tDecoded: {self.cipher_func(word, key)}\033[0m')
+
+    def iter_quick_solve(self, min_word_size=5) -> Iterator[tuple[str, str, list[tuple[int, str]]]]:
+        '''
+        Finds the same keys as quick_solve, yielding each one as soon as it is found instead of printing it.\n
+
+        Returns: An iterator of (encoded_word, key, matches), where matches is a list of (offset, word) for every
+            valid word in the key
+        '''
+        if (self.rev_cipher_func == None):
+            raise ValueError("No reverse cipher function provided")
+
         text_list = self.word_dict.filter_string(self.encoded_text, min_word_size).split(' ')
         possible_keys = self.get_possible_keys(min_word_size)
 
         for i in range(len(possible_keys)):
             word = text_list[i]
-            possible_keys_for_word = possible_keys[i]
-            print(f'Checking {word}')
-            for key in possible_keys_for_word:
-                if (self.word_dict.key_contains_valid_word(key, min_word_size)):
-                    print(f'\033[31mPossible key for {word}:')
-                    print(f'\tKey: {key}')
-                    print(f'\tDecoded: {self.cipher_func(word, key)}\033[0m')
+            for key in possible_keys[i]:
+                matches = self.word_dict.find_valid_words_in_key(key, min_word_size)
+                if (len(matches) > 0):
+                    yield (word, key, matches)
+
+    def solve_aligned_keys(self, min_word_size=4, max_key_length=20, max_skipped_words=1, num_results=20) -> list[tuple[str, str]]:
+        '''
+        Finds whole keys that decode several encoded words into valid words at once, and prints them along with their
+        decoded text. See iter_aligned_keys.\n
+
+        num_results: How many keys to find before stopping
+
+        Returns: A list of (key, decoded_text) for every key found
+        '''
+        if (self.rev_cipher_func == None):
+            print("Error: No reverse cipher function provided")
+            return []
+
+        hits = []
+        for key, matches in itertools.islice(self.iter_aligned_keys(min_word_size, max_key_length, max_skipped_words), num_results):
+            decoded_text = self.cipher_func(self.encoded_text, key)
+            hits.append((key, decoded_text))
+
+            print(f'\033[31mPossible key: {key}')
+            print(f'\tWords decoded: {", ".join(f"{encoded_word} -> {valid_word}" for encoded_word, valid_word in matches)}')
+            print(f'\tDecoded: {decoded_text}\033[0m')
 
+        return hits
 
-    def solve(self):
+    def iter_aligned_keys(self, min_word_size=4, max_key_length=20, max_skipped_words=1, min_matched_words=2) -> Iterator[tuple[str, list[tuple[str, str]]]]:
+        '''
+        Finds whole keys that decode several encoded words into valid words at once. quick_solve looks at the key fragments
+        of each encoded word on its own, but they all come from the same repeating key: for a given key length, each encoded
+        word starts at a known column of the key, so the fragments of words that share a column have to agree there.
+        Each column keeps a bitset of the letters every word still allows in it, which narrows thousands of fragments down
+        to the few keys that fit every word (see search_alignment). Only keys where every column is decided are found.\n
+        Keys that fit every encoded word come first, then keys that leave out one word (ex: a name that isn't in
+        the dictionary), and so on, each from the shortest key length up.\n
+
+        min_word_size: The shortest encoded word to use\n
+        max_key_length: The longest key length to try\n
+        max_skipped_words: How many of the encoded words are allowed to not decode to a valid word\n
+        min_matched_words: The fewest encoded words a key has to decode to valid words
+
+        Returns: An iterator of (key, matches), where matches is a list of (encoded_word, valid_word) for every word the key decodes
+        '''
+        if (self.rev_cipher_func == None):
+            raise ValueError("No reverse cipher function provided")
+
+        import numpy as np
+
+        aligned_words = self.get_aligned_words(min_word_size)
+        word_columns_by_length = {}
+        found_keys = set()
+        all_letters = (1 << len(self.word_dict.ALPHABET)) - 1
+
+        for num_skipped in range(min(max_skipped_words, len(aligned_words)) + 1):
+            if (len(aligned_words) - num_skipped < min_matched_words):
+                break
+
+            for key_length in range(1, max_key_length + 1):
+                if (not key_length in word_columns_by_length):
+                    word_columns_by_length[key_length] = self.get_word_columns(aligned_words, key_length)
+                word_columns = word_columns_by_length[key_length]
+
+                for skipped in itertools.combinations(range(len(aligned_words)), num_skipped):
+                    used = [i for i in range(len(aligned_words)) if not i in skipped]
+
+                    # A column no word touches could be any letter, so there is no whole key to find
+                    covered = np.zeros(key_length, dtype=bool)
+                    for i in used:
+                        covered[word_columns[i][0]] = True
+                    if (not np.all(covered)):
+                        continue
+
+                    for columns_bits, fragment_rows in self.search_alignment(np.full(key_length, all_letters, dtype=np.int64), [word_columns[i] for i in used]):
+                        key = "".join(self.word_dict.ALPHABET[int(bits).bit_length() - 1] for bits in columns_bits)
+
+                        # A key that is a shorter key repeated was already found at the shorter length
+                        if (key in found_keys or (key + key).find(key, 1) < len(key)):
+                            continue
+                        found_keys.add(key)
+
+                        yield (key, [(aligned_words[used[i]][0], word_columns[used[i]][2][fragment_rows[i]]) for i in range(len(used))])
+
+
+    def solve(self, collect_hits: bool = False) -> list[tuple[str, str]] | None:
         '''
         Try every single valid word as a key, reporting which results
-        have a valid word in themselves.
+        have a valid word in themselves. With several encoded texts, each text has its own output file.\n
+
+        collect_hits: If True, every reported result is also kept in a list and returned. There can be a lot of them,
+            so by default they are only written to the output file (use iter_solutions to handle them as they come instead)
+
+        Returns: If collect_hits is on, a list of (key, decoded_text) for every reported result, or (text_index, key, decoded_text)
+            if there are several encoded texts. If top_results is on, the overall best results (see report_top_results)
         '''
         self.print_estimated_run_time()
-        self.run_func_across_dict(self.thread_func)
-        self.concat_output_files(fname_prefix="one_word_output")
+        if (self.top_results > 0):
+            return self.report_top_results(self.run_func_across_dict(self.worker_func))
+
+        hits = [] if collect_hits else None
+        with self.open_result_writer(self.get_final_output_file_paths("one_word_output", [None]), print_level=0, num_levels=1) as writer:
+            for text_index, key, decoded_text, is_valid in self.iter_batch_solutions():
+                writer.write(key, decoded_text, is_valid, text_index)
+                if (collect_hits):
+                    hits.append(self.get_hit(text_index, key, decoded_text))
+        return hits
+
+    def iter_solutions(self, max_pending: int = 1024) -> Iterator[tuple[str, str, tuple[bool, bool, bool]]]:
+        '''
+        Try every single valid word as a key like solve, yielding every result with a valid word in it as
+        (key, decoded_text, is_valid) as soon as a worker finds it. Nothing is written to the output files.\n
+
+        max_pending: The most results that can wait to be read before the workers wait for the reader
+        '''
+        if (len(self.encoded_texts) > 1):
+            raise ValueError("There are several encoded texts, use iter_batch_solutions to know which text each result is for")
+
+        for text_index, key, decoded_text, is_valid in self.iter_batch_solutions(max_pending):
+            yield (key, decoded_text, is_valid)
+
+    def iter_batch_solutions(self, max_pending: int = 1024) -> Iterator[tuple[int, str, str, tuple[bool, bool, bool]]]:
+        '''
+        Try every single valid word as a key on every encoded text like iter_solutions, yielding every result with a
+        valid word in it as (text_index, key, decoded_text, is_valid). Each key is only made once, however many texts there are.\n
+
+        max_pending: The most results that can wait to be read before the workers wait for the reader
+        '''
+        yield from self.stream_func_across_dict(self.stream_worker_func, False, max_pending)
+
+    def get_final_output_file_paths(self, fname_prefix: str, separators: list) -> list[str]:
+        '''
+        Returns the paths of the final output files for each separator (ex: two_word_output_5_letters.txt, or
+        one_word_output.txt if the separator is None), with every encoded text's files one after another if there
+        are several (ex: two_word_output_5_letters_text_0.txt).
+        '''
+        names = [fname_prefix if separator == None else f'{fname_prefix}_{separator + 1}_letters' for separator in separators]
+        if (len(self.encoded_texts) == 1):
+            return [f'{name}.txt' for name in names]
+        return [f'{name}_text_{text_index}.txt' for text_index in range(len(self.encoded_texts)) for name in names]
+
+    @contextmanager
+    def open_result_writer(self, file_paths: list[str], print_level: int | None = 1, num_levels: int = 3) -> Iterator[ResultWriter]:
+        '''
+        Opens a ResultWriter for streamed results. The results are logged by the writer's thread, so if profiling is on
+        it is started here and lasts until the writer has written every result.
+        '''
+        is_profiling = self.start_profiling()
+        try:
+            with ResultWriter(file_paths, print_level, num_levels=num_levels) as writer:
+                if (is_profiling):
+                    self.profiler.wrap_writer(writer)
+                yield writer
+        finally:
+            if (is_profiling):
+                self.stop_profiling()
+
+    def get_hit(self, text_index: int, key: str, decoded_text: str) -> tuple:
+        '''
+        Returns a reported result as solve returns it: (key, decoded_text), or (text_index, key, decoded_text)
+        if there are several encoded texts.
+        '''
+        if (len(self.encoded_texts) == 1):
+            return (key, decoded_text)
+        return (text_index, key, decoded_text)
     
-    def solve_two_word_keys(self):
+    def solve_two_word_keys(self, checkpoint_path: str | None = None, collect_hits: bool = False) -> list[tuple[str, str]] | None:
         '''
         Try every single combination of two valid words as a key, 
-        reporting which results have a valid word in themselves.
+        reporting which results have a valid word in themselves. With several encoded texts, each text has its own output files.\n
+
+        checkpoint_path: If given, every finished chunk is recorded in this file, so the run can be picked
+            back up with resume_two_word_keys if it is stopped. The file is deleted once the run finishes.\n
+        collect_hits: If True, every reported result is also kept in a list and returned. There can be a lot of them,
+            so by default they are only written to the output files (use iter_two_word_keys to handle them as they come instead)
+
+        Returns: If collect_hits is on, a list of (key, decoded_text) for every reported result, or (text_index, key, decoded_text)
+            if there are several encoded texts. If top_results is on, the overall best results (see report_top_results)
         '''
         self.print_estimated_run_time(True)
-        self.run_func_across_dict(self.thread_func_two_word_keys)
-        self.concat_output_files()
+
+        # Without a checkpoint or top results, every result goes straight to the final output files
+        if (checkpoint_path == None and self.top_results == 0):
+            hits = [] if collect_hits else None
+            with self.open_result_writer(self.get_final_output_file_paths("two_word_output", self.separators)) as writer:
+                for text_index, key, decoded_text, is_valid in self.iter_batch_two_word_keys():
+                    writer.write(key, decoded_text, is_valid, text_index)
+                    if (collect_hits):
+                        hits.append(self.get_hit(text_index, key, decoded_text))
+            return hits
+
+        if (len(self.encoded_texts) > 1):
+            raise ValueError("Checkpoints only work with a single encoded text")
+
+        checkpoint = None
+        if (checkpoint_path != None):
+            chunks = self.get_chunks(self.get_key_costs(True), self.num_cores * CHUNKS_PER_WORKER)
+            checkpoint = Checkpoint.create(checkpoint_path, self.get_checkpoint_fingerprint(), chunks)
+
+        return self.run_two_word_keys(checkpoint, collect_hits)
+
+    def iter_two_word_keys(self, max_pending: int = 1024) -> Iterator[tuple[str, str, tuple[bool, bool, bool]]]:
+        '''
+        Try every single combination of two valid words as a key like solve_two_word_keys, yielding every result
+        with a valid word in it as (key, decoded_text, is_valid) as soon as a worker finds it.
+        Nothing is written to the output files.\n
+
+        max_pending: The most results that can wait to be read before the workers wait for the reader
+        '''
+        if (len(self.encoded_texts) > 1):
+            raise ValueError("There are several encoded texts, use iter_batch_two_word_keys to know which text each result is for")
+
+        for text_index, key, decoded_text, is_valid in self.iter_batch_two_word_keys(max_pending):
+            yield (key, decoded_text, is_valid)
+
+    def iter_batch_two_word_keys(self, max_pending: int = 1024) -> Iterator[tuple[int, str, str, tuple[bool, bool, bool]]]:
+        '''
+        Try every single combination of two valid words as a key on every encoded text like iter_two_word_keys,
+        yielding every result with a valid word in it as (text_index, key, decoded_text, is_valid).\n
+
+        max_pending: The most results that can wait to be read before the workers wait for the reader
+        '''
+        yield from self.stream_func_across_dict(self.stream_worker_func_two_word_keys, True, max_pending)
+
+    def resume_two_word_keys(self, checkpoint_path: str, collect_hits: bool = False) -> list[tuple[str, str]] | None:
+        '''
+        Picks a stopped solve_two_word_keys back up from its checkpoint, skipping every finished chunk and
+        adding on to the existing output files. The DictCompare must have the same settings as the stopped run.\n
+
+        collect_hits: If True, every result reported since resuming is also kept in a list and returned
+
+        Returns: If collect_hits is on, a list of (key, decoded_text) for every result reported since resuming (or the overall best
+        results if top_results is on). The output files have the results of every run.
+        '''
+        if (len(self.encoded_texts) > 1):
+            raise ValueError("Checkpoints only work with a single encoded text")
+
+        checkpoint = Checkpoint.load(checkpoint_path, self.get_checkpoint_fingerprint())
+        checkpoint.restore_outputs(self.get_two_word_output_file_paths, self.num_cores)
+        print(f'Resuming from {checkpoint_path}, {len(checkpoint.chunks) - len(checkpoint.get_remaining_chunks())} of {len(checkpoint.chunks)} chunks already finished')
+
+        return self.run_two_word_keys(checkpoint, collect_hits)
+
+    def run_two_word_keys(self, checkpoint: Checkpoint | None, collect_hits: bool = False) -> list[tuple[str, str]] | None:
+        '''
+        Runs the two word key test across all the workers, then combines and reports the results.\n
+
+        collect_hits: If True, every logged result is kept and returned, see worker_func_two_word_keys
+        '''
+        if (checkpoint == None):
+            hits = self.run_func_across_dict(partial(self.worker_func_two_word_keys, collect_hits=collect_hits), True)
+            num_workers = self.num_cores
+        else:
+            hits = self.run_func_across_dict(partial(self.worker_func_two_word_keys, checkpoint=checkpoint, collect_hits=collect_hits), True, checkpoint.get_remaining_chunks())
+            num_workers = checkpoint.get_num_workers(self.num_cores)
+
+        for separator in self.separators:
+            self.concat_output_files(fname_prefix=f'two_word_output_{separator + 1}_letters', num_workers=num_workers)
+
+        if (self.top_results > 0):
+            if (checkpoint != None):
+                hits.extend(checkpoint.get_saved_top_results())
+            hits = self.report_top_results(hits)
+        elif (collect_hits):
+            hits = [(key, decoded_text) for text_index, key, decoded_text, is_valid in hits]
+        else:
+            hits = None
+
+        if (checkpoint != None):
+            checkpoint.remove()
+        return hits
+
+    def get_checkpoint_fingerprint(self) -> str:
+        '''
+        Returns a hash of every setting that changes which keys are tested or how results are reported.
+        '''
+        return Checkpoint.get_fingerprint([self.encoded_text, self.cipher_func.__name__, self.separators, self.starting_key_part,
+                                           self.keys_to_test, self.word_dict.ALPHABET, self.top_results])
+
+    def solve_two_word_keys_constrained(self, num_anchor_words=3, collect_hits: bool = False) -> list[tuple[str, str]] | None:
+        '''
+        Try two word keys like solve_two_word_keys, but only the pairs of words that could decode one of the longest
+        encoded words into a valid word (see iter_two_word_keys_constrained). Every result is written to the two word output files.\n
+
+        num_anchor_words: How many of the longest encoded words to find pairs for, see iter_two_word_keys_constrained\n
+        collect_hits: If True, every reported result is also kept in a list and returned
+
+        Returns: If collect_hits is on, a list of (key, decoded_text) for every reported result
+        '''
+        if (self.rev_cipher_func == None):
+            print("Error: No reverse cipher function provided")
+            return [] if collect_hits else None
+
+        hits = [] if collect_hits else None
+        with self.open_result_writer([f'two_word_output_{separator + 1}_letters.txt' for separator in self.separators]) as writer:
+            for key, decoded_text, is_valid in self.iter_two_word_keys_constrained(num_anchor_words):
+                writer.write(key, decoded_text, is_valid)
+                if (collect_hits):
+                    hits.append((key, decoded_text))
+        return hits
+
+    def iter_two_word_keys_constrained(self, num_anchor_words=3) -> Iterator[tuple[str, str, tuple[bool, bool, bool]]]:
+        '''
+        Try two word keys like iter_two_word_keys, but only the pairs of words that could decode one of the longest encoded words
+        (of the first encoded text) into a valid word, yielding every result with a valid word in it as (key, decoded_text, is_valid).
+        This only finds keys where at least one of those words really is valid once decoded.\n
+        Every valid word an encoded word could decode to forces part of the key (found with rev_cipher_func).
+        For every key length, the first and second words that fit those forced letters are looked up by their
+        prefixes and suffixes, and only those pairs are fully decoded.\n
+
+        num_anchor_words: How many of the longest encoded words to find pairs for. Each one finds its own pairs,
+            so using more finds keys even if some of the long words aren't in the dictionary, but decodes more pairs.
+        '''
+        if (self.rev_cipher_func == None):
+            raise ValueError("No reverse cipher function provided")
+
+        anchor_words = sorted(self.get_encoded_words(), key=lambda word: len(word[0]), reverse=True)[:num_anchor_words]
+        key_indexes = self.build_key_indexes()
+        key_sizes = sorted(key_indexes[0])
+        key_lengths = sorted(set(first_size + second_size for first_size in key_sizes for second_size in key_sizes))
+
+        num_tested = 0
+        for anchor_index in range(len(anchor_words)):
+            encoded_word, word_offset = anchor_words[anchor_index]
+            for valid_word in self.word_dict.get_words_of_size(len(encoded_word)):
+                key_part = self.rev_cipher_func(valid_word, encoded_word)
+
+                # A key decodes the anchor word to exactly one word, so the same key can only come up again under
+                # this valid word (through another starting key part or split between the two words) or under
+                # another anchor word. Only the first case needs remembering, which keeps the set small
+                tested_keys = set()
+                for key_start in self.starting_key_part:
+                    for key_length in key_lengths:
+                        for key in self.get_constrained_keys(key_start, len(key_start) + key_length, key_part, word_offset, key_indexes):
+                            if (key in tested_keys):
+                                continue
+                            tested_keys.add(key)
+
+                            # Every key that decodes an earlier anchor word into a valid word was already tested with it
+                            if (any(self.decodes_anchor_word(key, *anchor_word) for anchor_word in anchor_words[:anchor_index])):
+                                continue
+                            num_tested += 1
+
+                            decoded_text = self.cipher_func(self.encoded_text, key)
+                            is_valid = self.contains_valid_word_by_size(decoded_text)
+                            if (is_valid[0]):
+                                yield (key, decoded_text, is_valid)
+
+        print(f'Fully decoded {num_tested} of {len(self.keys_to_test) ** 2 * len(self.starting_key_part)} possible keys')
+
+    def decodes_anchor_word(self, key: str, encoded_word: str, word_offset: int) -> bool:
+        '''
+        Returns whether or not the key decodes the encoded word, which starts word_offset letters into the encoded text
+        (see get_encoded_words), into a valid word.
+        '''
+        # Line the key up with the start of the word
+        shift = word_offset % len(key)
+        return self.word_dict.is_word(self.cipher_func(encoded_word, key[shift:] + key[:shift]))
+
+    def get_constrained_keys(self, key_start: str, key_length: int, key_part: str, word_offset: int, key_indexes) -> Iterator[str]:
+        '''
+        Yields every key of the given length made of key_start, a first word and a second word that has
+        key_part starting at word_offset in the repeated key.\n
+
+        key_indexes: The indexes returned by build_key_indexes
+        '''
+        # The letters of the key that key_part forces, with the key wrapping around the word
+        forced = {}
+        for i in range(len(key_part)):
+            position = (word_offset + i) % key_length
+            if (forced.setdefault(position, key_part[i]) != key_part[i]):
+                return
+        for i in range(len(key_start)):
+            if (forced.get(i, key_start[i]) != key_start[i]):
+                return
+
+        for first_size in key_indexes[0]:
+            second_start = len(key_start) + first_size
+            second_size = key_length - second_start
+            if (not second_size in key_indexes[0]):
+                continue
+
+            first_words = self.get_matching_keys(first_size, {i - len(key_start): letter for i, letter in forced.items() if i < second_start and i >= len(key_start)}, key_indexes)
+            if (len(first_words) == 0):
+                continue
+            second_words = self.get_matching_keys(second_size, {i - second_start: letter for i, letter in forced.items() if i >= second_start}, key_indexes)
+
+            for first_word in first_words:
+                for second_word in second_words:
+                    yield key_start + first_word + second_word
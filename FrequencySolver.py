@@ -0,0 +1,185 @@
+from collections.abc import Callable
+from vigenere import ALPHABET, get_cipher_funcs
+
+# How often each letter appears in english text
+ENGLISH_LETTER_FREQUENCIES = {
+    'a': 0.08167, 'b': 0.01492, 'c': 0.02782, 'd': 0.04253, 'e': 0.12702, 'f': 0.02228, 'g': 0.02015,
+    'h': 0.06094, 'i': 0.06966, 'j': 0.00153, 'k': 0.00772, 'l': 0.04025, 'm': 0.02406, 'n': 0.06749,
+    'o': 0.07507, 'p': 0.01929, 'q': 0.00095, 'r': 0.05987, 's': 0.06327, 't': 0.09056, 'u': 0.02758,
+    'v': 0.00978, 'w': 0.02360, 'x': 0.00150, 'y': 0.01974, 'z': 0.00074,
+}
+
+class FrequencySolver:
+    def __init__(self, encoded_text: str, cipher_func: Callable[[str, str], str] | str, max_key_length: int = 20, alphabet: list[str] = ALPHABET):
+        '''
+        Will try and solve the given cipher by guessing the key length from the statistics of the
+        encoded text, then solving every letter of the key on its own using english letter frequencies.\n
+        This works for any cipher where each letter of the key shifts its own column of the text
+        (vigenere, beaufort and variant beaufort), and needs a decent amount of encoded text to work well.\n
+
+        encoded_text: The encoded string of text\n
+        cipher_func: The cipher function to call that decodes a given string, or the name of a cipher in vigenere.CIPHER_FUNCS\n
+        max_key_length: The longest key length to consider\n
+        alphabet: A list of characters representing the possible characters in the alphabet.
+        '''
+        self.encoded_text = encoded_text
+        self.cipher_func = get_cipher_funcs(cipher_func)[1] if isinstance(cipher_func, str) else cipher_func
+        self.max_key_length = max_key_length
+        self.alphabet = alphabet
+
+        # Only alphabet characters move the key along, so the statistics only look at those
+        self.letters = "".join(character for character in encoded_text.lower() if character in alphabet)
+
+    def get_columns(self, key_length: int) -> list[str]:
+        '''
+        Splits the encoded letters into the columns encoded by each letter of a key of the given length.
+        '''
+        return [self.letters[i::key_length] for i in range(key_length)]
+
+    def index_of_coincidence(self, text: str) -> float:
+        '''
+        Returns the chance that two letters picked from the text are the same.
+        English text is around 0.067, while random letters are around 0.038.
+        '''
+        if (len(text) < 2):
+            return 0.0
+
+        total = 0
+        for letter in self.alphabet:
+            count = text.count(letter)
+            total += count * (count - 1)
+
+        return total / (len(text) * (len(text) - 1))
+
+    def get_repeat_distances(self, sequence_length: int = 3) -> list[int]:
+        '''
+        Finds the distance between every pair of repeated letter sequences in the encoded letters (the Kasiski test).
+        A repeat is likely to be the same plaintext under the same part of the key, so its distance is likely a
+        multiple of the key length.
+        '''
+        last_seen = {}
+        distances = []
+        for i in range(len(self.letters) - sequence_length + 1):
+            sequence = self.letters[i:i + sequence_length]
+            if (sequence in last_seen):
+                distances.append(i - last_seen[sequence])
+            last_seen[sequence] = i
+
+        return distances
+
+    def estimate_key_lengths(self) -> list[tuple[int, float]]:
+        '''
+        Scores every key length up to max_key_length by the average index of coincidence of its columns,
+        boosted by how many Kasiski repeat distances it divides more often than chance.\n
+
+        Returns: A list of (key_length, score) from most to least likely
+        '''
+        distances = self.get_repeat_distances()
+        max_length = max(1, min(self.max_key_length, len(self.letters) // 2))
+
+        scores = []
+        for key_length in range(1, max_length + 1):
+            columns = self.get_columns(key_length)
+            ioc = sum(self.index_of_coincidence(column) for column in columns) / key_length
+
+            kasiski_support = 0.0
+            if (len(distances) > 0):
+                share = sum(1 for distance in distances if distance % key_length == 0) / len(distances)
+                kasiski_support = max(0.0, share - 1 / key_length)
+
+            scores.append((key_length, ioc * (1 + kasiski_support)))
+
+        return sorted(scores, key=lambda score: score[1], reverse=True)
+
+    def chi_squared(self, text: str) -> float:
+        '''
+        Returns how far the letter counts of the text are from english, lower is closer.
+        '''
+        letters = [character for character in text if character in ENGLISH_LETTER_FREQUENCIES]
+        if (len(letters) == 0):
+            return float('inf')
+
+        total = 0.0
+        for letter, frequency in ENGLISH_LETTER_FREQUENCIES.items():
+            expected = frequency * len(letters)
+            observed = letters.count(letter)
+            total += (observed - expected) ** 2 / expected
+
+        return total
+
+    def solve_column(self, column: str) -> list[tuple[str, float]]:
+        '''
+        Tries every letter as the key for a single column.\n
+
+        Returns: A list of (key_letter, chi_squared) from best to worst
+        '''
+        scores = [(letter, self.chi_squared(self.cipher_func(column, letter))) for letter in self.alphabet]
+        return sorted(scores, key=lambda score: score[1])
+
+    def solve_key_length(self, key_length: int) -> str:
+        '''
+        Returns the most likely key of the given length, solving each column on its own.
+        '''
+        return "".join(self.solve_column(column)[0][0] for column in self.get_columns(key_length))
+
+    def get_shortest_repeat(self, key: str) -> str:
+        '''
+        Returns the shortest piece of the key that repeats to make the whole key (ex: "abab" gives "ab").
+        '''
+        for length in range(1, len(key)):
+            if (len(key) % length == 0 and key[:length] * (len(key) // length) == key):
+                return key[:length]
+        return key
+
+    def rank_results(self, results: list[tuple[str, float, str]], divisor_tolerance: float) -> list[tuple[str, float, str]]:
+        '''
+        Sorts solved keys by the chi-squared of their decoded text, except that a key is ranked just behind the
+        shortest key whose length divides its own and whose chi-squared is within divisor_tolerance of its own.
+        A multiple of the real key length has more letters to fit each column with, so it gets a slightly lower
+        chi-squared from overfitting even when its key is the real key with a letter or two wrong.\n
+
+        Returns: The results from best to worst
+        '''
+        by_length = sorted(results, key=lambda result: len(result[0]))
+
+        def get_rank(result: tuple[str, float, str]) -> tuple[float, int]:
+            key, chi_squared, decoded_text = result
+            for other_key, other_chi_squared, other_decoded_text in by_length:
+                if (len(other_key) < len(key) and len(key) % len(other_key) == 0 and other_chi_squared <= chi_squared * (1 + divisor_tolerance)):
+                    return (other_chi_squared, len(key))
+            return (chi_squared, len(key))
+
+        return sorted(results, key=get_rank)
+
+    ### SOLVING FUNCTIONS ###
+
+    def solve(self, num_key_lengths: int = 5, print_progress=True, divisor_tolerance: float = 0.25) -> list[tuple[str, float, str]]:
+        '''
+        Finds the most likely key for each of the best guesses at the key length, then ranks those keys
+        by how close the fully decoded text is to english.\n
+
+        num_key_lengths: How many of the most likely key lengths to solve\n
+        divisor_tolerance: How much higher (as a fraction) the chi-squared of a key can be than that of a key whose
+            length is a multiple of its own, and still be ranked ahead of it (see rank_results)
+
+        Returns: A list of (key, chi_squared, decoded_text) from best to worst
+        '''
+        results = []
+        seen_keys = set()
+        for key_length, score in self.estimate_key_lengths()[:num_key_lengths]:
+            # A key that is a shorter key repeated decodes the same, so only keep the short one
+            key = self.get_shortest_repeat(self.solve_key_length(key_length))
+            if (key in seen_keys):
+                continue
+            seen_keys.add(key)
+
+            decoded_text = self.cipher_func(self.encoded_text, key)
+            results.append((key, self.chi_squared(decoded_text), decoded_text))
+
+        results = self.rank_results(results, divisor_tolerance)
+
+        if (print_progress):
+            for key, chi_squared, decoded_text in results:
+                print(f'Key: {key} | Chi-squared: {chi_squared:.1f} | Decoded: {decoded_text}')
+
+        return results
@@ -0,0 +1,91 @@
+from collections.abc import Callable
+
+class IncrementalDecoder:
+    def __init__(self, encoded_text: str, cipher_func: Callable[[str, str], str], alphabet: list[str], word_set: frozenset[str], separators: tuple[int, int, int]):
+        '''
+        Checks keys that only differ in their last letter without decoding the whole text for each one.\n
+        For a key of length L, the last letter of the key only changes every L-th letter of the text (its column),
+        so the other columns are decoded once and shared by all 26 keys, and only the words that
+        touch the last column are checked again for each key.\n
+        This only works for ciphers where each letter of the key shifts its own column of the text
+        (vigenere, beaufort and variant beaufort).\n
+
+        encoded_text: The encoded string of text\n
+        cipher_func: The cipher function to call that decodes a given string\n
+        alphabet: A list of characters representing the possible characters in the alphabet.\n
+        word_set: The set of valid words\n
+        separators: The same separators as the BruteForce, see BruteForce.contains_valid_word_by_size
+        '''
+        self.word_set = word_set
+        self.separators = separators
+
+        # Only alphabet characters move the key along, so columns are taken from just the letters
+        text = encoded_text.lower()
+        self.letters = "".join(character for character in text if character in alphabet)
+
+        # How each key letter decodes a single letter, found by decoding the whole alphabet with it
+        alphabet_text = "".join(alphabet)
+        self.tables = {letter: str.maketrans(alphabet_text, cipher_func(alphabet_text, letter)) for letter in alphabet}
+
+        # Where each word that could be valid starts and ends in the letters, matching how
+        # contains_valid_word_by_size splits the text
+        self.words: list[tuple[int, int]] = []
+        letter_count = 0
+        for word in text.replace('.', '').split(' '):
+            num_letters = sum(1 for character in word if character in alphabet)
+            if (num_letters == len(word) and len(word) >= separators[0]):
+                self.words.append((letter_count, letter_count + len(word)))
+            letter_count += num_letters
+
+        # A reusable plaintext buffer for each key length
+        self.buffers: dict[int, list[str]] = {}
+
+    def prepare(self, key_start: str) -> tuple[int, list[str], list[tuple[int, int]], tuple[bool, bool, bool]]:
+        '''
+        Decodes every column but the last for keys made of key_start plus one letter,
+        and checks every word that doesn't touch the last column.\n
+
+        Returns: A state to pass to check
+        '''
+        key_length = len(key_start) + 1
+        if (not key_length in self.buffers):
+            self.buffers[key_length] = list(self.letters)
+        buffer = self.buffers[key_length]
+
+        for column in range(len(key_start)):
+            buffer[column::key_length] = self.letters[column::key_length].translate(self.tables[key_start[column]])
+
+        # A word touches the last column if it has a letter at an index one below a multiple of the key length
+        touched_words = []
+        untouched_flags = (False, False, False)
+        for start, end in self.words:
+            if (start + (key_length - 1 - start) % key_length < end):
+                touched_words.append((start, end))
+            else:
+                untouched_flags = self.add_word_flags(untouched_flags, "".join(buffer[start:end]))
+
+        return (key_length, buffer, touched_words, untouched_flags)
+
+    def check(self, state: tuple[int, list[str], list[tuple[int, int]], tuple[bool, bool, bool]], last_letter: str) -> tuple[bool, bool, bool]:
+        '''
+        Decodes the last column with the given letter and returns the same result as
+        contains_valid_word_by_size would for the fully decoded text.
+        '''
+        key_length, buffer, touched_words, flags = state
+        column = key_length - 1
+        buffer[column::key_length] = self.letters[column::key_length].translate(self.tables[last_letter])
+
+        for start, end in touched_words:
+            if (flags[2]):
+                break
+            flags = self.add_word_flags(flags, "".join(buffer[start:end]))
+
+        return flags
+
+    def add_word_flags(self, flags: tuple[bool, bool, bool], word: str) -> tuple[bool, bool, bool]:
+        '''
+        Adds a single decoded word to the result flags.
+        '''
+        if (not word in self.word_set):
+            return flags
+        return (True, flags[1] or len(word) > self.separators[1], flags[2] or len(word) > self.separators[2])
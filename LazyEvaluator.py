@@ -0,0 +1,83 @@
+from collections.abc import Callable
+from WordDictionary import WordDictionary
+
+class LazyEvaluator:
+    def __init__(self, encoded_text: str, cipher_func: Callable[[str, str], str], word_dict: WordDictionary, separators: tuple[int, int, int], strip_non_alphabet: bool = False):
+        '''
+        Checks keys for valid words without decoding the whole text. The encoded text is split into words once,
+        up front, and for each key the words are decoded one at a time from longest to shortest. The first valid
+        word found is the longest one, so it decides the result and the rest of the words are never decoded.
+        Most words are thrown out after decoding just their first three letters, if no valid word of that
+        length starts with them. The full decoded text only needs to be built for keys that are logged.\n
+        This only works for ciphers where each letter of the key shifts its own column of the text
+        (vigenere, beaufort and variant beaufort).\n
+
+        encoded_text: The encoded string of text\n
+        cipher_func: The cipher function to call that decodes a given string\n
+        word_dict: The WordDictionary of valid words\n
+        separators: The same separators as the solver. The first is the shortest word that counts, see
+            BruteForce.contains_valid_word_by_size\n
+        strip_non_alphabet: If True, words are split up like DictCompare.contains_valid_word, which drops any
+            character not in the alphabet from each word. Otherwise they are split up like contains_valid_word_by_size,
+            where a word with a character that isn't a letter (other than a period) is never valid
+        '''
+        self.word_set = word_dict.word_set
+        self.separators = separators
+        alphabet = word_dict.ALPHABET
+
+        # How each key letter decodes a single letter, found by decoding the whole alphabet with it
+        alphabet_text = "".join(alphabet)
+        self.tables = {letter: dict(zip(alphabet_text, cipher_func(alphabet_text, letter))) for letter in alphabet}
+
+        # A key that leaves the text unchanged (an empty key, or one with a character not in the alphabet) gives the
+        # same result every time, so work it out now
+        text = encoded_text if strip_non_alphabet else encoded_text.replace('.', '')
+        self.unchanged_flags = self.get_flags(word for word in (word_dict.filter_string(text, 1).split(' ') if strip_non_alphabet else text.split(' '))
+                                              if len(word) >= separators[0] and word in self.word_set)
+
+        # (start, word, starts) for every word that could be valid, longest first. start is where the word begins
+        # in the letters of the text, and starts is every first three letters of a valid word that long
+        word_starts = word_dict.get_word_starts()
+        self.words: list[tuple[int, str, frozenset[str] | None]] = []
+        letter_count = 0
+        for word in text.lower().split(' '):
+            letters = "".join(character for character in word if character in self.tables)
+            if ((strip_non_alphabet or len(letters) == len(word)) and len(letters) >= separators[0] and len(letters) in word_starts):
+                self.words.append((letter_count, letters, word_starts[len(letters)] if len(letters) >= 3 else None))
+            letter_count += len(letters)
+
+        self.words.sort(key=lambda word: len(word[1]), reverse=True)
+        self.max_length = len(self.words[0][1]) if len(self.words) > 0 else 0
+
+    def get_flags(self, valid_words) -> tuple[bool, bool, bool]:
+        '''
+        Returns the result flags for the given valid words, see BruteForce.contains_valid_word_by_size.
+        '''
+        longest = max((len(word) for word in valid_words), default=0)
+        return (longest > 0, longest > self.separators[1], longest > self.separators[2])
+
+    def check(self, key: str) -> tuple[bool, bool, bool]:
+        '''
+        Returns the same result as contains_valid_word_by_size (or, with strip_non_alphabet, the first flag is the same as
+        contains_valid_word) would for the text decoded with the given key.
+        '''
+        try:
+            row = [self.tables[letter] for letter in key]
+        except KeyError:
+            return self.unchanged_flags
+        if (len(row) == 0):
+            return self.unchanged_flags
+
+        # Repeat the key's tables past the longest word, so a word's tables are one slice with no wrapping around
+        key_length = len(row)
+        row *= self.max_length // key_length + 2
+
+        for start, word, starts in self.words:
+            column = start % key_length
+            if (starts != None and row[column][word[0]] + row[column + 1][word[1]] + row[column + 2][word[2]] not in starts):
+                continue
+
+            if ("".join(map(dict.__getitem__, row[column:column + len(word)], word)) in self.word_set):
+                return (True, len(word) > self.separators[1], len(word) > self.separators[2])
+
+        return (False, False, False)
@@ -0,0 +1,248 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable
+from itertools import accumulate
+import struct
+import zlib
+
+# Marks the start of a packed word buffer. Change this if the layout changes.
+PACKED_MAGIC = b'PKWORDS1'
+
+# After the magic: the number of words, the number of small words, the byte length of the words,
+# the longest word length and the number of slots in the hash table
+PACKED_HEADER = struct.Struct('<IIIII')
+
+# The type code and size of every number in the tables
+INDEX_TYPE = 'I'
+INDEX_SIZE = 4
+
+class PackedWordList:
+    def __init__(self, buffer: bytes | memoryview, is_small: bool = False):
+        '''
+        A read-only list of alphabetically sorted words packed into a single buffer, instead of a python string per word.
+        It also works as the set of those words (for "in" and isdisjoint), can list the words of a given size and can find
+        the words that start with a prefix. Words are only turned into strings when they are asked for.\n
+        Use from_words to pack a list of words.\n
+
+        The buffer holds, after a header, tables of unsigned 32 bit numbers then the words themselves:
+            offsets: Where each word starts in the words, plus where the last one ends\n
+            small: The index of every small word (see WordDictionary.small_words)\n
+            size_starts: Where the words of each size start in by_size, plus where the last size ends\n
+            by_size: The index of every word, sorted by size then alphabetically\n
+            table: A hash table of (word index + 1) for every word, or 0 for an empty slot\n
+        That is around 20 bytes per word on top of its letters, where a python string in a list and a set is around 90.
+        Looking a word up means hashing it and comparing a few bytes, which is slower than a python set.\n
+
+        buffer: The packed words, as made by pack\n
+        is_small: If True, this is the list of only the small words
+        '''
+        self.is_small = is_small
+
+        self.buffer = memoryview(buffer)
+        if (self.buffer[:len(PACKED_MAGIC)] != PACKED_MAGIC):
+            raise ValueError("Not a packed word list")
+        num_words, num_small, words_length, max_size, table_size = PACKED_HEADER.unpack_from(self.buffer, len(PACKED_MAGIC))
+        self.max_size = max_size
+
+        # A buffer read from a file could be cut off
+        num_numbers = (num_words + 1) + num_small + (max_size + 2) + num_words + table_size
+        if (len(self.buffer) < len(PACKED_MAGIC) + PACKED_HEADER.size + num_numbers * INDEX_SIZE + words_length):
+            raise ValueError("The packed word list is cut off")
+
+        # Every table is a view straight into the buffer, nothing is copied
+        offset = len(PACKED_MAGIC) + PACKED_HEADER.size
+        self.offsets, offset = self.get_table(offset, num_words + 1)
+        self.small, offset = self.get_table(offset, num_small)
+        self.size_starts, offset = self.get_table(offset, max_size + 2)
+        self.by_size, offset = self.get_table(offset, num_words)
+        self.table, offset = self.get_table(offset, table_size)
+        self.words = self.buffer[offset:offset + words_length]
+
+        self.num_words = num_words
+        self.table_mask = table_size - 1
+
+    def get_table(self, offset: int, length: int) -> tuple[memoryview, int]:
+        '''
+        Returns a view of the table of length numbers at the given offset, and the offset after it.
+        '''
+        end = offset + length * INDEX_SIZE
+        return (self.buffer[offset:end].cast(INDEX_TYPE), end)
+
+    @staticmethod
+    def pack(all_words: list[str], small_words: list[str]) -> bytes:
+        '''
+        Packs alphabetically sorted words (and the small ones among them) into the layout described in __init__.
+        '''
+        encoded_words = [word.encode() for word in all_words]
+        offsets = array(INDEX_TYPE, accumulate(map(len, encoded_words), initial=0))
+
+        # The words are already sorted alphabetically, and the sort is stable, so sorting by size keeps them alphabetical
+        max_size = max(map(len, all_words), default=0)
+        by_size = array(INDEX_TYPE, sorted(range(len(all_words)), key=lambda i: len(all_words[i])))
+        size_starts = array(INDEX_TYPE, [0]) * (max_size + 2)
+        for word in all_words:
+            size_starts[len(word) + 1] += 1
+        for size in range(1, max_size + 2):
+            size_starts[size] += size_starts[size - 1]
+
+        # At most half full, so a lookup only checks a slot or two
+        table_size = 1
+        while (table_size < 2 * len(all_words)):
+            table_size *= 2
+        table = array(INDEX_TYPE, [0]) * table_size
+        for i in range(len(encoded_words)):
+            slot = zlib.crc32(encoded_words[i]) & (table_size - 1)
+            while (table[slot] != 0):
+                slot = (slot + 1) & (table_size - 1)
+            table[slot] = i + 1
+
+        # Both lists are sorted, so the small words can be found in one pass
+        small = array(INDEX_TYPE)
+        word_index = 0
+        for word in small_words:
+            while (all_words[word_index] != word):
+                word_index += 1
+            small.append(word_index)
+
+        header = PACKED_HEADER.pack(len(all_words), len(small), offsets[-1], max_size, table_size)
+        return b''.join([PACKED_MAGIC, header, offsets.tobytes(), small.tobytes(), size_starts.tobytes(), by_size.tobytes(), table.tobytes(), *encoded_words])
+
+    @classmethod
+    def from_words(cls, all_words: list[str], small_words: list[str]) -> 'PackedWordList':
+        '''
+        Packs alphabetically sorted words (and the small ones among them) into a new list of every word.
+        '''
+        return cls(cls.pack(all_words, small_words))
+
+    def get_small_words(self) -> 'PackedWordList':
+        '''
+        Returns the list of only the small words, sharing this list's buffer.
+        '''
+        return PackedWordList(self.buffer, True)
+
+    def __reduce__(self):
+        return (PackedWordList, (bytes(self.buffer), self.is_small))
+
+    def get_word_bytes(self, word_index: int) -> memoryview:
+        '''
+        Returns the encoded bytes of the word with the given index among every word, without copying them.
+        '''
+        return self.words[self.offsets[word_index]:self.offsets[word_index + 1]]
+
+    def get_word(self, word_index: int) -> str:
+        '''
+        Returns the word with the given index among every word.
+        '''
+        return bytes(self.get_word_bytes(word_index)).decode()
+
+    def __len__(self) -> int:
+        return len(self.small) if self.is_small else self.num_words
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if (isinstance(index, slice)):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if (index < 0):
+            index += len(self)
+        if (index < 0 or index >= len(self)):
+            raise IndexError(f'{type(self).__name__} index out of range')
+        return self.get_word(self.small[index] if self.is_small else index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def find(self, word: str) -> int:
+        '''
+        Returns the index of the given word among every word, or -1 if it isn't one of them.
+        '''
+        encoded_word = word.encode()
+        slot = zlib.crc32(encoded_word) & self.table_mask
+        while (self.table[slot] != 0):
+            word_index = self.table[slot] - 1
+            if (self.get_word_bytes(word_index) == encoded_word):
+                return word_index
+            slot = (slot + 1) & self.table_mask
+        return -1
+
+    def __contains__(self, word: str) -> bool:
+        word_index = self.find(word)
+        if (word_index < 0 or not self.is_small):
+            return word_index >= 0
+
+        # The small words are in the same order as every word, so their indices are sorted
+        position = bisect_left(self.small, word_index)
+        return position < len(self.small) and self.small[position] == word_index
+
+    def isdisjoint(self, words) -> bool:
+        '''
+        Returns whether or not none of the given words are in the list, like set.isdisjoint.
+        '''
+        return not any(word in self for word in words)
+
+    def get_words_of_size(self, size: int) -> list[str]:
+        '''
+        Returns every word of the given size among every word, sorted alphabetically.
+        '''
+        if (size < 0 or size > self.max_size):
+            return []
+        return [self.get_word(word_index) for word_index in self.by_size[self.size_starts[size]:self.size_starts[size + 1]]]
+
+    def get_search(self, prefix_length: int, size: int | None) -> tuple[int, int, Callable[[int], bytes]]:
+        '''
+        Sets up a binary search of the sorted words. Cutting every word down to the length of the prefix keeps them
+        sorted, so the words that start with a prefix are the ones that are equal to it once cut down.\n
+
+        size: If given, only words of exactly this size are searched, through by_size
+
+        Returns: (start, end, cut_word), where the search covers start up to (but not including) end and cut_word gives
+            the encoded word at a position cut down to prefix_length bytes
+        '''
+        if (size == None):
+            return (0, self.num_words, lambda i: bytes(self.words[self.offsets[i]:min(self.offsets[i + 1], self.offsets[i] + prefix_length)]))
+        if (size < 0 or size > self.max_size):
+            return (0, 0, None)
+        return (self.size_starts[size], self.size_starts[size + 1], lambda i: bytes(self.get_word_bytes(self.by_size[i])[:prefix_length]))
+
+    def get_prefix_range(self, prefix: str, size: int | None = None) -> tuple[int, int]:
+        '''
+        Finds the words that start with the given prefix by binary searching the sorted words.\n
+
+        size: If given, only words of exactly this size are searched
+
+        Returns: (start, end), where the matching words are every word index from start up to (but not including) end,
+            or every by_size position from start up to end if size is given
+        '''
+        encoded_prefix = prefix.encode()
+        start, end, cut_word = self.get_search(len(encoded_prefix), size)
+        if (start == end):
+            return (start, end)
+        return (bisect_left(range(end), encoded_prefix, start, end, key=cut_word), bisect_right(range(end), encoded_prefix, start, end, key=cut_word))
+
+    def has_prefix(self, prefix: str, size: int | None = None) -> bool:
+        '''
+        Returns whether or not any word starts with the given prefix.\n
+
+        size: If given, only words of exactly this size are counted
+        '''
+        # Only the first match is needed, so this takes a single binary search
+        encoded_prefix = prefix.encode()
+        start, end, cut_word = self.get_search(len(encoded_prefix), size)
+        if (start == end):
+            return False
+        position = bisect_left(range(end), encoded_prefix, start, end, key=cut_word)
+        return position < end and cut_word(position) == encoded_prefix
+
+    def words_with_prefix(self, prefix: str) -> list[str]:
+        '''
+        Returns every word that starts with the given prefix, in alphabetical order.
+        '''
+        start, end = self.get_prefix_range(prefix)
+        return [self.get_word(word_index) for word_index in range(start, end)]
+
+    def release(self):
+        '''
+        Lets go of this list's views of the buffer. The list can't be used after this.
+        '''
+        for view in (self.offsets, self.small, self.size_starts, self.by_size, self.table, self.words, self.buffer):
+            view.release()
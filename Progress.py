@@ -0,0 +1,163 @@
+from collections import deque
+import json
+import multiprocessing
+import threading
+import time
+
+def format_duration(seconds: float) -> str:
+    '''
+    Formats a number of seconds as days, hours, minutes and seconds (ex: "1d 2h 3m 4s"). Nothing wraps around,
+    so a run of 100 hours shows as "4d 4h 0m 0s".
+    '''
+    if (seconds == float('inf')):
+        return "unknown"
+
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86_400)
+    hours, seconds = divmod(seconds, 3_600)
+    minutes, seconds = divmod(seconds, 60)
+
+    if (days > 0):
+        return f'{days}d {hours}h {minutes}m {seconds}s'
+    return f'{hours}h {minutes}m {seconds}s'
+
+class Progress:
+    def __init__(self, total_keys: int, num_workers: int, interval: float = 10.0, json_path: str | None = None, window: float = 60.0, print_reports: bool = True):
+        '''
+        Keeps track of how many keys every worker has tested (or skipped) and how many hits it has found, and reports
+        the overall rate and time left while a run is going.\n
+        Each worker only ever adds to its own counters in shared memory, so counting needs no locks and works
+        the same for threads and processes. Only the process that made the Progress reports it.\n
+
+        total_keys: How many keys the run will test\n
+        num_workers: How many workers will add to the counters\n
+        interval: How many seconds between reports, or 0 to only report at the end\n
+        json_path: If given, every report is also added to this file as a line of json\n
+        window: How many seconds of reports the keys per second is averaged over\n
+        print_reports: If False, reports are only added to the json file
+        '''
+        self.total_keys = total_keys
+        self.num_workers = num_workers
+        self.interval = interval
+        self.json_path = json_path
+        self.window = window
+        self.print_reports = print_reports
+
+        # The keys tested, hits found and keys skipped by each worker, one after another
+        self.counts = multiprocessing.RawArray('q', 3 * num_workers)
+
+        # Recent (time, keys_tested) readings, to work out the current rate
+        self.readings: deque[tuple[float, int]] = deque()
+
+        self.start_time = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def __getstate__(self) -> dict:
+        '''
+        Workers in other processes only need the counters.
+        '''
+        return {"total_keys": self.total_keys, "num_workers": self.num_workers, "counts": self.counts}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.interval = 0
+        self.json_path = None
+        self.thread = None
+
+    def add(self, worker_index: int, num_keys: int, num_hits: int = 0, num_skipped: int = 0):
+        '''
+        Adds to a worker's counters. Only the worker with this index may call this.\n
+
+        num_keys: How many more keys the worker has been through, including any it skipped\n
+        num_skipped: How many of those keys were skipped without being tested
+        '''
+        self.counts[3 * worker_index] += num_keys
+        self.counts[3 * worker_index + 1] += num_hits
+        self.counts[3 * worker_index + 2] += num_skipped
+
+    def snapshot(self) -> dict:
+        '''
+        Returns the progress of the run so far, as a dictionary that can be written as json.
+        '''
+        now = time.time()
+        keys_per_worker = [self.counts[3 * i] for i in range(self.num_workers)]
+        hits_per_worker = [self.counts[3 * i + 1] for i in range(self.num_workers)]
+        keys_tested = sum(keys_per_worker)
+
+        # The rate is measured over the last window seconds, so it follows the run as it speeds up or slows down
+        self.readings.append((now, keys_tested))
+        while (len(self.readings) > 2 and now - self.readings[1][0] >= self.window):
+            self.readings.popleft()
+
+        first_time, first_keys = self.readings[0]
+        if (len(self.readings) < 2):
+            first_time, first_keys = self.start_time, 0
+        keys_per_sec = (keys_tested - first_keys) / (now - first_time) if now > first_time else 0.0
+
+        keys_left = max(0, self.total_keys - keys_tested)
+        eta_seconds = keys_left / keys_per_sec if keys_per_sec > 0 else (0.0 if keys_left == 0 else float('inf'))
+
+        return {
+            "time": now,
+            "elapsed_seconds": now - self.start_time,
+            "keys_tested": keys_tested,
+            "total_keys": self.total_keys,
+            "hits": sum(hits_per_worker),
+            "keys_skipped": sum(self.counts[2::3]),
+            "keys_per_sec": keys_per_sec,
+            "eta_seconds": eta_seconds if eta_seconds != float('inf') else None,
+            "keys_per_worker": keys_per_worker,
+            "hits_per_worker": hits_per_worker,
+        }
+
+    def report(self, snapshot: dict):
+        '''
+        Prints a snapshot, and adds it to the json file if there is one.
+        '''
+        if (self.print_reports):
+            percent = 100 * snapshot["keys_tested"] / self.total_keys if self.total_keys > 0 else 100.0
+            eta = format_duration(snapshot["eta_seconds"] if snapshot["eta_seconds"] != None else float('inf'))
+            print(f'Progress: {snapshot["keys_tested"]:,} of {self.total_keys:,} keys ({percent:.1f}%) | '
+                  f'{snapshot["keys_per_sec"]:,.0f} keys/sec | {snapshot["hits"]:,} hits | ETA {eta}')
+
+        if (self.json_path != None):
+            with open(self.json_path, 'a') as json_file:
+                json_file.write(json.dumps(snapshot) + "\n")
+
+    def report_loop(self):
+        '''
+        Reports the progress every interval seconds until stop is called.
+        '''
+        while (not self.stop_event.wait(self.interval)):
+            self.report(self.snapshot())
+
+    def start(self):
+        '''
+        Starts the clock, and starts reporting every interval seconds if interval is above 0.
+        '''
+        self.start_time = time.time()
+        self.readings.clear()
+        self.readings.append((self.start_time, sum(self.counts[0::3])))
+        self.stop_event.clear()
+
+        if (self.interval > 0):
+            self.thread = threading.Thread(target=self.report_loop, daemon=True)
+            self.thread.start()
+
+    def stop(self) -> dict:
+        '''
+        Stops reporting and reports the final progress, using the average rate over the whole run.\n
+
+        Returns: The final snapshot
+        '''
+        self.stop_event.set()
+        if (self.thread != None):
+            self.thread.join()
+            self.thread = None
+
+        self.readings.clear()
+        snapshot = self.snapshot()
+        snapshot["eta_seconds"] = 0.0 if snapshot["keys_tested"] >= self.total_keys else snapshot["eta_seconds"]
+        self.report(snapshot)
+        return snapshot
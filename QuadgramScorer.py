@@ -0,0 +1,96 @@
+import numpy as np
+from vigenere import ALPHABET
+
+class QuadgramScorer:
+    def __init__(self, counts: dict[str, int], alphabet: list[str] = ALPHABET):
+        '''
+        Scores how much a piece of text looks like real language, using the log probability of every
+        run of four letters (quadgram) in it. Higher scores are better.\n
+        The log probabilities are stored in one flat array indexed by the letters of the quadgram,
+        so scoring never touches a dictionary. Use from_words or from_file to build one.\n
+
+        counts: How many times each quadgram was seen. Quadgrams with a character not in the alphabet are ignored\n
+        alphabet: A list of characters representing the possible characters in the alphabet.
+        '''
+        self.alphabet = alphabet
+        size = len(alphabet)
+
+        # Real corpora and word lists have apostrophes, digits and so on, which no key can decode to
+        alphabet_set = frozenset(alphabet)
+        counts = {quadgram: count for quadgram, count in counts.items() if len(quadgram) == 4 and alphabet_set.issuperset(quadgram)}
+
+        # Maps an ascii code to its index in the alphabet, or -1 if it isn't in the alphabet
+        self.letter_index = np.full(256, -1, dtype=np.intp)
+        for i in range(size):
+            self.letter_index[ord(alphabet[i])] = i
+
+        # Any quadgram that was never seen gets a small floor probability
+        total = max(1, sum(counts.values()))
+        self.floor = np.log10(0.01 / total)
+        self.table = np.full(size ** 4, self.floor, dtype=np.float32)
+        for quadgram, count in counts.items():
+            self.table[self.get_index(quadgram)] = np.log10(count / total)
+
+    @classmethod
+    def from_words(cls, words: list[str], alphabet: list[str] = ALPHABET) -> 'QuadgramScorer':
+        '''
+        Builds a scorer from the quadgrams inside a list of words (ex: a WordDictionary's all_words).
+        '''
+        counts = {}
+        for word in words:
+            for i in range(len(word) - 3):
+                quadgram = word[i:i + 4]
+                counts[quadgram] = counts.get(quadgram, 0) + 1
+        return cls(counts, alphabet)
+
+    @classmethod
+    def from_file(cls, file_path: str, alphabet: list[str] = ALPHABET) -> 'QuadgramScorer':
+        '''
+        Builds a scorer from a file where every line is a quadgram and its count separated by a space (ex: "TION 13168375").
+        '''
+        counts = {}
+        with open(file_path) as quadgram_file:
+            for line in quadgram_file:
+                parts = line.split()
+                if (len(parts) != 2 or len(parts[0]) != 4):
+                    continue
+                counts[parts[0].lower()] = int(parts[1])
+        return cls(counts, alphabet)
+
+    def get_index(self, quadgram: str) -> int:
+        '''
+        Returns where the quadgram is in the flat table.
+        '''
+        size = len(self.alphabet)
+        index = 0
+        for character in quadgram:
+            index = index * size + self.alphabet.index(character)
+        return index
+
+    def score_indices(self, indices: np.ndarray) -> np.ndarray:
+        '''
+        Scores rows of alphabet indices, with one text per row.
+        '''
+        if (indices.shape[-1] < 4):
+            return np.zeros(indices.shape[:-1], dtype=np.float64)
+
+        size = len(self.alphabet)
+        quadgrams = ((indices[..., :-3] * size + indices[..., 1:-2]) * size + indices[..., 2:-1]) * size + indices[..., 3:]
+        return self.table[quadgrams].sum(axis=-1, dtype=np.float64)
+
+    def score(self, text: str) -> float:
+        '''
+        Scores a single piece of text. Any character not in the alphabet is skipped.
+        '''
+        codes = np.frombuffer(text.lower().encode('ascii', 'replace'), dtype=np.uint8)
+        indices = self.letter_index[codes]
+        return float(self.score_indices(indices[indices >= 0]))
+
+    def score_matrix(self, matrix: np.ndarray, letter_positions: np.ndarray) -> np.ndarray:
+        '''
+        Scores every row of a matrix returned by one of the vigenere_batch decode functions.\n
+
+        letter_positions: Where the alphabet characters are in each row (see PreparedText.letter_positions)
+        '''
+        indices = self.letter_index[matrix[:, letter_positions]]
+        return self.score_indices(indices)
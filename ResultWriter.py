@@ -0,0 +1,88 @@
+import queue
+import threading
+
+class ResultWriter:
+    def __init__(self, file_paths: list[str], print_level: int | None = 1, file_mode: str = 'a', max_pending: int = 1024, buffer_size: int = 1 << 20, num_levels: int = 3):
+        '''
+        Writes solver results to their output files from a single background thread, so the workers never
+        share file handles or fight over the console. Results wait in a bounded queue, so a slow disk
+        slows the solver down instead of building up an unbounded backlog. Use as a context manager,
+        or call close once every result is written.\n
+
+        file_paths: One output file for each of the first num_levels levels of is_valid, see write. When solving several
+            texts at once, this is one group of files for each text, one after another\n
+        print_level: Results that satisfy this level of is_valid are also printed to the console, or None to print nothing\n
+        file_mode: The mode to open the output files with\n
+        max_pending: The most results that can wait to be written\n
+        buffer_size: The size of each output file's write buffer\n
+        num_levels: How many levels of is_valid have an output file (ex: 1 to only log the results that satisfy the first)
+        '''
+        self.print_level = print_level
+        self.num_levels = num_levels
+        self.files = [open(file_path, file_mode, buffering=buffer_size) for file_path in file_paths]
+        self.queue = queue.Queue(max_pending)
+        self.error: BaseException | None = None
+
+        self.thread = threading.Thread(target=self.write_loop, daemon=True)
+        self.thread.start()
+
+    def write(self, key: str, decoded_text: str, is_valid: tuple[bool, ...], group: int = 0):
+        '''
+        Queues up a result to be written. It is logged in the output file of every level of is_valid it satisfies
+        (ex: the results of BruteForce.contains_valid_word_by_size).\n
+
+        group: Which group of output files to log the result in, if there is more than one
+        '''
+        if (self.error != None):
+            raise RuntimeError(f'Writing results failed: {self.error!r}')
+        self.queue.put((key, decoded_text, is_valid, group))
+
+    def write_loop(self):
+        '''
+        Writes results from the queue until the stop signal (None) is reached.
+        '''
+        while True:
+            result = self.queue.get()
+            if (result == None):
+                return
+            if (self.error != None):
+                continue
+
+            try:
+                self.write_result(*result)
+            except BaseException as error:
+                # Keep reading so the solver never blocks on a full queue, the error is raised from write or close
+                self.error = error
+
+    def write_result(self, key: str, decoded_text: str, is_valid: tuple[bool, ...], group: int):
+        '''
+        Logs a single result in its output files (and the console), see write. Only called from the writer thread.
+        '''
+        output_text = f'key: {key} | text: {decoded_text}\n'
+        first_file = group * self.num_levels
+        for i in range(self.num_levels):
+            if (is_valid[i]):
+                self.files[first_file + i].write(output_text)
+
+        if (self.print_level != None and is_valid[self.print_level]):
+            # Say which text the result is for if there are several
+            print("-------" if len(self.files) == self.num_levels else f'------- text {group}')
+            print(output_text)
+
+    def close(self):
+        '''
+        Waits for every queued result to be written, then closes the output files.
+        '''
+        self.queue.put(None)
+        self.thread.join()
+        for output_file in self.files:
+            output_file.close()
+
+        if (self.error != None):
+            raise RuntimeError(f'Writing results failed: {self.error!r}')
+
+    def __enter__(self) -> 'ResultWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
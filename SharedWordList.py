@@ -0,0 +1,78 @@
+from multiprocessing import shared_memory
+from PackedWordList import PackedWordList
+
+class SharedWordList(PackedWordList):
+    def __init__(self, block: shared_memory.SharedMemory, is_small: bool = False, is_owner: bool = False):
+        '''
+        A PackedWordList kept in a block of shared memory, which every worker process attaches to instead of
+        keeping its own copy. Pickling a SharedWordList only sends the name of the block, so it is near instant.\n
+        Use create or publish to put words in a new block, and attach to open one that has already been published.\n
+
+        block: The shared memory block, holding words packed by PackedWordList.pack\n
+        is_small: If True, this is the list of only the small words\n
+        is_owner: If True, this process published the block and unlinks it when it is done with it
+        '''
+        self.block = block
+        self.is_owner = is_owner
+        super().__init__(block.buf, is_small)
+
+    @classmethod
+    def publish(cls, data: bytes | memoryview) -> 'SharedWordList':
+        '''
+        Copies already packed words (see PackedWordList.pack) into a new block of shared memory.\n
+
+        Returns: The list of every word. Its block is unlinked when it is closed (see close)
+        '''
+        block = shared_memory.SharedMemory(create=True, size=len(data))
+        block.buf[:len(data)] = data
+        return cls(block, False, True)
+
+    @classmethod
+    def create(cls, all_words: list[str], small_words: list[str]) -> 'SharedWordList':
+        '''
+        Publishes the given words in a new block of shared memory.\n
+
+        Returns: The list of every word. Its block is unlinked when it is closed (see close)
+        '''
+        return cls.publish(cls.pack(all_words, small_words))
+
+    @classmethod
+    def attach(cls, name: str, is_small: bool = False) -> 'SharedWordList':
+        '''
+        Opens a block of words that another process has published.
+        '''
+        return cls(shared_memory.SharedMemory(name), is_small)
+
+    def get_small_words(self) -> 'SharedWordList':
+        '''
+        Returns the list of only the small words, sharing this list's block.
+        '''
+        return SharedWordList(self.block, True)
+
+    def __reduce__(self):
+        return (SharedWordList.attach, (self.block.name, self.is_small))
+
+    def release(self):
+        '''
+        Lets go of this list's views of the block, closing the block if nothing else in this process
+        (like the small word list) still has a view of it.
+        '''
+        super().release()
+
+        try:
+            self.block.close()
+        except BufferError:
+            pass
+
+    def close(self):
+        '''
+        Lets go of the block, unlinking it too if this process published it. The list can't be used after this.
+        '''
+        self.release()
+        if (self.is_owner):
+            self.is_owner = False
+            self.block.unlink()
+
+    def __del__(self):
+        # The views have to go before the block does, or closing the block fails
+        self.release()
@@ -0,0 +1,132 @@
+from collections.abc import Callable
+import multiprocessing
+import threading
+import time
+
+# The stages of testing a key, in the order they happen
+STAGES = ("cipher", "validity", "output")
+
+# The worker index of the current thread, set by StageProfiler.start_worker
+current_worker = threading.local()
+
+class ProfiledStage:
+    def __init__(self, profiler: 'StageProfiler', stage: str, func: Callable, worker_index: int | None = None):
+        '''
+        Stands in for a function, counting every call to it and timing a sample of them.\n
+
+        profiler: The StageProfiler to record to\n
+        stage: Which of STAGES the function is\n
+        func: The function to call\n
+        worker_index: If given, every call is recorded as this worker instead of the worker of the calling thread
+        '''
+        self.profiler = profiler
+        self.stage_index = STAGES.index(stage)
+        self.func = func
+        self.worker_index = worker_index
+        self.__name__ = getattr(func, "__name__", stage)
+
+    def __call__(self, *args, **kwargs):
+        counts = self.profiler.counts
+        worker_index = self.worker_index if self.worker_index != None else getattr(current_worker, "index", 0)
+        slot = self.profiler.get_slot(worker_index, self.stage_index)
+        calls = counts[slot] + 1
+        counts[slot] = calls
+
+        if (calls % self.profiler.sample_every != 0):
+            return self.func(*args, **kwargs)
+
+        start_time = time.perf_counter_ns()
+        result = self.func(*args, **kwargs)
+        counts[slot + 2] += time.perf_counter_ns() - start_time
+        counts[slot + 1] += 1
+        return result
+
+class StageProfiler:
+    def __init__(self, num_workers: int, sample_every: int = 100):
+        '''
+        Counts the calls to each stage of testing a key (see STAGES) in every worker, and times one in every
+        sample_every of them, so the total time spent in each stage can be estimated without timing every call.\n
+        Stages are profiled by swapping the solver's functions for ProfiledStage wrappers with wrap, so nothing
+        changes in the solver when profiling is off. Like Progress, the counters are in shared memory and
+        each worker only adds to its own, so this works the same for threads and processes.\n
+
+        num_workers: How many workers will record to the profiler\n
+        sample_every: How many calls to a stage there are for every one that is timed
+        '''
+        self.num_workers = num_workers
+        self.sample_every = max(1, sample_every)
+
+        # Streamed results are written by a ResultWriter thread in the main process, which records after the workers (see wrap_writer)
+        self.writer_index = num_workers
+
+        # The calls, timed calls and timed nanoseconds of every stage of every worker, then of the writer
+        self.counts = multiprocessing.RawArray('q', 3 * len(STAGES) * (num_workers + 1))
+
+    def get_slot(self, worker_index: int, stage_index: int) -> int:
+        '''
+        Returns where the counters of a stage of a worker start in counts.
+        '''
+        return 3 * (worker_index * len(STAGES) + stage_index)
+
+    def wrap(self, stage: str, func: Callable, worker_index: int | None = None) -> ProfiledStage:
+        '''
+        Returns a stand in for func that records its calls as the given stage.\n
+
+        worker_index: If given, calls are recorded as this worker instead of the worker of the calling thread
+        '''
+        return ProfiledStage(self, stage, func, worker_index)
+
+    def wrap_writer(self, writer):
+        '''
+        Profiles the writing of every result by a ResultWriter as the output stage. The writer's thread
+        has its own counters, so it never shares them with a worker.
+        '''
+        writer.write_result = self.wrap("output", writer.write_result, self.writer_index)
+
+    def start_worker(self, worker_index: int):
+        '''
+        Records every stage called from the current thread as the given worker. Each worker calls this when it starts.
+        '''
+        current_worker.index = worker_index
+
+    def get_breakdown(self) -> dict[str, dict[str, float]]:
+        '''
+        Returns the calls and estimated seconds of every stage, summed across the workers and the writer, along with
+        each worker's estimated seconds in that stage (the writer's are last).
+        '''
+        breakdown = {}
+        for stage_index in range(len(STAGES)):
+            calls = 0
+            seconds = 0.0
+            worker_seconds = []
+            for worker_index in range(self.num_workers + 1):
+                slot = self.get_slot(worker_index, stage_index)
+                worker_calls, timed_calls, timed_ns = self.counts[slot:slot + 3]
+
+                # Scale the timed calls up to every call
+                estimate = timed_ns / timed_calls * worker_calls / 1_000_000_000 if timed_calls > 0 else 0.0
+                calls += worker_calls
+                seconds += estimate
+                worker_seconds.append(estimate)
+
+            breakdown[STAGES[stage_index]] = {"calls": calls, "seconds": seconds, "worker_seconds": worker_seconds}
+
+        return breakdown
+
+    def print_breakdown(self):
+        '''
+        Prints how many times each stage was called and roughly how much time was spent in it.
+        '''
+        breakdown = self.get_breakdown()
+        total_seconds = sum(stage["seconds"] for stage in breakdown.values())
+
+        print(f'Stage breakdown (timing 1 in every {self.sample_every} calls):')
+        for stage, results in breakdown.items():
+            share = 100 * results["seconds"] / total_seconds if total_seconds > 0 else 0.0
+            per_call = 1_000_000 * results["seconds"] / results["calls"] if results["calls"] > 0 else 0.0
+            print(f'\t{stage:<10} {results["calls"]:>14,} calls | {results["seconds"]:>10.2f}s ({share:5.1f}%) | {per_call:.1f}us per call')
+
+        # The writer isn't a worker, so it is left out here
+        busiest = max(range(self.num_workers), key=lambda i: sum(stage["worker_seconds"][i] for stage in breakdown.values()))
+        stage_times = ", ".join(f'{stage} {results["worker_seconds"][busiest]:.2f}s' for stage, results in breakdown.items())
+        print(f'\tBusiest worker: {busiest} ({stage_times})')
@@ -0,0 +1,49 @@
+import heapq
+
+class TopResults:
+    def __init__(self, size: int):
+        '''
+        Keeps only the best scoring results seen so far, throwing away the rest.\n
+
+        size: The number of results to keep
+        '''
+        self.size = size
+
+        # A min heap of (score, key, decoded_text), so the worst kept result is always on top
+        self.heap: list[tuple[float, str, str]] = []
+
+    def is_worth_adding(self, score: float) -> bool:
+        '''
+        Returns whether or not a result with the given score would be kept
+        '''
+        return len(self.heap) < self.size or score > self.heap[0][0]
+
+    def add(self, score: float, key: str, decoded_text: str):
+        '''
+        Adds a result, if it scores well enough to be kept.
+        '''
+        if (len(self.heap) < self.size):
+            heapq.heappush(self.heap, (score, key, decoded_text))
+        elif (score > self.heap[0][0]):
+            heapq.heapreplace(self.heap, (score, key, decoded_text))
+
+    def merge(self, results: list[tuple[float, str, str]]):
+        '''
+        Adds every (score, key, decoded_text) in the given list, ex: the results of another worker.
+        '''
+        for score, key, decoded_text in results:
+            self.add(score, key, decoded_text)
+
+    def get_sorted(self) -> list[tuple[float, str, str]]:
+        '''
+        Returns the kept results as (score, key, decoded_text), from best to worst.
+        '''
+        return sorted(self.heap, reverse=True)
+
+    def write(self, file_path: str):
+        '''
+        Writes the kept results to a file, from best to worst.
+        '''
+        with open(file_path, 'w') as out_file:
+            for score, key, decoded_text in self.get_sorted():
+                out_file.write(f'score: {score:.2f} | key: {key} | text: {decoded_text}\n')
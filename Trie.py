@@ -0,0 +1,77 @@
+class Trie:
+    def __init__(self, words: list[str]):
+        '''
+        A character trie of words, for quickly checking whether any word starts with a given prefix.\n
+
+        words: The words to put in the trie
+        '''
+        # Each node maps a character to the index of the next node
+        self.children: list[dict[str, int]] = [{}]
+
+        # The lengths of every word that passes through each node
+        self.lengths: list[set[int]] = [set()]
+
+        # The word that ends at each node (or None)
+        self.words: list[str | None] = [None]
+
+        for word in words:
+            self.add_word(word)
+
+    def add_word(self, word: str):
+        '''
+        Adds a word to the trie.
+        '''
+        node = 0
+        self.lengths[node].add(len(word))
+        for character in word:
+            next_node = self.children[node].get(character)
+            if (next_node == None):
+                next_node = len(self.children)
+                self.children[node][character] = next_node
+                self.children.append({})
+                self.lengths.append(set())
+                self.words.append(None)
+            node = next_node
+            self.lengths[node].add(len(word))
+
+        self.words[node] = word
+
+    def find_node(self, prefix: str) -> int | None:
+        '''
+        Returns the node reached by following the prefix from the root, or None if no word starts with it.
+        '''
+        node = 0
+        for character in prefix:
+            node = self.children[node].get(character)
+            if (node == None):
+                return None
+        return node
+
+    def has_prefix(self, prefix: str, length: int | None = None) -> bool:
+        '''
+        Returns whether or not any word starts with the given prefix.\n
+
+        length: If given, only words of exactly this length are counted
+        '''
+        node = self.find_node(prefix)
+        if (node == None):
+            return False
+        return length == None or length in self.lengths[node]
+
+    def words_with_prefix(self, prefix: str) -> list[str]:
+        '''
+        Returns every word that starts with the given prefix, in alphabetical order.
+        '''
+        node = self.find_node(prefix)
+        if (node == None):
+            return []
+
+        output = []
+        nodes = [node]
+        while (len(nodes) > 0):
+            node = nodes.pop()
+            if (self.words[node] != None):
+                output.append(self.words[node])
+            nodes.extend(self.children[node].values())
+
+        return sorted(output)
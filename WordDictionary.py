@@ -1,30 +1,87 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
 import csv
+import hashlib
+import mmap
+import os
+import struct
+import weakref
+from AhoCorasick import AhoCorasick
+from PackedWordList import PackedWordList
+from SharedWordList import SharedWordList
+from Trie import Trie
 
-class WordDictionary:
-    # A constant list of the used alphabet
-    ALPHABET: list[str] = []
-    
-    # A list of all valid words according to the input .csv files
-    all_words: list[str] = []
+# Marks the start of a compiled dictionary file. Change this if the format changes so old files are rebuilt.
+COMPILED_MAGIC = b'WORDDICT1'
 
-    # This isn't used internally atm, but in the future it could be used to speed up searches that are
-    # unlikely to need larger words
-    small_words: list[str] = []
+# After the magic: the number of words, the number of small words, and the byte length of each word block
+COMPILED_HEADER = struct.Struct('<IIII')
 
-    def __init__(self, dictionary_file_paths: list[str] = ["word_lists/words.csv"], small_words_max_length = 5, alphabet: list[str] = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm', 'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v', 'w', 'x', 'y', 'z']):
+class WordDictionary:
+    def __init__(self, dictionary_file_paths: list[str] = ["word_lists/words.csv"], small_words_max_length = 5, alphabet: list[str] = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm', 'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v', 'w', 'x', 'y', 'z'], cache_dir: str | None = "dictionary_cache", compact: bool = False):
         '''
         A holder for a dictionary of valid words.\n
 
         dictionary_file_paths: A list of file paths to .csv files containing the valid words for the dictionary\n
         small_words_max_length: The maximum length a word can be to be considered a "small" word\n
-        alphabet: A list of characters representing the possible characters in the alphabet.
+        alphabet: A list of characters representing the possible characters in the alphabet.\n
+        cache_dir: A folder to keep compiled copies of the dictionary in, so later runs with the same files
+            and alphabet can skip parsing the .csv files. Set to None to always parse the .csv files.\n
+        compact: If True, the words are packed into one buffer (see PackedWordList) instead of kept as a python string each,
+            which takes several times less memory for dictionaries of millions of words. all_words, small_words and word_set
+            become read-only views of the packed words, and checking a word is a little slower. If caching is on, the packed
+            buffer is cached too, and later runs (and worker processes) memory map it instead of building anything
         '''
         
         # Initialize
         print("Initializing Word Dictionary")
 
+        # A constant list of the used alphabet
         self.ALPHABET = alphabet
-        
+
+        # A list of all valid words according to the input .csv files, sorted alphabetically
+        self.all_words: list[str] = []
+
+        # All the valid words that are at most small_words_max_length long, sorted alphabetically.
+        # These make a good keys_to_test for DictCompare.solve_two_word_keys
+        self.small_words: list[str] = []
+
+        # The shared memory copy of the words, if they have been shared (see share)
+        self.shared_words: SharedWordList | None = None
+
+        # Whether the words are packed into one buffer instead of kept as strings, see PackedWordList
+        self.compact = compact
+
+        # The compiled copy of this dictionary, and the packed copy used when compact, if caching is on
+        self.cache_path = None
+        self.packed_cache_path = None
+        if (cache_dir != None):
+            cache_key = self.get_cache_key(dictionary_file_paths, small_words_max_length)
+            self.cache_path = os.path.join(cache_dir, f'{cache_key}.wdict')
+            self.packed_cache_path = os.path.join(cache_dir, f'{cache_key}.pwdict')
+
+        # A compact dictionary maps its packed copy straight in, without making a string for any word
+        if (compact and self.load_packed(self.packed_cache_path)):
+            self.build_lookups()
+            return
+
+        if (self.cache_path == None or not self.load_compiled(self.cache_path)):
+            self.load_csv_files(dictionary_file_paths, small_words_max_length)
+            if (self.cache_path != None):
+                self.save_compiled(self.cache_path)
+
+        if (compact):
+            self.pack_words()
+            if (self.packed_cache_path != None):
+                self.save_packed(self.packed_cache_path)
+        self.build_lookups()
+
+    def load_csv_files(self, dictionary_file_paths: list[str], small_words_max_length: int):
+        '''
+        Fills all_words and small_words from the given .csv files.
+        '''
+        words = []
+
         # Open the csv of all words
         for file_path in dictionary_file_paths:
             with open(file_path) as csvfile:
@@ -36,14 +93,326 @@ class WordDictionary:
                     if word == " " or word == "":
                         continue
 
-                    self.all_words.append(word)
-
-                    if (len(word) <= small_words_max_length):
-                        self.small_words.append(word)
+                    words.append(word)
         
         # Sort the dictionary alphabetically
-        self.all_words: list[str] = sorted(self.all_words)
-        self.all_words = self.remove_duplicates(self.all_words)
+        self.all_words = self.remove_duplicates(sorted(words))
+        self.small_words = [word for word in self.all_words if len(word) <= small_words_max_length]
+
+    def get_cache_key(self, dictionary_file_paths: list[str], small_words_max_length: int) -> str:
+        '''
+        Returns a hash of everything that changes the contents of the dictionary: the .csv files,
+        the alphabet and the small word length.
+        '''
+        hasher = hashlib.sha256(COMPILED_MAGIC)
+        hasher.update(repr((self.ALPHABET, small_words_max_length)).encode())
+        for file_path in dictionary_file_paths:
+            with open(file_path, 'rb') as source_file:
+                hasher.update(source_file.read())
+            hasher.update(b'\0')
+        return hasher.hexdigest()[:32]
+
+    def save_compiled(self, cache_path: str):
+        '''
+        Writes all_words and small_words to a compiled dictionary file.
+        '''
+        all_block = "\n".join(self.all_words).encode()
+        small_block = "\n".join(self.small_words).encode()
+        header = COMPILED_HEADER.pack(len(self.all_words), len(self.small_words), len(all_block), len(small_block))
+
+        # Write to a temporary file first, so another run never sees a half written file
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        temp_path = f'{cache_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as compiled_file:
+            compiled_file.write(COMPILED_MAGIC + header + all_block + small_block)
+        os.replace(temp_path, cache_path)
+
+    def load_compiled(self, cache_path: str) -> bool:
+        '''
+        Fills all_words and small_words from a compiled dictionary file by memory mapping it.\n
+
+        Returns: Whether or not the file could be loaded
+        '''
+        if (not os.path.exists(cache_path)):
+            return False
+
+        try:
+            with open(cache_path, 'rb') as compiled_file, mmap.mmap(compiled_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if (mapped[:len(COMPILED_MAGIC)] != COMPILED_MAGIC):
+                    return False
+
+                offset = len(COMPILED_MAGIC)
+                num_words, num_small_words, all_length, small_length = COMPILED_HEADER.unpack_from(mapped, offset)
+                offset += COMPILED_HEADER.size
+
+                all_words = mapped[offset:offset + all_length].decode().split("\n") if num_words > 0 else []
+                offset += all_length
+                small_words = mapped[offset:offset + small_length].decode().split("\n") if num_small_words > 0 else []
+        except (OSError, ValueError, struct.error):
+            return False
+
+        if (len(all_words) != num_words or len(small_words) != num_small_words):
+            return False
+
+        self.all_words = all_words
+        self.small_words = small_words
+        return True
+
+    def save_packed(self, packed_cache_path: str):
+        '''
+        Writes the packed words to a file, so later runs can memory map them with load_packed.
+        '''
+        os.makedirs(os.path.dirname(packed_cache_path) or ".", exist_ok=True)
+        temp_path = f'{packed_cache_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as packed_file:
+            packed_file.write(self.all_words.buffer)
+        os.replace(temp_path, packed_cache_path)
+
+    def map_packed(self, packed_cache_path: str | None) -> PackedWordList | None:
+        '''
+        Memory maps a file of packed words (see save_packed). Nothing is read until it is used, and every process
+        that maps the same file shares its pages.\n
+
+        Returns: The packed words, or None if the file couldn't be loaded
+        '''
+        if (packed_cache_path == None or not os.path.exists(packed_cache_path)):
+            return None
+
+        try:
+            # The packed words keep the mapping open for as long as they are in use
+            with open(packed_cache_path, 'rb') as packed_file:
+                mapped = mmap.mmap(packed_file.fileno(), 0, access=mmap.ACCESS_READ)
+            return PackedWordList(mapped)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def load_packed(self, packed_cache_path: str | None) -> bool:
+        '''
+        Fills all_words and small_words by memory mapping a file of packed words, see map_packed.\n
+
+        Returns: Whether or not the file could be loaded
+        '''
+        all_words = self.map_packed(packed_cache_path)
+        if (all_words == None):
+            return False
+
+        self.all_words = all_words
+        self.small_words = all_words.get_small_words()
+        return True
+
+    def __getstate__(self) -> dict:
+        '''
+        Used when the dictionary is sent to a worker process. The lookups are rebuilt by the worker,
+        and if there is a compiled file the worker maps that instead of receiving every word.
+        If the words are shared, the worker only receives the name of the shared block and attaches to it, and if
+        they are packed, the worker maps the packed copy if there is one or otherwise receives the packed buffer.
+        '''
+        state = self.__dict__.copy()
+        for name in ("word_set", "words_by_size", "matchers", "trie", "word_starts", "shared_finalizer"):
+            state.pop(name, None)
+
+        # The worker looks words up in the shared block itself, so it doesn't need any copy of them
+        if (self.shared_words != None):
+            state.pop("all_words")
+            state.pop("small_words")
+            return state
+
+        # The small words are a view of the packed words, so the worker gets them back from all_words
+        if (self.is_packed()):
+            state.pop("small_words")
+            if (self.shared_words == None and self.packed_cache_path != None and os.path.exists(self.packed_cache_path)):
+                state.pop("all_words")
+        elif (self.cache_path != None and os.path.exists(self.cache_path)):
+            state.pop("all_words")
+            state.pop("small_words")
+
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        if (self.shared_words != None and not "all_words" in state):
+            self.all_words = self.shared_words
+            self.small_words = self.shared_words.get_small_words()
+            self.build_lookups()
+            return
+
+        if (not "all_words" in state):
+            if (self.compact and self.load_packed(self.packed_cache_path)):
+                self.build_lookups()
+                return
+            if (not self.load_compiled(self.cache_path)):
+                raise ValueError(f'Could not load compiled dictionary {self.cache_path}')
+
+        if (isinstance(self.all_words, PackedWordList)):
+            self.small_words = self.all_words.get_small_words()
+        elif (self.compact):
+            self.pack_words()
+        self.build_lookups()
+
+    def is_packed(self) -> bool:
+        '''
+        Returns whether or not the words are packed into one buffer, either because the dictionary is compact or
+        because the words are shared (see PackedWordList and SharedWordList).
+        '''
+        return isinstance(self.all_words, PackedWordList)
+
+    def pack_words(self):
+        '''
+        Packs all_words and small_words into one buffer, see PackedWordList.
+        '''
+        self.all_words = PackedWordList.from_words(self.all_words, self.small_words)
+        self.small_words = self.all_words.get_small_words()
+
+    def build_lookups(self):
+        '''
+        Builds the lookup structures used by is_word and get_words_of_size from all_words.
+        This must be called again if all_words is changed.
+        '''
+        # Packed words are their own lookups, so nothing is copied. The words of each size are only
+        # turned into strings the first time they are asked for, see get_words_of_size
+        if (self.is_packed()):
+            self.word_set = self.all_words
+            self.words_by_size = {}
+            self.matchers = {}
+            self.trie = None
+            self.word_starts = None
+            return
+
+        # A set of every valid word, for constant time membership checks
+        self.word_set: frozenset[str] = frozenset(self.all_words)
+
+        # Every valid word grouped by its length (each group stays sorted alphabetically)
+        self.words_by_size: dict[int, list[str]] = {}
+        for word in self.all_words:
+            if (not len(word) in self.words_by_size):
+                self.words_by_size[len(word)] = []
+            self.words_by_size[len(word)].append(word)
+
+        # Word matchers for key_contains_valid_word, built the first time each min_size is used
+        self.matchers: dict[int, AhoCorasick] = {}
+
+        # A trie of every valid word for prefix checks, built the first time it is used
+        self.trie: Trie | None = None
+
+        # The first three letters of every valid word, grouped by word length, built the first time they are used
+        self.word_starts: dict[int, frozenset[str]] | None = None
+
+    def share(self):
+        '''
+        Publishes the words in a block of shared memory (see SharedWordList). This process keeps its own words and lookups,
+        but a worker process that is sent the dictionary only receives the name of the block and attaches to it. The worker
+        looks words up straight in the block's hash table and size index, without copying or indexing any of the words,
+        so it starts almost instantly and the words are only in memory once however many workers there are.\n
+        Looking a word up in the block is several times slower than in a python set, which is the same trade-off as a compact
+        dictionary, so the solvers only share compact dictionaries (see sharing). The trie and word matchers are still built
+        by each process that uses them. The block is freed by unshare, or when the dictionary is deleted.
+        '''
+        if (self.shared_words != None):
+            return
+
+        # Words that are already packed only need copying into the block
+        if (self.is_packed()):
+            self.shared_words = SharedWordList.publish(self.all_words.buffer)
+        else:
+            self.shared_words = SharedWordList.create(self.all_words, self.small_words)
+        self.shared_finalizer = weakref.finalize(self, self.shared_words.close)
+
+    def unshare(self):
+        '''
+        Frees the shared block. A dictionary that was attached to the block (in a worker process) copies the words back out
+        of it first (still packed, or mapped from the packed copy if there is one, if the dictionary is compact).
+        Workers still attached to the block keep their view of it until they exit.
+        '''
+        if (self.shared_words == None):
+            return
+
+        # The process that published the block never stopped using its own words
+        if (not self.all_words is self.shared_words):
+            self.shared_finalizer()
+            self.shared_words = None
+            return
+
+        if (self.compact):
+            all_words = self.map_packed(self.packed_cache_path)
+            if (all_words == None):
+                all_words = PackedWordList(bytes(self.all_words.buffer))
+            small_words = all_words.get_small_words()
+        else:
+            all_words = list(self.all_words)
+            small_words = list(self.small_words)
+        self.small_words.close()
+        self.shared_words.close()
+        self.shared_words = None
+        self.all_words = all_words
+        self.small_words = small_words
+        self.build_lookups()
+
+    @contextmanager
+    def sharing(self, backend: str) -> Iterator[None]:
+        '''
+        Shares the words (see share) for as long as the context is open, if the workers of the given WorkerPool backend are
+        processes and the dictionary is compact. Anything already shared is left as it is.
+        '''
+        if (backend != "process" or not self.compact or self.shared_words != None):
+            yield
+            return
+
+        self.share()
+        try:
+            yield
+        finally:
+            self.unshare()
+
+    def get_trie(self) -> Trie:
+        '''
+        Gets a character trie of every valid word, building it the first time it is asked for.
+        '''
+        if (self.trie == None):
+            self.trie = Trie(self.all_words)
+        return self.trie
+
+    def has_prefix(self, prefix: str, length: int | None = None) -> bool:
+        '''
+        Returns whether or not any valid word starts with the given prefix. Packed words are binary searched,
+        otherwise this uses the trie.\n
+
+        length: If given, only words of exactly this length are counted
+        '''
+        if (self.is_packed()):
+            return self.all_words.has_prefix(prefix, length)
+        return self.get_trie().has_prefix(prefix, length)
+
+    def words_with_prefix(self, prefix: str) -> list[str]:
+        '''
+        Returns every valid word that starts with the given prefix, in alphabetical order.
+        '''
+        if (self.is_packed()):
+            return self.all_words.words_with_prefix(prefix)
+        return self.get_trie().words_with_prefix(prefix)
+
+    def get_word_starts(self) -> dict[int, frozenset[str]]:
+        '''
+        Gets the first three letters of every valid word (the whole word, if it is shorter), grouped by the length of
+        the word, building them the first time they are asked for. A word with a start that isn't in its length's
+        group can't be valid, which rules most words out without looking at the rest of them.
+        '''
+        if (self.word_starts == None):
+            word_starts = {}
+            for word in self.all_words:
+                if (not len(word) in word_starts):
+                    word_starts[len(word)] = set()
+                word_starts[len(word)].add(word[:3])
+            self.word_starts = {size: frozenset(starts) for size, starts in word_starts.items()}
+        return self.word_starts
+
+    def get_matcher(self, min_size: int = 1) -> AhoCorasick:
+        '''
+        Gets a matcher for every valid word that is at least min_size characters long,
+        building it the first time it is asked for.
+        '''
+        if (not min_size in self.matchers):
+            self.matchers[min_size] = AhoCorasick([word for word in self.all_words if len(word) >= min_size])
+        return self.matchers[min_size]
 
     # Takes a sorted list as an input and returns that list without duplicate values
     def remove_duplicates(self, words_list: list[str]) -> list[str]:
@@ -74,62 +443,21 @@ class WordDictionary:
         '''
         text = text.lower()
         text = text.split('(')[0]
-        output = ""
-        for letter in text:
-            if (letter in self.ALPHABET):
-                output += letter
-        
-        return output
+        return "".join(letter for letter in text if letter in self.ALPHABET)
 
     def is_word(self, word: str) -> bool:
         '''
-        Binary search to determine if the word is a valid word (i.e. is it in the all_words list)
-        '''
-        upper = len(self.all_words) - 1
-        lower = 0
-        index = (upper + lower) // 2
-        while (index != upper and index != lower):
-            if (word == self.all_words[index]):
-                return True
-            elif (word < self.all_words[index]):
-                upper = index
-            else:
-                lower = index
-            index = (upper + lower) // 2
-        return False
+        Determine if the word is a valid word (i.e. is it in the all_words list)
+        '''
+        return word in self.word_set
     
     def is_beginning_of_word(self, text: str) -> bool | list[str]:
         '''
-        Binary search to determine if the string is the beginning of a valid word (i.e. is it in the all_words list)\n
+        Determine if the string is the beginning of a valid word (i.e. does any word in the all_words list start with it)\n
         
         Returns: A list of the words that begin with the given text, or False if none exist
         '''
-        output = []
-
-        # Use a binary search to go through all_words, finding a valid word that begins with
-        # the given text
-        upper = len(self.all_words) - 1
-        lower = 0
-        index = (upper + lower) // 2
-        while (index != upper and index != lower):
-            if (self.all_words[index].startswith(text)):
-                break
-            elif (text < self.all_words[index]):
-                upper = index
-            else:
-                lower = index
-            index = (upper + lower) // 2
-
-        # Since all_words is sorted alphabetically, we can search the surrounding words
-        # adding all the words that begin with the given text
-        back_index = index - 1
-        while (self.all_words[back_index].startswith(text)):
-            output.append(self.all_words[back_index])
-            back_index -= 1
-
-        while (self.all_words[index].startswith(text)):
-            output.append(self.all_words[index])
-            index += 1
+        output = self.words_with_prefix(text)
         
         # Return
         if (len(output) == 0):
@@ -140,23 +468,22 @@ class WordDictionary:
     def key_contains_valid_word(self, key: str, min_size: int = 1) -> bool:
         '''
         Returns whether or not the given key contains a valid word\n
-        This is not as efficient as the other methods since it doesn't use binary search, 
-        instead looping through every valid word.\n
 
         key: The key to check\n
         min_size: The minimum size of the valid word
         '''
-        # Loop through every valid word
-        for word in self.all_words:
-            # Ignore any word less than the minimum size
-            if (len(word) < min_size):
-                continue
+        return self.get_matcher(min_size).contains_any(key)
 
-            # Check if the key includes the valid word anywhere in it
-            if (key.find(word) != -1):
-                return True
-        
-        return False
+    def find_valid_words_in_key(self, key: str, min_size: int = 1) -> list[tuple[int, str]]:
+        '''
+        Finds every valid word anywhere in the given key.\n
+
+        key: The key to check\n
+        min_size: The minimum size of the valid words
+
+        Returns: A list of (offset, word) for every valid word in the key
+        '''
+        return self.get_matcher(min_size).find_all(key)
     
 
     def contains_valid_word(self, text: str) -> bool:
@@ -168,21 +495,15 @@ class WordDictionary:
         text_ar = text.split(' ')
 
         # Check if any of the words in the string are valid words
-        for word in text_ar:
-            if self.is_word(word):
-                return True
-        return False
+        return not self.word_set.isdisjoint(text_ar)
     
     def get_words_of_size(self, size: int) -> list[str]:
         '''
         Gets a list of all valid words that are the given size
         '''
-        output = []
-        for word in self.all_words:
-            if len(word) == size:
-                output.append(word)
-        
-        return output
+        if (self.is_packed() and not size in self.words_by_size):
+            self.words_by_size[size] = self.all_words.get_words_of_size(size)
+        return self.words_by_size.get(size, [])
     
     def filter_string(self, text: str, min_word_size: int) -> str:
         '''
@@ -194,10 +515,7 @@ class WordDictionary:
 
         # new_text will be the old text but only with spaces and characters that
         # are in the supplied alphabet
-        new_text = ""
-        for character in text:
-            if (character == " " or character in self.ALPHABET):
-                new_text += character
+        new_text = "".join(character for character in text if character == " " or character in self.ALPHABET)
 
         # Split the sentence into an array of words
         text_ar = new_text.split(' ')
@@ -215,39 +533,20 @@ class WordDictionary:
         output = output.removesuffix(" ")
         return output
     
-    def is_promising_key(key: str) -> int:
+    def is_promising_key(self, key: str) -> int:
         '''
         Check if a given key is "promising", which here is checked by seeing
-        if the key repeats at all.\n
+        if the key repeats at all. A key that is made of a shorter key repeated (ex: "abab")
+        decodes exactly the same as that shorter key, so it isn't worth testing.\n
 
         key: The key to check\n
 
         Returns: The length of the repeating substring (or 0 if doesn't exist)
         '''
 
-        # Get the key in reverse
-        key_rev = key[::-1]
-
-        # See if there is another instance of the first letter in the key
-        # If there is, keep track of where it is in the key
-        # If there isn't, the key can't be repeating, so return 0
-        try:
-            rev_index = key_rev.index(key[0], 1, len(key_rev) - 1)
-        except:
+        # A key is a repeat of its first n letters exactly when it shows up n letters into
+        # itself doubled, and the first place it shows up is the shortest repeating substring
+        repeat_length = (key + key).find(key, 1)
+        if (repeat_length <= 0 or repeat_length >= len(key)):
             return 0
-        
-        # Loop through the key and its reverse, starting at the obtained index,
-        # checking that each character matches until you reach the beginning of the reverse
-        # key (which is the end of the forward key)
-        #
-        # for_index will be the index of the character we are looking at in the forward key
-        # repeat_length is kept track of for returning purposes, as that is eqal to the length
-        #   of the repeating substring if it exists
-        for_index = 0
-        repeat_length = rev_index
-        while rev_index >= 0:
-            if (key_rev[rev_index] != key[for_index]):
-                return 0
-            for_index += 1
-            rev_index -= 1
         return repeat_length
\ No newline at end of file
@@ -0,0 +1,213 @@
+from collections.abc import Callable, Iterator
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+
+# The ways work can be run. "free_threaded" uses threads, but only on a python build without the GIL.
+BACKENDS = ("thread", "process", "free_threaded")
+
+def is_free_threaded() -> bool:
+    '''
+    Returns whether or not this python build is running without the GIL
+    '''
+    return hasattr(sys, "_is_gil_enabled") and not sys._is_gil_enabled()
+
+def default_backend() -> str:
+    '''
+    Returns the fastest backend available, threads if there is no GIL and processes otherwise.
+    '''
+    if (is_free_threaded()):
+        return "free_threaded"
+    return "process"
+
+def get_parallelism(num_workers: int, backend: str) -> int:
+    '''
+    Returns how many workers can really run at the same time. Threads with the GIL only ever run one at a time,
+    and nothing runs more at once than there are cpu cores.
+    '''
+    if (backend == "thread" and not is_free_threaded()):
+        return 1
+    return max(1, min(num_workers, os.cpu_count() or 1))
+
+def iterate_queue(work_queue) -> Iterator:
+    '''
+    Yields chunks from the shared work queue until the stop signal (None) is reached.
+    '''
+    while True:
+        chunk = work_queue.get()
+        if (chunk == None):
+            return
+        yield chunk
+
+def worker_main(target: Callable[[Iterator, int], any], work_queue, result_queue, worker_index: int):
+    '''
+    The function every worker runs. Hands the worker's share of the queue to target and
+    sends back whatever it returns (or the exception it raised).
+    '''
+    try:
+        result = target(iterate_queue(work_queue), worker_index)
+        result_queue.put((worker_index, result, None))
+    except BaseException as error:
+        result_queue.put((worker_index, None, repr(error)))
+
+def stream_worker_main(target: Callable[[Iterator, int], Iterator], work_queue, result_queue, worker_index: int):
+    '''
+    The function every worker runs when streaming. Sends back everything target yields as soon as it is
+    yielded, followed by a finished message (with the exception it raised, if any).
+    '''
+    try:
+        for item in target(iterate_queue(work_queue), worker_index):
+            result_queue.put((worker_index, (item,), None))
+        result_queue.put((worker_index, None, None))
+    except BaseException as error:
+        result_queue.put((worker_index, None, repr(error)))
+
+class WorkerPool:
+    def __init__(self, num_workers: int, backend: str | None = None):
+        '''
+        Runs a function across many small chunks of work using a shared queue, so a worker
+        that finishes early just takes the next chunk instead of sitting idle.\n
+
+        num_workers: The number of workers to run at once\n
+        backend: One of BACKENDS. By default this is the fastest one available (see default_backend)
+        '''
+        if (backend == None):
+            backend = default_backend()
+        if (not backend in BACKENDS):
+            raise ValueError(f'Unknown backend "{backend}", expected one of {BACKENDS}')
+
+        if (backend == "free_threaded" and not is_free_threaded()):
+            print("Warning: This python build has the GIL enabled, using processes instead of free threads")
+            backend = "process"
+
+        self.num_workers = max(1, num_workers)
+        self.backend = backend
+
+    def start_workers(self, worker_main_func: Callable, target: Callable, chunks: list, max_pending: int = 0) -> tuple:
+        '''
+        Queues up every chunk followed by a stop signal for every worker, then starts the workers.\n
+
+        max_pending: The most results that can wait to be read before the workers have to wait, or 0 for no limit
+
+        Returns: (work_queue, result_queue, workers)
+        '''
+        if (self.backend == "process"):
+            work_queue = multiprocessing.Queue()
+            result_queue = multiprocessing.Queue(max_pending)
+            worker_type = multiprocessing.Process
+        else:
+            work_queue = queue.Queue()
+            result_queue = queue.Queue(max_pending)
+            worker_type = threading.Thread
+
+        # Queue up all the work, followed by a stop signal for every worker
+        for chunk in chunks:
+            work_queue.put(chunk)
+        for i in range(self.num_workers):
+            work_queue.put(None)
+
+        workers = []
+        for i in range(self.num_workers):
+            worker = worker_type(target=worker_main_func, args=(target, work_queue, result_queue, i))
+            workers.append(worker)
+            worker.start()
+
+        return (work_queue, result_queue, workers)
+
+    def run(self, target: Callable[[Iterator, int], any], chunks: list) -> list:
+        '''
+        Runs target in every worker until all the chunks have been handed out.\n
+        target must accept an iterator of chunks and a worker index. For the process backend
+        it must also be picklable (a module level function or a method of a picklable object).\n
+
+        Returns: A list of what target returned in each worker, ordered by worker index
+        '''
+        work_queue, result_queue, workers = self.start_workers(worker_main, target, chunks)
+
+        # Results have to be read before joining, otherwise a process can block on a full pipe
+        results = [None] * self.num_workers
+        errors = []
+        finished = set()
+        for i in range(self.num_workers):
+            worker_index, result, error = self.get_result(result_queue, workers, finished)
+            finished.add(worker_index)
+            results[worker_index] = result
+            if (error != None):
+                errors.append(f'worker {worker_index}: {error}')
+
+        for worker in workers:
+            worker.join()
+
+        if (len(errors) > 0):
+            raise RuntimeError("Worker failed: " + "; ".join(errors))
+
+        return results
+
+    def stream(self, target: Callable[[Iterator, int], Iterator], chunks: list, max_pending: int = 1024) -> Iterator:
+        '''
+        Runs target in every worker like run, but yields everything the workers yield as soon as it arrives
+        instead of waiting for them all to finish. The order of results between workers isn't fixed.\n
+        target must be a generator that accepts an iterator of chunks and a worker index.\n
+
+        max_pending: The most results that can wait to be read. Once this many are waiting the workers
+            wait too, so a slow reader never builds up an unbounded backlog.
+        '''
+        work_queue, result_queue, workers = self.start_workers(stream_worker_main, target, chunks, max_pending)
+
+        errors = []
+        finished = set()
+        try:
+            while (len(finished) < self.num_workers):
+                worker_index, item, error = self.get_result(result_queue, workers, finished)
+                if (item != None):
+                    yield item[0]
+                    continue
+
+                finished.add(worker_index)
+                if (error != None):
+                    errors.append(f'worker {worker_index}: {error}')
+        finally:
+            # If the reader stopped early, throw away the remaining work and results so every worker can finish
+            if (len(finished) < self.num_workers):
+                self.cancel(work_queue, result_queue, workers, finished)
+
+            for worker in workers:
+                worker.join()
+
+        if (len(errors) > 0):
+            raise RuntimeError("Worker failed: " + "; ".join(errors))
+
+    def cancel(self, work_queue, result_queue, workers: list, finished: set[int]):
+        '''
+        Empties the work queue so every worker stops after its current chunk, then reads
+        and throws away results until every worker is finished.
+        '''
+        try:
+            while True:
+                work_queue.get_nowait()
+        except queue.Empty:
+            pass
+        for i in range(self.num_workers):
+            work_queue.put(None)
+
+        while (len(finished) < self.num_workers):
+            worker_index, item, error = self.get_result(result_queue, workers, finished)
+            if (item == None):
+                finished.add(worker_index)
+
+    def get_result(self, result_queue, workers: list, finished: set[int]) -> tuple[int, any, str | None]:
+        '''
+        Waits for the next worker result, checking that a process hasn't died without sending one.\n
+        finished: The indices of the workers that have already been accounted for
+        '''
+        while True:
+            try:
+                return result_queue.get(timeout=1)
+            except queue.Empty:
+                if (self.backend != "process"):
+                    continue
+                for i in range(len(workers)):
+                    if (not i in finished and not workers[i].is_alive() and workers[i].exitcode != 0):
+                        return (i, None, f'exited with code {workers[i].exitcode}')
@@ -0,0 +1,197 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from BruteForce import BruteForce
+from LazyEvaluator import LazyEvaluator
+from WordDictionary import WordDictionary
+from vigenere import encode_vig, decode_vig, decode_beaufort, decode_variant_beaufort, reverse_vig
+
+## Measures how fast the cipher functions, dictionary lookups and solution checks are on fixed inputs,
+## so a change can be checked for speed ups and slow downs. Every benchmark reports how many times a second
+## it runs and the most memory a single run allocates.
+##
+## Run "python benchmark.py --save-baseline" once to record a baseline, then run "python benchmark.py"
+## after a change. Anything that got slower (or allocates more) than the baseline by more than the tolerance
+## is flagged, and the script exits with an error code. benchmark_baseline.json is a baseline recorded from this
+## repository, but timings depend on the machine, so record your own before comparing against it.
+## Pass --require-baseline (ex: in CI) to also fail when a benchmark has nothing in the baseline to compare against.
+
+# The encoded text from main.py
+MAIN_ENCODED_TEXT = "Ihgvq mbuvhmafvobac rvon. Jhfxvqnl xy xmkw gwa cotfibf qt aaw hnud."
+
+# The key used to make the synthetic texts, and to decode every text
+BENCHMARK_KEY = "dragonking"
+
+# A key that isn't the real one, for checks that have to look through most of the text before giving up
+WRONG_KEY = "gniknogard"
+
+# The sizes of the synthetic texts, in characters
+SYNTHETIC_SIZES = {"1kb": 1_000, "10kb": 10_000, "100kb": 100_000, "1mb": 1_000_000}
+
+DEFAULT_BASELINE_PATH = "benchmark_baseline.json"
+
+def make_synthetic_text(words: list[str], size: int, seed: int = 0) -> str:
+    '''
+    Makes a sentence-like text of exactly size characters out of random dictionary words. The same seed always gives the same text.
+    '''
+    generator = random.Random(seed)
+    parts = []
+    length = 0
+    while (length < size):
+        word = generator.choice(words)
+        if (generator.random() < 0.1):
+            word += "."
+        parts.append(word)
+        length += len(word) + 1
+
+    return " ".join(parts)[:size]
+
+def get_inputs(word_dict: WordDictionary, max_size: int) -> dict[str, str]:
+    '''
+    Returns every encoded input text by name: the text from main.py, then each synthetic size up to max_size.
+    '''
+    inputs = {"main": MAIN_ENCODED_TEXT}
+    for name, size in SYNTHETIC_SIZES.items():
+        if (size <= max_size):
+            inputs[name] = encode_vig(make_synthetic_text(word_dict.all_words, size), BENCHMARK_KEY)
+    return inputs
+
+def get_benchmarks(word_dict: WordDictionary, inputs: dict[str, str]) -> dict[str, Callable[[], any]]:
+    '''
+    Returns every benchmark by name, as a function that runs it once.
+    '''
+    benchmarks = {}
+
+    # Loading the dictionary, both from the .csv files and from the compiled cache
+    benchmarks["WordDictionary.load_csv"] = lambda: WordDictionary(cache_dir=None)
+    benchmarks["WordDictionary.load_cached"] = lambda: WordDictionary()
+    benchmarks["WordDictionary.load_compact"] = lambda: WordDictionary(compact=True)
+
+    brute_force = BruteForce(MAIN_ENCODED_TEXT, decode_vig, 1, word_dict=word_dict, num_cores=1)
+    for input_name, encoded_text in inputs.items():
+        decoded_text = decode_vig(encoded_text, BENCHMARK_KEY)
+        filtered_text = word_dict.filter_string(decoded_text, 5)
+        is_valid = brute_force.contains_valid_word_by_size(decoded_text)
+
+        # reverse_vig only takes alphabet characters
+        encoded_letters = "".join(character for character in encoded_text.lower() if character in word_dict.ALPHABET)
+        decoded_letters = decode_vig(encoded_letters, BENCHMARK_KEY)
+
+        # Default arguments pin each lambda to this input's values
+        benchmarks[f'encode_vig[{input_name}]'] = lambda text=decoded_text: encode_vig(text, BENCHMARK_KEY)
+        benchmarks[f'decode_vig[{input_name}]'] = lambda text=encoded_text: decode_vig(text, BENCHMARK_KEY)
+        benchmarks[f'decode_beaufort[{input_name}]'] = lambda text=encoded_text: decode_beaufort(text, BENCHMARK_KEY)
+        benchmarks[f'decode_variant_beaufort[{input_name}]'] = lambda text=encoded_text: decode_variant_beaufort(text, BENCHMARK_KEY)
+        benchmarks[f'reverse_vig[{input_name}]'] = lambda plaintext=decoded_letters, ciphertext=encoded_letters: reverse_vig(plaintext, ciphertext)
+
+        benchmarks[f'WordDictionary.is_word[{input_name}]'] = lambda words=decoded_text.split(' '): [word_dict.is_word(word) for word in words]
+        benchmarks[f'WordDictionary.filter_string[{input_name}]'] = lambda text=decoded_text: word_dict.filter_string(text, 5)
+        benchmarks[f'WordDictionary.contains_valid_word[{input_name}]'] = lambda text=filtered_text: word_dict.contains_valid_word(text)
+        benchmarks[f'WordDictionary.key_contains_valid_word[{input_name}]'] = lambda text=encoded_letters: word_dict.key_contains_valid_word(text, 5)
+
+        benchmarks[f'BruteForce.contains_valid_word_by_size[{input_name}]'] = lambda text=decoded_text: brute_force.contains_valid_word_by_size(text)
+        benchmarks[f'LazyEvaluator.check[{input_name}]'] = lambda evaluator=LazyEvaluator(encoded_text, decode_vig, word_dict, brute_force.separators): evaluator.check(WRONG_KEY)
+        benchmarks[f'BruteForce.check_solution[{input_name}]'] = lambda text=decoded_text, is_valid=is_valid: brute_force.check_solution(BENCHMARK_KEY, text, io.StringIO(), io.StringIO(), io.StringIO(), is_valid)
+
+    return benchmarks
+
+def measure(func: Callable[[], any], min_time: float) -> dict[str, float]:
+    '''
+    Runs func over and over for at least min_time seconds (and at least once), then once more
+    while tracing memory.\n
+
+    Returns: A dictionary with the runs per second and the most bytes allocated at once by a single run
+    '''
+    num_runs = 0
+    start_time = time.perf_counter()
+    elapsed = 0.0
+    while (num_runs == 0 or elapsed < min_time):
+        func()
+        num_runs += 1
+        elapsed = time.perf_counter() - start_time
+
+    # Memory is traced on its own run, since tracing slows everything down
+    tracemalloc.start()
+    func()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"ops_per_sec": num_runs / elapsed, "peak_bytes": peak_bytes}
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], tolerance: float) -> list[str]:
+    '''
+    Returns the names of every benchmark that is slower, or allocates more, than its baseline by more than tolerance (ex: 0.2 for 20%).
+    '''
+    regressions = []
+    for name, result in results.items():
+        if (not name in baseline):
+            continue
+
+        expected = baseline[name]
+        if (result["ops_per_sec"] < expected["ops_per_sec"] * (1 - tolerance) or result["peak_bytes"] > expected["peak_bytes"] * (1 + tolerance) + 1024):
+            regressions.append(name)
+
+    return regressions
+
+def main(args: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the cipher functions, dictionary lookups and solution checks.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="The baseline file to compare against or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="Save these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="How much slower (as a fraction) a benchmark can be before it is flagged")
+    parser.add_argument("--min-time", type=float, default=0.2, help="The least amount of seconds to run each benchmark for")
+    parser.add_argument("--max-size", type=int, default=max(SYNTHETIC_SIZES.values()), help="The largest synthetic text to benchmark, in characters")
+    parser.add_argument("--filter", default="", help="Only run benchmarks with this in their name")
+    parser.add_argument("--require-baseline", action="store_true", help="Fail if the baseline is missing or doesn't have every benchmark that was run")
+    options = parser.parse_args(args)
+
+    # The dictionary prints every time it loads, which would bury the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        word_dict = WordDictionary()
+        benchmarks = get_benchmarks(word_dict, get_inputs(word_dict, options.max_size))
+
+    baseline = {}
+    if (os.path.exists(options.baseline)):
+        with open(options.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results = {}
+    for name, func in benchmarks.items():
+        if (not options.filter in name):
+            continue
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = measure(func, options.min_time)
+
+        change = ""
+        if (name in baseline):
+            change = f' ({results[name]["ops_per_sec"] / baseline[name]["ops_per_sec"] - 1:+.1%} vs baseline)'
+        print(f'{name:<55} {results[name]["ops_per_sec"]:>14,.1f} ops/sec {results[name]["peak_bytes"] / 1024:>12,.1f} KiB peak{change}')
+
+    if (options.save_baseline):
+        baseline.update(results)
+        with open(options.baseline, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        print(f'Saved {len(results)} results to {options.baseline}')
+        return 0
+
+    # Without a baseline nothing can be flagged, which would pass silently
+    missing = [name for name in results if not name in baseline]
+    if (len(missing) > 0):
+        print(f'No baseline for {len(missing)} of {len(results)} benchmarks in {options.baseline}, run with --save-baseline to record one')
+        if (options.require_baseline):
+            return 1
+
+    regressions = compare(results, baseline, options.tolerance)
+    for name in regressions:
+        print(f'Regression: {name}')
+    return 1 if len(regressions) > 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,46 +1,135 @@
 from BruteForce import BruteForce
+from CribDrag import CribDrag
 from DictCompare import DictCompare
+from FrequencySolver import FrequencySolver
 from WordDictionary import WordDictionary
 from vigenere import decode_vig, decode_beaufort, decode_variant_beaufort, reverse_vig
 
-## This is the encoded text. The current value is the text I was trying to decode,
-## feel free to change this to whatever your text is.
-encoded_text = "Ihgvq mbuvhmafvobac rvon. Jhfxvqnl xy xmkw gwa cotfibf qt aaw hnud."
+## Solvers run their workers in separate processes, which re-import this file
+## on some platforms, so everything is kept under this check.
+if __name__ == "__main__":
+    ## This is the encoded text. The current value is the text I was trying to decode,
+    ## feel free to change this to whatever your text is.
+    encoded_text = "Ihgvq mbuvhmafvobac rvon. Jhfxvqnl xy xmkw gwa cotfibf qt aaw hnud."
 
-## Initialize a WordDictionary with my dictionary files.
-## Change these file paths to change the list of words considered valid.
-word_dict = WordDictionary(dictionary_file_paths=["word_lists/words.csv", "word_lists/dnd-monsters.csv", "word_lists/dnd-spells.csv"], small_words_max_length=3)
+    ## Initialize a WordDictionary with my dictionary files.
+    ## Change these file paths to change the list of words considered valid.
+    ## For dictionaries of millions of words, pass compact=True to pack the words into one buffer, which takes
+    ## several times less memory (see PackedWordList). Checking words is a little slower. The packed words are cached
+    ## in dictionary_cache, so after the first run they are memory mapped straight from the file. While a solver runs
+    ## with process workers, a compact dictionary is also put in shared memory, so every worker looks words up in the
+    ## one copy instead of loading its own (see WordDictionary.share).
+    word_dict = WordDictionary(dictionary_file_paths=["word_lists/words.csv", "word_lists/dnd-monsters.csv", "word_lists/dnd-spells.csv"], small_words_max_length=3)
 
-#### Brute force method. ####
-## This will work best if the key is either small or
-## does not contain a valid word. As you test more characters with this
-## method, it will take exponentially more time to complete.
-##
-## Uncomment the following lines to try and find your key through brute force.
-# brute_force = BruteForce(encoded_text, decode_vig, 4, word_dict=word_dict, separators=(6, 7, 12), num_cores=16)
-# brute_force.solve()
+    #### Brute force method. ####
+    ## This will work best if the key is either small or
+    ## does not contain a valid word. As you test more characters with this
+    ## method, it will take exponentially more time to complete.
+    ##
+    ## The keyspace is split into small chunks that num_cores workers share. By default the
+    ## workers are separate processes, pass backend="thread" to use threads instead.
+    ##
+    ## If you're confident one of the encoded words decodes to a real word, pass its index as
+    ## prune_word_index (0 is the first word). Any key that can't make that word valid is skipped
+    ## along with every longer key starting with it, which makes much longer keys reachable.
+    ##
+    ## Pass lazy=True to check each key by decoding the encoded words one at a time, longest first, stopping at the
+    ## first valid one. Only keys that are logged get their whole text decoded, which is much faster for most keys.
+    ## DictCompare takes lazy=True the same way.
+    ##
+    ## Keys that decode the same as a shorter key are never tested: keys made of a shorter key repeated
+    ## (ex: "abab" is the same as "ab"), and keys longer than the number of letters in the encoded text.
+    ##
+    ## Long runs can be given a checkpoint_path. If the run is stopped, call resume with the same
+    ## checkpoint file (and the same settings) to pick it back up where it left off.
+    ##
+    ## While solving, the keys tested, keys per second and time left are printed every progress_interval
+    ## seconds. Pass progress_path to also log each report as a line of json (DictCompare takes the same).
+    ## If a run is slow, pass profile_sample_rate (ex: 100) to see how the time splits between decoding keys,
+    ## checking them for valid words and logging them.
+    ##
+    ## To handle results yourself instead of reading the output files, loop over iter_solutions,
+    ## which yields every (key, decoded_text, is_valid) as soon as a worker finds it.
+    ## DictCompare has the same with iter_solutions, iter_two_word_keys and iter_quick_solve.
+    ##
+    ## To split a long search across machines, pass shard=(shard_index, num_shards) to test only part of the
+    ## keyspace, or use shard.py, which runs a shard from the command line and merges the results after.
+    ##
+    ## If you have several encoded texts that probably share a key, pass them all as a list instead of one text.
+    ## Every key is then tested on every text in the same run, and each text gets its own output files
+    ## (ex: output_7_letters_text_0.txt). Loop over iter_batch_solutions to get (text_index, key, decoded_text, is_valid).
+    ## DictCompare's solve and solve_two_word_keys take a list the same way.
+    ##
+    ## Uncomment the following lines to try and find your key through brute force.
+    # brute_force = BruteForce(encoded_text, decode_vig, 4, word_dict=word_dict, separators=(6, 7, 12), num_cores=16)
+    # brute_force.solve(checkpoint_path="brute_force.checkpoint")
+    # brute_force.resume("brute_force.checkpoint")
+    # for key, decoded_text, is_valid in brute_force.iter_solutions():
+    #     print(key, decoded_text)
 
-#### Dictionary compare method. ####
-## This works best if the key includes valid words.
-##
-## DictCompare.quick_solve will try and reverse engineer keys that give valid results,
-## then check those keys for valid words themselves. This works especially well if one
-## of your encoded words is long. This is the only function that will only log results
-## to the console, and NOT a file.
-##
-## DictCompare.solve will go through every single valid word, testing it out as a key.
-## This will only work if the key happens to be a single, real word, but it is comparatively
-## very quick to test so it's usually good to start here just in case.
-##
-## DictCompare.solve_two_word_keys will go through every single combination of two valid words
-## and use that combination as the key. This is significantly slower, but the time could be shortened
-## by setting the key_to_test property in the DictCompare to word_dict.small_words. This will limit
-## the words this will check to smaller words, assuming that if the key is two words combined, that those
-## words aren't very long.
-##
-## To use, first make sure to uncomment the initailization of dict_compare, then uncomment the test you want to run.
+    #### Dictionary compare method. ####
+    ## This works best if the key includes valid words.
+    ##
+    ## DictCompare.quick_solve will try and reverse engineer keys that give valid results,
+    ## then check those keys for valid words themselves. This works especially well if one
+    ## of your encoded words is long. This is the only function that will only log results
+    ## to the console, and NOT a file.
+    ##
+    ## DictCompare.solve_aligned_keys goes a step further. For every key length, each encoded word starts at a known
+    ## letter of the key, so the words' key fragments have to agree wherever they share a letter of the key. It only
+    ## prints whole keys that decode several encoded words into valid words at once. Raise max_skipped_words if some of
+    ## the encoded words (like names) probably aren't in the dictionary.
+    ##
+    ## DictCompare.solve will go through every single valid word, testing it out as a key.
+    ## This will only work if the key happens to be a single, real word, but it is comparatively
+    ## very quick to test so it's usually good to start here just in case.
+    ##
+    ## DictCompare.solve_two_word_keys will go through every single combination of two valid words
+    ## and use that combination as the key. This is significantly slower, but the time could be shortened
+    ## by setting the key_to_test property in the DictCompare to word_dict.small_words. This will limit
+    ## the words this will check to smaller words, assuming that if the key is two words combined, that those
+    ## words aren't very long. It can be given a checkpoint_path and picked back up with resume_two_word_keys,
+    ## the same way as BruteForce.
+    ##
+    ## DictCompare.solve_two_word_keys_constrained finds the same kind of keys much faster by only trying the
+    ## pairs of words that would decode one of the longest encoded words into a valid word. It only finds the key
+    ## if at least one of those long words (3 by default, see num_anchor_words) is in the dictionary.
+    ##
+    ## To use, first make sure to uncomment the initailization of dict_compare, then uncomment the test you want to run.
 
-dict_compare = DictCompare(encoded_text, decode_vig, word_dict=word_dict, rev_cipher_func=reverse_vig, keys_to_test=word_dict.small_words)
-dict_compare.quick_solve(5)
-# dict_compare.solve()
-# dict_compare.solve_two_word_keys()
+    dict_compare = DictCompare(encoded_text, decode_vig, word_dict=word_dict, rev_cipher_func=reverse_vig, keys_to_test=word_dict.small_words)
+    dict_compare.quick_solve(5)
+    # dict_compare.solve_aligned_keys(min_word_size=4, max_key_length=20, max_skipped_words=1)
+    # dict_compare.solve()
+    # dict_compare.solve_two_word_keys()
+    # dict_compare.solve_two_word_keys_constrained()
+
+    #### Frequency analysis method. ####
+    ## This works best if the encoded text is long (a few hundred letters or more), and doesn't care
+    ## how long the key is or whether it contains real words.
+    ##
+    ## FrequencySolver.solve guesses the most likely key lengths from the statistics of the encoded
+    ## text, then solves each letter of the key on its own by comparing the letter counts to english.
+    ##
+    ## Uncomment the following lines to try it.
+    # frequency_solver = FrequencySolver(encoded_text, decode_vig, max_key_length=20)
+    # frequency_solver.solve()
+
+    #### Crib dragging method. ####
+    ## This works best if you know (or can guess) a piece of the plaintext, like a character's name or "the dragon".
+    ##
+    ## CribDrag.solve slides the crib across every position of the encoded text and works out the key letters
+    ## that would put it there. If the crib is longer than the key, the right position gives key letters that
+    ## repeat every key length letters, which gives the whole key.
+    ##
+    ## A crib shorter than the key still cuts the keys worth trying down a lot. get_starting_key_parts gives the
+    ## key starts to pass to BruteForce as starting_key_part, and get_matching_keys gives the words to pass to
+    ## DictCompare as keys_to_test. Where the crib lands after the first letter of the key, the letters before it
+    ## could be anything, so every combination of them is given (up to max_free_letters, 2 by default). The key starts
+    ## only cover every position of the crib if it is at most max_free_letters shorter than the key.
+    ##
+    ## Uncomment the following lines to try it.
+    # crib_drag = CribDrag(encoded_text, "vigenere", max_key_length=20)
+    # crib_drag.solve("the dragon")
+    # brute_force = BruteForce(encoded_text, decode_vig, 4, word_dict=word_dict, starting_key_part=crib_drag.get_starting_key_parts("dragon", 7))
+    # dict_compare = DictCompare(encoded_text, decode_vig, word_dict=word_dict, keys_to_test=crib_drag.get_matching_keys("dragon", word_dict.all_words))
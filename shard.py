@@ -0,0 +1,186 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from BruteForce import BruteForce
+from Checkpoint import Checkpoint
+from WordDictionary import WordDictionary
+from vigenere import CIPHER_FUNCS
+
+## Splits one brute force search across machines. Every machine runs its own shard of the keyspace with
+## the same settings, and no machine needs to talk to any other:
+##
+##   python shard.py run --shard 0 --num-shards 4 --digits 7 --text "Ihgvq mbuvhmafvobac rvon."
+##   python shard.py run --shard 1 --num-shards 4 --digits 7 --text "Ihgvq mbuvhmafvobac rvon."
+##   ...
+##
+## Each shard writes its output files and a shard.json manifest to shards/shard_<i>_of_<n>. The manifest
+## is only written once the shard is finished, so a shard without one was stopped early and can be run again
+## (it picks back up from its checkpoint). Once every shard is finished, copy the shard folders together and run
+##
+##   python shard.py merge shards --output-dir merged
+##
+## to combine them into one set of output files.
+
+MANIFEST_NAME = "shard.json"
+CHECKPOINT_NAME = "shard.checkpoint"
+
+def get_shard_dir(output_dir: str, shard_index: int, num_shards: int) -> str:
+    '''
+    Returns the folder a shard writes its output files and manifest to.
+    '''
+    return os.path.join(output_dir, f'shard_{shard_index}_of_{num_shards}')
+
+def get_fingerprint(options: argparse.Namespace) -> str:
+    '''
+    Returns a hash of every setting that has to be the same across shards for them to be merged.
+    '''
+    return Checkpoint.get_fingerprint([options.text, options.cipher, options.digits, options.starting_key_part,
+                                       options.separators, options.dictionary, options.num_shards])
+
+def run_shard(options: argparse.Namespace) -> int:
+    '''
+    Tests one shard of the keyspace, then writes its manifest.
+    '''
+    # The dictionary is loaded before moving into the shard's folder, so its paths stay relative to here
+    word_dict = WordDictionary(dictionary_file_paths=options.dictionary)
+    brute_force = BruteForce(options.text if len(options.text) > 1 else options.text[0], options.cipher, options.digits, word_dict=word_dict,
+                             num_cores=options.cores, separators=tuple(options.separators), starting_key_part=options.starting_key_part,
+                             backend=options.backend, shard=(options.shard, options.num_shards))
+    start_index, end_index = brute_force.get_shard_range(options.shard, options.num_shards)
+    print(f'Shard {options.shard} of {options.num_shards}: keys {start_index:,} to {end_index:,} of {brute_force.count_indexed_keys():,}')
+    print(f'\tFirst key: {brute_force.index_to_key(start_index)} | Last key: {brute_force.index_to_key(end_index - 1)}' if end_index > start_index else '\tThis shard has no keys')
+
+    shard_dir = get_shard_dir(options.output_dir, options.shard, options.num_shards)
+    os.makedirs(shard_dir, exist_ok=True)
+    os.chdir(shard_dir)
+    if (os.path.exists(MANIFEST_NAME)):
+        print(f'Shard {options.shard} is already finished, see {os.path.join(shard_dir, MANIFEST_NAME)}')
+        return 0
+
+    start_time = time.time()
+
+    # Checkpoints only work with a single encoded text
+    if (len(options.text) == 1 and os.path.exists(CHECKPOINT_NAME)):
+        brute_force.resume(CHECKPOINT_NAME)
+    else:
+        # Output from a run that was stopped without a checkpoint can't be trusted, so start over
+        for output_path in brute_force.get_final_output_file_paths():
+            if (os.path.exists(output_path)):
+                os.remove(output_path)
+        brute_force.solve(checkpoint_path=CHECKPOINT_NAME if len(options.text) == 1 else None)
+
+    manifest = {
+        "shard_index": options.shard,
+        "num_shards": options.num_shards,
+        "start_index": start_index,
+        "end_index": end_index,
+        "fingerprint": get_fingerprint(options),
+        "output_files": brute_force.get_final_output_file_paths(),
+        "seconds": time.time() - start_time,
+    }
+    with open(MANIFEST_NAME, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+    print(f'Finished shard {options.shard} of {options.num_shards} in {manifest["seconds"]:.1f}s')
+    return 0
+
+def find_manifests(paths: list[str]) -> list[tuple[str, dict]]:
+    '''
+    Finds the manifest of every finished shard in the given folders, which can be shard folders or folders of them.\n
+
+    Returns: A list of (shard_dir, manifest)
+    '''
+    manifest_paths = []
+    for path in paths:
+        if (os.path.exists(os.path.join(path, MANIFEST_NAME))):
+            manifest_paths.append(os.path.join(path, MANIFEST_NAME))
+        else:
+            manifest_paths.extend(sorted(glob.glob(os.path.join(path, "shard_*", MANIFEST_NAME))))
+
+    manifests = []
+    for manifest_path in manifest_paths:
+        with open(manifest_path) as manifest_file:
+            manifests.append((os.path.dirname(manifest_path), json.load(manifest_file)))
+    return manifests
+
+def merge_shards(options: argparse.Namespace) -> int:
+    '''
+    Combines the output files of every shard into one set of output files, in keyspace order. Nothing is merged
+    unless every shard is finished and they were all run with the same settings.
+    '''
+    manifests = find_manifests(options.paths)
+    if (len(manifests) == 0):
+        print("No finished shards found")
+        return 1
+
+    fingerprints = set(manifest["fingerprint"] for shard_dir, manifest in manifests)
+    if (len(fingerprints) > 1):
+        print("The shards were run with different settings and can't be merged")
+        return 1
+
+    num_shards = manifests[0][1]["num_shards"]
+    shards = {}
+    for shard_dir, manifest in manifests:
+        shards.setdefault(manifest["shard_index"], shard_dir)
+
+    missing = [shard_index for shard_index in range(num_shards) if not shard_index in shards]
+    if (len(missing) > 0):
+        print(f'Missing {len(missing)} of {num_shards} shards: {", ".join(str(shard_index) for shard_index in missing)}')
+        return 1
+
+    os.makedirs(options.output_dir, exist_ok=True)
+    output_files = manifests[0][1]["output_files"]
+    for output_file in output_files:
+        num_lines = 0
+        with open(os.path.join(options.output_dir, output_file), 'w') as outfile:
+            for shard_index in range(num_shards):
+                shard_path = os.path.join(shards[shard_index], output_file)
+                if (not os.path.exists(shard_path)):
+                    continue
+
+                with open(shard_path) as infile:
+                    for line in infile:
+                        outfile.write(line)
+                        num_lines += 1
+
+        print(f'{output_file}: {num_lines} results')
+
+    print(f'Merged {num_shards} shards into {options.output_dir}')
+    return 0
+
+def main(args: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Splits a brute force search into shards that can run on separate machines.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Test one shard of the keyspace")
+    run_parser.add_argument("--shard", type=int, required=True, help="Which shard to run, from 0 to num-shards - 1")
+    run_parser.add_argument("--num-shards", type=int, required=True, help="How many shards the keyspace is split into")
+    run_parser.add_argument("--digits", type=int, required=True, help="The number of key letters to test, see BruteForce")
+    run_parser.add_argument("--text", action="append", required=True, help="The encoded text. Give it more than once to solve several texts at once")
+    run_parser.add_argument("--cipher", default="vigenere", choices=list(CIPHER_FUNCS), help="Which cipher the text is encoded with")
+    run_parser.add_argument("--starting-key-part", action="append", default=None, help="A string to start every key with. Can be given more than once")
+    run_parser.add_argument("--dictionary", action="append", default=None, help="A dictionary file of valid words. Can be given more than once")
+    run_parser.add_argument("--separators", type=int, nargs=3, default=[4, 6, 12], help="The word lengths that split up the output files")
+    run_parser.add_argument("--cores", type=int, default=os.cpu_count(), help="How many workers to run at once")
+    run_parser.add_argument("--backend", default=None, help="How to run the workers, see WorkerPool.BACKENDS")
+    run_parser.add_argument("--output-dir", default="shards", help="The folder to put the shard's folder in")
+
+    merge_parser = commands.add_parser("merge", help="Combine the output files of every finished shard")
+    merge_parser.add_argument("paths", nargs="+", help="Shard folders, or folders of shard folders")
+    merge_parser.add_argument("--output-dir", default="merged", help="The folder to write the merged output files to")
+
+    options = parser.parse_args(args)
+    if (options.command == "merge"):
+        return merge_shards(options)
+
+    if (options.starting_key_part == None):
+        options.starting_key_part = [""]
+    if (options.dictionary == None):
+        options.dictionary = ["word_lists/words.csv"]
+    return run_shard(options)
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
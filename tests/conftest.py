@@ -0,0 +1,28 @@
+import os
+import sys
+import pytest
+
+# The modules live at the top of the repository rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from WordDictionary import WordDictionary
+
+# A small dictionary with words of many sizes, some sharing prefixes, and a few small enough to be small words
+WORDS = ["a", "an", "and", "ant", "at", "bat", "be", "bed", "dragon", "dragons", "ear", "eat", "king", "kings",
+         "mountain", "sea", "sleep", "sleeps", "tea", "the", "then", "wizard", "wizards", "zoo"]
+
+@pytest.fixture
+def word_file(tmp_path) -> str:
+    '''
+    Writes WORDS (out of order and with a duplicate) to a .csv file, and returns its path.
+    '''
+    file_path = tmp_path / "words.csv"
+    file_path.write_text("\n".join(list(reversed(WORDS)) + ["dragon"]) + "\n")
+    return str(file_path)
+
+@pytest.fixture
+def word_dict(word_file) -> WordDictionary:
+    '''
+    A WordDictionary of WORDS that doesn't cache anything.
+    '''
+    return WordDictionary([word_file], small_words_max_length=3, cache_dir=None)
@@ -0,0 +1,117 @@
+import json
+import os
+import pytest
+from BruteForce import BruteForce
+from Checkpoint import Checkpoint
+from DictCompare import DictCompare
+from vigenere import encode_vig, decode_vig, reverse_vig
+
+PLAIN_TEXT = "the wizard sleeps beneath the mountain"
+
+def read_outputs(file_paths: list[str]) -> list[list[str]]:
+    '''
+    Returns the sorted lines of every output file. Workers finish in any order, so only the lines are compared.
+    '''
+    outputs = []
+    for file_path in file_paths:
+        with open(file_path) as output_file:
+            outputs.append(sorted(output_file.read().splitlines()))
+    return outputs
+
+def crash_after(func, num_calls: int):
+    '''
+    Wraps func so the given call raises once func has run, like a worker killed after writing some of a
+    chunk's results but before the chunk is recorded as finished.
+    '''
+    calls = []
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        calls.append(None)
+        if (len(calls) == num_calls):
+            raise KeyboardInterrupt("Killed")
+        return result
+    return wrapper
+
+def make_brute_force(word_dict) -> BruteForce:
+    return BruteForce(encode_vig(PLAIN_TEXT, "ab"), "vigenere", 3, word_dict=word_dict, num_cores=2, backend="thread", progress_interval=0)
+
+@pytest.mark.parametrize("num_chunks", [1, 7, 40])
+def test_brute_force_resume_matches_clean_run(word_dict, tmp_path, monkeypatch, num_chunks):
+    os.makedirs(tmp_path / "clean")
+    os.makedirs(tmp_path / "resumed")
+
+    monkeypatch.chdir(tmp_path / "clean")
+    clean = make_brute_force(word_dict)
+    clean.solve(print_progress=False)
+    expected = read_outputs(clean.get_final_output_file_paths())
+    assert len(expected[0]) > 0
+
+    monkeypatch.chdir(tmp_path / "resumed")
+    killed = make_brute_force(word_dict)
+    killed.test_chunk = crash_after(killed.test_chunk, num_chunks)
+    with pytest.raises(Exception):
+        killed.solve(print_progress=False, checkpoint_path="run.checkpoint")
+    assert os.path.exists("run.checkpoint")
+
+    # The resumed run only tests the chunks that weren't recorded as finished
+    checkpoint = Checkpoint.load("run.checkpoint", killed.get_checkpoint_fingerprint())
+    assert 0 < len(checkpoint.get_remaining_chunks()) < len(checkpoint.chunks)
+
+    resumed = make_brute_force(word_dict)
+    resumed.resume("run.checkpoint", print_progress=False)
+    assert read_outputs(resumed.get_final_output_file_paths()) == expected
+    assert not os.path.exists("run.checkpoint")
+
+def test_dict_compare_resume_matches_clean_run(word_dict, tmp_path, monkeypatch):
+    def make_dict_compare() -> DictCompare:
+        return DictCompare(encode_vig(PLAIN_TEXT, "theant"), decode_vig, reverse_vig, word_dict=word_dict, num_cores=2, backend="thread",
+                           keys_to_test=word_dict.small_words, progress_interval=0)
+
+    os.makedirs(tmp_path / "clean")
+    os.makedirs(tmp_path / "resumed")
+
+    monkeypatch.chdir(tmp_path / "clean")
+    clean = make_dict_compare()
+    clean.solve_two_word_keys(checkpoint_path="run.checkpoint")
+    file_paths = clean.get_final_output_file_paths("two_word_output", clean.separators)
+    expected = read_outputs(file_paths)
+    assert len(expected[0]) > 0
+
+    monkeypatch.chdir(tmp_path / "resumed")
+    killed = make_dict_compare()
+    killed.test_two_word_keys = crash_after(killed.test_two_word_keys, 2)
+    with pytest.raises(Exception):
+        killed.solve_two_word_keys(checkpoint_path="run.checkpoint")
+
+    make_dict_compare().resume_two_word_keys("run.checkpoint")
+    assert read_outputs(file_paths) == expected
+    assert not os.path.exists("run.checkpoint")
+
+def test_load_ignores_cut_off_line(tmp_path):
+    path = str(tmp_path / "run.checkpoint")
+    chunks = [("a", 1), ("b", 1), ("c", 1)]
+    checkpoint = Checkpoint.create(path, "settings", chunks)
+
+    output_path = tmp_path / "output.txt"
+    with open(output_path, 'w') as output_file:
+        output_file.write("a result\n")
+        checkpoint.mark_complete(("a", 1), 0, [output_file])
+        output_file.write("a result from an unfinished chunk\n")
+
+    # A crash in the middle of recording a chunk leaves half a line
+    with open(path, 'a') as checkpoint_file:
+        checkpoint_file.write(json.dumps({"chunk": ["b", 1], "worker": 0, "run": 0, "sizes": [0]})[:20])
+
+    loaded = Checkpoint.load(path, "settings")
+    assert loaded.get_remaining_chunks() == [("b", 1), ("c", 1)]
+    assert loaded.run == 1
+
+    # Anything written after the last finished chunk is cut off
+    loaded.restore_outputs(lambda worker_index: [str(output_path)], 1)
+    assert output_path.read_text() == "a result\n"
+
+def test_load_rejects_other_settings(tmp_path):
+    path = str(tmp_path / "run.checkpoint")
+    Checkpoint.create(path, Checkpoint.get_fingerprint(["text", 3]), [("a", 1)])
+    with pytest.raises(ValueError):
+        Checkpoint.load(path, Checkpoint.get_fingerprint(["text", 4]))
@@ -0,0 +1,29 @@
+import pytest
+from CribDrag import CribDrag
+from vigenere import get_cipher_funcs
+
+PLAIN_TEXT = "The wizard sleeps, the dragons sleep under the mountain!"
+
+def get_letters(text: str, crib_drag: CribDrag) -> str:
+    '''
+    Returns only the alphabet characters of the text, the same way the crib is matched against it.
+    '''
+    return "".join(character for character in text.lower() if character in crib_drag.lookup)
+
+@pytest.mark.parametrize("cipher, key", [("vigenere", "dragon"), ("beaufort", "kings"), ("variant_beaufort", "sea")])
+@pytest.mark.parametrize("crib", ["mountain", "the wizard", "sea"])
+def test_matching_keys_round_trip(word_dict, cipher, key, crib):
+    encode, decode = get_cipher_funcs(cipher)[:2]
+    encoded_text = encode(PLAIN_TEXT, key)
+    crib_drag = CribDrag(encoded_text, cipher)
+    keys = list(word_dict.all_words) + ["", "a-b"]
+
+    matching = crib_drag.get_matching_keys(crib, keys, max_keys_per_block=4)
+
+    # The key the text was encoded with decodes every crib that really is in the text ("sea" isn't)
+    if (get_letters(crib, crib_drag) in get_letters(PLAIN_TEXT, crib_drag)):
+        assert key in matching
+
+    # Exactly the keys that decode the crib somewhere in the text match, in the order they were given
+    expected = [test_key for test_key in keys if test_key != "" and get_letters(crib, crib_drag) in get_letters(decode(encoded_text, test_key), crib_drag)]
+    assert matching == expected
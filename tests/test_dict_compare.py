@@ -0,0 +1,52 @@
+import pytest
+from DictCompare import DictCompare
+from vigenere import get_cipher_funcs
+
+PLAIN_TEXT = "the wizard sleeps beneath the mountain, tonight!"
+
+def make_dict_compare(word_dict, encoded_text: str, cipher: str, **kwargs) -> DictCompare:
+    return DictCompare(encoded_text, cipher, word_dict=word_dict, num_cores=2, backend="thread", progress_interval=0, **kwargs)
+
+# Small separators count short words as valid too, so plenty of wrong keys are reported as well
+@pytest.mark.parametrize("cipher, key, starting_key_part", [
+    ("vigenere", "betheant", ["", "be"]),
+    ("beaufort", "kseaeat", ["k"]),
+])
+def test_constrained_two_word_keys_match_full_scan(word_dict, tmp_path, monkeypatch, cipher, key, starting_key_part):
+    monkeypatch.chdir(tmp_path)
+    encoded_text = get_cipher_funcs(cipher)[0](PLAIN_TEXT, key)
+    def make() -> DictCompare:
+        return make_dict_compare(word_dict, encoded_text, cipher, keys_to_test=word_dict.small_words, separators=(2, 4, 6),
+                                 starting_key_part=starting_key_part)
+
+    full = make().solve_two_word_keys(collect_hits=True)
+    constrained_dict_compare = make()
+
+    # With every encoded word as an anchor, a key is only left out if it decodes none of them into a valid word
+    num_anchor_words = len(constrained_dict_compare.get_encoded_words())
+    constrained = constrained_dict_compare.solve_two_word_keys_constrained(num_anchor_words, collect_hits=True)
+
+    assert len(full) > 1
+    assert (key, PLAIN_TEXT) in full
+    assert sorted(constrained) == sorted(full)
+
+@pytest.mark.parametrize("cipher, key", [("vigenere", "dragon"), ("beaufort", "kings"), ("variant_beaufort", "wizard")])
+def test_aligned_keys_round_trip(word_dict, cipher, key):
+    # "under" isn't in the dictionary, so one word has to be skipped
+    text = "the wizard sleeps, the dragons sleep under the mountain"
+    encoded_text = get_cipher_funcs(cipher)[0](text, key)
+    dict_compare = make_dict_compare(word_dict, encoded_text, cipher)
+
+    found = list(dict_compare.iter_aligned_keys(min_word_size=4, max_key_length=8, max_skipped_words=1))
+    assert key in [found_key for found_key, matches in found]
+
+    # Every word a key is said to decode really does decode to that valid word
+    decode = get_cipher_funcs(cipher)[1]
+    for found_key, matches in found:
+        assert len(matches) >= 2
+        decoded_words = decode(encoded_text, found_key).replace(',', '').split(' ')
+        for encoded_word, valid_word in matches:
+            assert word_dict.is_word(valid_word)
+            assert valid_word in decoded_words
+
+    assert (key, text) in dict_compare.solve_aligned_keys(min_word_size=4, max_key_length=8, max_skipped_words=1, num_results=len(found))
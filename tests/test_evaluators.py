@@ -0,0 +1,96 @@
+import random
+import pytest
+from BruteForce import BruteForce
+from DictCompare import DictCompare
+from IncrementalDecoder import IncrementalDecoder
+from LazyEvaluator import LazyEvaluator
+from Progress import Progress
+from vigenere import get_cipher_funcs
+
+CIPHERS = ["vigenere", "beaufort", "variant_beaufort"]
+
+# Capitals, punctuation, digits, characters outside the alphabet, doubled spaces and periods inside and between words
+TEXTS = [
+    "the wizard sleeps. beneath the mountain, tonight!",
+    "The Wizard SLEEPS beneath",
+    "dragon's  lair -- at 9pm; zoo...eat",
+    "café bat éar. kings.",
+    "a.b.c sea-tea  ",
+    ". the. .sea ",
+    "x1y2 mountain3 wizards",
+    "",
+]
+
+# Short words count too, so plenty of keys find something
+SEPARATORS = (2, 3, 5)
+
+def get_key_starts(alphabet: list[str], seed: int = 0) -> list[str]:
+    '''
+    Returns plenty of random starting key parts from 0 to 5 letters long.
+    '''
+    rng = random.Random(seed)
+    return ["".join(rng.choice(alphabet) for i in range(rng.randint(0, 5))) for j in range(20)]
+
+@pytest.mark.parametrize("cipher", CIPHERS)
+@pytest.mark.parametrize("text", TEXTS)
+def test_evaluators_match_full_decode(word_dict, cipher, text):
+    encode, decode = get_cipher_funcs(cipher)[:2]
+    encoded_text = encode(text, "dragon")
+    brute_force = BruteForce(encoded_text, cipher, 1, word_dict=word_dict, separators=SEPARATORS, backend="thread")
+    decoder = IncrementalDecoder(encoded_text, decode, word_dict.ALPHABET, word_dict.word_set, SEPARATORS)
+    evaluator = LazyEvaluator(encoded_text, decode, word_dict, SEPARATORS)
+
+    for key_start in ["drago"] + get_key_starts(word_dict.ALPHABET):
+        state = decoder.prepare(key_start)
+        for letter in word_dict.ALPHABET:
+            key = key_start + letter
+            expected = brute_force.contains_valid_word_by_size(decode(encoded_text, key))
+            assert decoder.check(state, letter) == expected
+            assert evaluator.check(key) == expected
+
+@pytest.mark.parametrize("cipher", CIPHERS)
+@pytest.mark.parametrize("text", TEXTS)
+def test_stripping_evaluator_matches_contains_valid_word(word_dict, cipher, text):
+    encode, decode = get_cipher_funcs(cipher)[:2]
+    encoded_text = encode(text, "dragon")
+    dict_compare = DictCompare(encoded_text, cipher, word_dict=word_dict, min_valid_word_length=3, backend="thread")
+    evaluator = LazyEvaluator(encoded_text, decode, word_dict, (3, 6, 12), True)
+
+    for key in ["dragon", ""] + get_key_starts(word_dict.ALPHABET, 1):
+        assert evaluator.check(key)[0] == dict_compare.contains_valid_word(decode(encoded_text, key))
+
+def run_and_count(brute_force: BruteForce, monkeypatch) -> tuple[list[tuple[str, str, tuple[bool, bool, bool]]], dict]:
+    '''
+    Runs the brute force, returning every result it reported (sorted, since workers finish in any order) and its final progress snapshot.
+    '''
+    snapshots = []
+    stop = Progress.stop
+    monkeypatch.setattr(Progress, "stop", lambda progress: snapshots.append(stop(progress)) or snapshots[-1])
+    hits = sorted(brute_force.iter_solutions(print_progress=False))
+    snapshot = snapshots[0]
+    return (hits, {name: snapshot[name] for name in ("keys_tested", "total_keys", "hits", "keys_skipped")})
+
+@pytest.mark.parametrize("cipher", CIPHERS)
+@pytest.mark.parametrize("text", TEXTS[:4])
+def test_brute_force_finds_the_same_keys_with_every_evaluator(word_dict, monkeypatch, cipher, text):
+    encoded_text = get_cipher_funcs(cipher)[0](text, "ab")
+    def make(**kwargs) -> BruteForce:
+        return BruteForce(encoded_text, cipher, 2, word_dict=word_dict, separators=SEPARATORS, num_cores=2, starting_key_part=["", "ab"],
+                          backend="thread", progress_interval=0, **kwargs)
+
+    expected = run_and_count(make(), monkeypatch)
+    assert len(expected[0]) > 0
+    assert run_and_count(make(incremental=True), monkeypatch) == expected
+    assert run_and_count(make(lazy=True), monkeypatch) == expected
+
+@pytest.mark.parametrize("cipher", CIPHERS)
+def test_dict_compare_finds_the_same_keys_lazily(word_dict, cipher):
+    encoded_text = get_cipher_funcs(cipher)[0]("The wizard, sleeps... beneath 3 mountains!", "theant")
+    def make(**kwargs) -> DictCompare:
+        return DictCompare(encoded_text, cipher, word_dict=word_dict, keys_to_test=word_dict.small_words, min_valid_word_length=3,
+                           separators=SEPARATORS, num_cores=2, backend="thread", progress_interval=0, **kwargs)
+
+    for method in ("iter_solutions", "iter_two_word_keys"):
+        expected = sorted(getattr(make(), method)())
+        assert len(expected) > 0
+        assert sorted(getattr(make(lazy=True), method)()) == expected
@@ -0,0 +1,183 @@
+import pytest
+from BruteForce import BruteForce
+from Progress import Progress
+from vigenere import encode_vig, decode_vig
+
+def make_brute_force(word_dict, num_digits: int, starting_key_part: list[str], text: str = "Ihgvq mbuvhmafvobac rvon.", **kwargs) -> BruteForce:
+    return BruteForce(text, "vigenere", num_digits, word_dict=word_dict, num_cores=2, starting_key_part=starting_key_part, backend="thread", progress_interval=0, **kwargs)
+
+def expand_chunk(brute_force: BruteForce, chunk: tuple[str, int]) -> list[str]:
+    '''
+    Lists every key a (key, num_digits) chunk covers, see BruteForce.test_chunk.
+    '''
+    key, num_digits = chunk
+    keys = [key]
+    if (num_digits > 0):
+        for letter in brute_force.word_dict.ALPHABET:
+            keys.extend(expand_chunk(brute_force, (key + letter, num_digits - 1)))
+    return keys
+
+# Every starting key part set covers a different case: the empty key part, several key parts, and
+# key parts long enough that the text length cuts their digits short
+KEYSPACES = [
+    (3, [""]),
+    (2, ["", "ab", "zz"]),
+    (3, ["dragon", "a"]),
+    (2, ["abcdefghijklmnopqrstu"]),
+]
+
+@pytest.mark.parametrize("num_digits, starting_key_part", KEYSPACES)
+def test_index_to_key_round_trip(word_dict, num_digits, starting_key_part):
+    brute_force = make_brute_force(word_dict, num_digits, starting_key_part)
+    num_keys = brute_force.count_indexed_keys()
+
+    # A key made by more than one starting key part gets the index under the first one
+    keys = [brute_force.index_to_key(index) for index in range(num_keys)]
+    first_indices = {}
+    for index in range(num_keys):
+        first_indices.setdefault(keys[index], index)
+        assert brute_force.key_to_index(keys[index]) == first_indices[keys[index]]
+
+    with pytest.raises(IndexError):
+        brute_force.index_to_key(num_keys)
+    with pytest.raises(IndexError):
+        brute_force.index_to_key(-1)
+
+@pytest.mark.parametrize("num_digits, starting_key_part", KEYSPACES)
+def test_indices_cover_the_same_keys_as_chunks(word_dict, num_digits, starting_key_part):
+    # The indices cover the same keys as the chunks of a normal run
+    brute_force = make_brute_force(word_dict, num_digits, starting_key_part)
+    chunk_keys = [key for chunk in brute_force.get_chunks() for key in expand_chunk(brute_force, chunk)]
+    assert sorted(chunk_keys) == sorted(brute_force.index_to_key(index) for index in range(brute_force.count_indexed_keys()))
+
+def test_key_to_index_rejects_keys_outside_keyspace(word_dict):
+    brute_force = make_brute_force(word_dict, 2, ["ab"])
+    for key in ["", "a", "ba", "abcde"]:
+        with pytest.raises(ValueError):
+            brute_force.key_to_index(key)
+
+@pytest.mark.parametrize("num_shards", [1, 2, 3, 7, 50])
+@pytest.mark.parametrize("num_digits, starting_key_part", KEYSPACES)
+def test_shards_cover_keyspace_exactly(word_dict, num_digits, starting_key_part, num_shards):
+    brute_force = make_brute_force(word_dict, num_digits, starting_key_part)
+    num_keys = brute_force.count_indexed_keys()
+
+    all_keys = []
+    last_end = 0
+    for shard_index in range(num_shards):
+        start, end = brute_force.get_shard_range(shard_index, num_shards)
+        assert start == last_end
+        assert end - start in (num_keys // num_shards, num_keys // num_shards + 1)
+        last_end = end
+
+        # The chunks of a shard cover exactly its range of indices, each key once
+        shard_keys = [key for chunk in brute_force.get_index_range_chunks(start, end) for key in expand_chunk(brute_force, chunk)]
+        assert shard_keys == [brute_force.index_to_key(index) for index in range(start, end)]
+        all_keys.extend(shard_keys)
+
+    assert last_end == num_keys
+    assert all_keys == [brute_force.index_to_key(index) for index in range(num_keys)]
+
+def test_shard_range_rejects_missing_shards(word_dict):
+    brute_force = make_brute_force(word_dict, 2, [""])
+    for shard_index, num_shards in [(0, 0), (-1, 2), (2, 2)]:
+        with pytest.raises(ValueError):
+            brute_force.get_shard_range(shard_index, num_shards)
+
+def test_sharded_runs_find_the_same_results(word_dict, tmp_path, monkeypatch):
+    # The output files are written to the working folder
+    monkeypatch.chdir(tmp_path)
+    text = encode_vig("the wizard sleeps beneath the mountain", "ab")
+
+    expected = sorted(make_brute_force(word_dict, 2, ["", "ab"], text).iter_solutions(print_progress=False))
+
+    found = []
+    for shard_index in range(3):
+        brute_force = make_brute_force(word_dict, 2, ["", "ab"], text, shard=(shard_index, 3))
+        found.extend(brute_force.iter_solutions(print_progress=False))
+
+    assert len(expected) > 0
+    assert sorted(found) == expected
+
+def enumerate_keys(brute_force: BruteForce, num_digits: int, starting_key_part: list[str], max_length: int | None = None) -> list[str]:
+    '''
+    Lists every key made by adding up to num_digits letters to each starting key part, one at a time and with
+    nothing skipped, leaving out keys longer than max_length if it is given. The empty key is never a key.
+    '''
+    keys = []
+    for key_start in starting_key_part:
+        keys_at_length = [key_start]
+        for digits in range(num_digits + 1):
+            keys.extend(key for key in keys_at_length if key != "" and (max_length == None or len(key) <= max_length))
+            keys_at_length = [key + letter for key in keys_at_length for letter in brute_force.word_dict.ALPHABET]
+    return keys
+
+def is_repeat_of(key: str, keys: set[str]) -> bool:
+    '''
+    Returns whether or not the key is a shorter key from keys repeated.
+    '''
+    return any(len(key) % length == 0 and key[:length] * (len(key) // length) == key and key[:length] in keys for length in range(1, len(key)))
+
+def run_and_count(brute_force: BruteForce, monkeypatch) -> tuple[list[tuple[str, str, tuple[bool, bool, bool]]], dict]:
+    '''
+    Runs the brute force, returning every result it reported and its final progress snapshot.
+    '''
+    snapshots = []
+    stop = Progress.stop
+    monkeypatch.setattr(Progress, "stop", lambda progress: snapshots.append(stop(progress)) or snapshots[-1])
+    hits = list(brute_force.iter_solutions(print_progress=False))
+    return (hits, snapshots[0])
+
+# The text only has 6 letters, so the longer starting key parts get cut short. "abab" is "ab" repeated,
+# so it is skipped itself as well as making plenty of repeating keys. With only "aba", "abab" repeats a key outside the keyspace
+REDUNDANT_KEYSPACES = [
+    (3, [""]),
+    (3, ["", "ab", "abab", "abcde"]),
+    (3, ["aba"]),
+    (2, ["zz", "z"]),
+]
+
+@pytest.mark.parametrize("num_digits, starting_key_part", REDUNDANT_KEYSPACES)
+def test_reported_keys_match_naive_enumeration(word_dict, monkeypatch, num_digits, starting_key_part):
+    text = "xq zt. 9 an"
+    brute_force = make_brute_force(word_dict, num_digits, starting_key_part, text, separators=(2, 3, 5))
+    hits, snapshot = run_and_count(brute_force, monkeypatch)
+
+    # Keys longer than the text and keys that repeat a shorter key in the keyspace are the only ones left out
+    keys = enumerate_keys(brute_force, num_digits, starting_key_part, brute_force.text_length)
+    key_set = set(keys)
+    expected = set()
+    for key in key_set:
+        decoded_text = decode_vig(text, key)
+        is_valid = brute_force.contains_valid_word_by_size(decoded_text)
+        if (is_valid[0] and not is_repeat_of(key, key_set)):
+            expected.add((key, decoded_text, is_valid))
+    assert len(expected) > 0
+    assert set(hits) == expected
+
+    # Leaving them out doesn't lose any decoded text the full keyspace would have found
+    all_decoded_texts = set(decode_vig(text, key) for key in enumerate_keys(brute_force, num_digits, starting_key_part))
+    valid_decoded_texts = set(decoded_text for decoded_text in all_decoded_texts if brute_force.contains_valid_word_by_size(decoded_text)[0])
+    assert set(decoded_text for key, decoded_text, is_valid in hits) == valid_decoded_texts
+
+    # Every key is counted once, and exactly the repeating ones are counted as skipped
+    assert brute_force.count_keys_past_text_length() == len(enumerate_keys(brute_force, num_digits, starting_key_part)) - len(keys)
+    assert snapshot["keys_tested"] == snapshot["total_keys"] == len(keys)
+    assert snapshot["keys_skipped"] == sum(1 for key in keys if is_repeat_of(key, key_set))
+    assert snapshot["hits"] == len(hits)
+
+def test_get_num_digits_stops_at_text_length(word_dict):
+    brute_force = make_brute_force(word_dict, 3, [""], "xq zt. 9 an")
+    assert brute_force.text_length == 6
+    assert [brute_force.get_num_digits(key_start) for key_start in ["", "abc", "abcde", "abcdef", "abcdefgh"]] == [3, 3, 1, 0, 0]
+
+def test_redundant_letter_needs_root_in_keyspace(word_dict):
+    # "abab" is skipped when "ab" is in the keyspace, but not when every key has to start with "aba"
+    brute_force = make_brute_force(word_dict, 3, ["", "aba"], "xq zt. 9 an")
+    assert brute_force.get_redundant_letter("aba") == "b"
+    assert brute_force.get_redundant_letter("abcab") == "c"
+    assert brute_force.get_redundant_letter("abc") == None
+
+    brute_force = make_brute_force(word_dict, 3, ["aba"], "xq zt. 9 an")
+    assert brute_force.get_redundant_letter("aba") == None
+    assert brute_force.is_redundant_key("abab") == False
@@ -0,0 +1,165 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import pickle
+import random
+import pytest
+from BruteForce import BruteForce
+from PackedWordList import PackedWordList
+from SharedWordList import SharedWordList
+from WordDictionary import WordDictionary
+from vigenere import encode_vig
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+
+def make_words(num_words: int, seed: int = 0) -> list[str]:
+    '''
+    Makes a sorted list of unique random words of many sizes, with plenty of shared prefixes.
+    '''
+    rng = random.Random(seed)
+    words = set()
+    while (len(words) < num_words):
+        words.add("".join(rng.choice(ALPHABET[:6]) for i in range(rng.randint(1, 8))))
+    return sorted(words)
+
+@pytest.fixture(params=[0, 1, 2, 500, 3000])
+def words(request) -> list[str]:
+    return make_words(request.param)
+
+def test_matches_set(words):
+    small_words = [word for word in words if len(word) <= 3]
+    packed = PackedWordList.from_words(words, small_words)
+    small = packed.get_small_words()
+
+    assert len(packed) == len(words)
+    assert list(packed) == words
+    assert packed[:] == words
+    assert len(small) == len(small_words)
+    assert list(small) == small_words
+    if (len(words) > 0):
+        assert packed[-1] == words[-1]
+    with pytest.raises(IndexError):
+        packed[len(words)]
+
+    # Every word, and plenty that aren't words (including prefixes and extensions of words)
+    word_set = set(words)
+    small_set = set(small_words)
+    candidates = set(make_words(1000, seed=1)) | word_set | {word + "a" for word in words} | {word[:-1] for word in words} | {"", "zzz"}
+    for candidate in candidates:
+        assert (candidate in packed) == (candidate in word_set)
+        assert (candidate in small) == (candidate in small_set)
+        assert (packed.find(candidate) >= 0) == (candidate in word_set)
+        if (candidate in word_set):
+            assert packed[packed.find(candidate)] == candidate
+
+    assert packed.isdisjoint(["zzz", "yyy"])
+    assert packed.isdisjoint(words[:1] + ["zzz"]) == (len(words) == 0)
+
+def test_sizes_and_prefixes_match_list(words):
+    packed = PackedWordList.from_words(words, [])
+
+    for size in range(-1, 11):
+        assert packed.get_words_of_size(size) == [word for word in words if len(word) == size]
+
+    for prefix in ["", "a", "ab", "fff", "abcabc", "z"]:
+        assert packed.words_with_prefix(prefix) == [word for word in words if word.startswith(prefix)]
+        assert packed.has_prefix(prefix) == any(word.startswith(prefix) for word in words)
+        for size in range(0, 10):
+            assert packed.has_prefix(prefix, size) == any(word.startswith(prefix) and len(word) == size for word in words)
+
+def test_pickle_round_trip(words):
+    packed = PackedWordList.from_words(words, words[:10])
+    copy = pickle.loads(pickle.dumps(packed))
+    assert list(copy) == words
+    assert list(copy.get_small_words()) == words[:10]
+
+    small_copy = pickle.loads(pickle.dumps(packed.get_small_words()))
+    assert list(small_copy) == words[:10]
+
+def test_rejects_bad_buffers():
+    data = PackedWordList.pack(make_words(100), [])
+    with pytest.raises(ValueError):
+        PackedWordList(b"NOTWORDS" + data[8:])
+    with pytest.raises(ValueError):
+        PackedWordList(data[:-1])
+
+def test_compact_dictionary_matches_plain(word_file, tmp_path):
+    plain = WordDictionary([word_file], small_words_max_length=3, cache_dir=None)
+
+    # The first compact load packs and caches the words, the second maps the cached copy
+    cache_dir = str(tmp_path / "cache")
+    for i in range(2):
+        compact = WordDictionary([word_file], small_words_max_length=3, cache_dir=cache_dir, compact=True)
+        assert compact.is_packed()
+        assert list(compact.all_words) == plain.all_words
+        assert list(compact.small_words) == plain.small_words
+        for word in plain.all_words + ["dragonz", "zz", ""]:
+            assert compact.is_word(word) == plain.is_word(word)
+        for size in range(10):
+            assert compact.get_words_of_size(size) == plain.get_words_of_size(size)
+
+        worker_copy = pickle.loads(pickle.dumps(compact))
+        assert list(worker_copy.all_words) == plain.all_words
+        assert list(worker_copy.small_words) == plain.small_words
+
+def test_shared_dictionary_matches_plain(word_dict):
+    words = list(word_dict.all_words)
+    small_words = list(word_dict.small_words)
+
+    word_dict.share()
+    try:
+        worker_copy = pickle.loads(pickle.dumps(word_dict))
+        for copy in (word_dict, worker_copy):
+            assert list(copy.all_words) == words
+            assert list(copy.small_words) == small_words
+            assert all(copy.is_word(word) for word in words)
+            assert not copy.is_word("dragonz")
+        worker_copy.all_words.release()
+        worker_copy.small_words.release()
+    finally:
+        word_dict.unshare()
+
+    assert word_dict.all_words == words
+    assert word_dict.small_words == small_words
+
+def describe_worker_words(word_dict: WordDictionary) -> tuple:
+    '''
+    Run in a spawned worker process: reports what the dictionary it was sent looks words up in.
+    '''
+    return (type(word_dict.all_words).__name__, type(word_dict.word_set).__name__, word_dict.is_word("dragon"), word_dict.is_word("dragonz"),
+            word_dict.get_words_of_size(3), list(word_dict.small_words))
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_spawned_worker_attaches_to_shared_words(word_file, tmp_path, compact):
+    word_dict = WordDictionary([word_file], small_words_max_length=3, cache_dir=str(tmp_path / "cache"), compact=compact)
+    words_of_size = word_dict.get_words_of_size(3)
+    small_words = list(word_dict.small_words)
+
+    word_dict.share()
+    try:
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            described = executor.submit(describe_worker_words, word_dict).result()
+    finally:
+        word_dict.unshare()
+
+    # The worker checks words in the shared block, it never builds its own set or list of them
+    assert described == ("SharedWordList", "SharedWordList", True, False, words_of_size, small_words)
+    assert word_dict.shared_words == None
+
+def test_process_runs_share_compact_dictionaries(word_file, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    compact = WordDictionary([word_file], small_words_max_length=3, cache_dir=None, compact=True)
+    text = encode_vig("the wizard sleeps beneath the mountain", "ab")
+
+    published = []
+    publish = SharedWordList.publish
+    monkeypatch.setattr(SharedWordList, "publish", classmethod(lambda cls, data: published.append(None) or publish(data)))
+
+    results = {}
+    for backend in ("thread", "process"):
+        brute_force = BruteForce(text, "vigenere", 2, word_dict=compact, num_cores=2, backend=backend, progress_interval=0)
+        results[backend] = sorted(brute_force.iter_solutions(print_progress=False))
+
+    assert len(results["thread"]) > 0
+    assert results["process"] == results["thread"]
+    assert len(published) == 1
+    assert compact.shared_words == None
@@ -1,5 +1,115 @@
+from collections.abc import Callable
+import re
+
 ALPHABET = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm', 'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v', 'w', 'x', 'y', 'z']
 
+class Cipher:
+    def __init__(self, name: str, encode_shift: Callable[[int, int], int], decode_shift: Callable[[int, int], int], reverse_shift: Callable[[int, int], int], alphabet: list[str] = ALPHABET):
+        '''
+        A cipher where each letter of the key shifts the letters of the text it lines up with (the vigenere family).
+        Only alphabet characters move the key along, anything else is copied over as is.\n
+        A cipher only declares how a single letter is shifted. Every shift is worked out once up front as a
+        translation table, so encoding or decoding a text only takes one str.translate per letter of the key.\n
+
+        name: The name the cipher is registered under, see get_cipher_funcs\n
+        encode_shift: Gives the ciphertext letter index from a plaintext letter index and a key letter index\n
+        decode_shift: Gives the plaintext letter index from a ciphertext letter index and a key letter index\n
+        reverse_shift: Gives the key letter index from a plaintext letter index and a ciphertext letter index\n
+        alphabet: A list of characters representing the possible characters in the alphabet.
+        '''
+        self.name = name
+        self.alphabet = alphabet
+        self.alphabet_set = frozenset(alphabet)
+
+        size = len(alphabet)
+        alphabet_text = "".join(alphabet)
+
+        # The translation table of every key letter
+        self.encode_tables = {}
+        self.decode_tables = {}
+        for key_index in range(size):
+            key_letter = alphabet[key_index]
+            self.encode_tables[key_letter] = str.maketrans(alphabet_text, "".join(alphabet[encode_shift(i, key_index) % size] for i in range(size)))
+            self.decode_tables[key_letter] = str.maketrans(alphabet_text, "".join(alphabet[decode_shift(i, key_index) % size] for i in range(size)))
+
+        # The key letter of every (plaintext letter, ciphertext letter) pair
+        self.reverse_table = {}
+        for plain_index in range(size):
+            for cipher_index in range(size):
+                self.reverse_table[(alphabet[plain_index], alphabet[cipher_index])] = alphabet[reverse_shift(plain_index, cipher_index) % size]
+
+        # Splits a text into runs of alphabet characters, with the runs of other characters between them kept
+        self.separator_pattern = re.compile("([^" + "".join(re.escape(character) for character in alphabet) + "]+)")
+
+    def apply(self, text: str, key: str, tables: dict[str, dict[int, int]]) -> str:
+        '''
+        Shifts every alphabet character of the text by the table of the key letter it lines up with.
+        The text is returned unchanged if the key is empty or has a character not in the alphabet.
+        '''
+        if (len(key) == 0 or not self.alphabet_set.issuperset(key)):
+            return text
+
+        text = text.lower()
+        parts = self.separator_pattern.split(text)
+        letters = "".join(parts[0::2]) if len(parts) > 1 else text
+
+        # Each letter of the key shifts every len(key)-th letter, so shift each of those columns at once
+        if (len(key) == 1):
+            shifted = letters.translate(tables[key])
+        else:
+            buffer = list(letters)
+            for column in range(min(len(key), len(letters))):
+                buffer[column::len(key)] = letters[column::len(key)].translate(tables[key[column]])
+            shifted = "".join(buffer)
+
+        if (len(parts) == 1):
+            return shifted
+
+        # Put the other characters back between the runs of letters
+        output = []
+        position = 0
+        for i in range(0, len(parts), 2):
+            output.append(shifted[position:position + len(parts[i])])
+            position += len(parts[i])
+            if (i + 1 < len(parts)):
+                output.append(parts[i + 1])
+
+        return "".join(output)
+
+    def encode(self, text: str, key: str) -> str:
+        '''
+        Encode the given text with the given key.
+        '''
+        return self.apply(text, key, self.encode_tables)
+
+    def decode(self, text: str, key: str) -> str:
+        '''
+        Decode the given text with the given key.
+        '''
+        return self.apply(text, key, self.decode_tables)
+
+    def reverse(self, plaintext: str, ciphertext: str) -> str:
+        '''
+        Find the key that brings the given plaintext to the given ciphertext.
+        Both must be the same length and only have alphabet characters.
+        '''
+        if (len(plaintext) != len(ciphertext)):
+            return ""
+
+        try:
+            return "".join(map(self.reverse_table.__getitem__, zip(plaintext, ciphertext)))
+        except KeyError as error:
+            raise ValueError(f'{error.args[0]} has a character not in the alphabet') from None
+
+# The classic vigenere cipher: ciphertext = plaintext + key
+VIGENERE = Cipher("vigenere", lambda plain, key: plain + key, lambda cipher, key: cipher - key, lambda plain, cipher: cipher - plain)
+
+# The beaufort cipher: ciphertext = key - plaintext, so encoding and decoding are the same
+BEAUFORT = Cipher("beaufort", lambda plain, key: key - plain, lambda cipher, key: key - cipher, lambda plain, cipher: cipher + plain)
+
+# The variant beaufort cipher: ciphertext = plaintext - key
+VARIANT_BEAUFORT = Cipher("variant_beaufort", lambda plain, key: plain - key, lambda cipher, key: cipher + key, lambda plain, cipher: plain - cipher)
+
 def encode_vig(text: str, key: str) -> str:
     '''
     Encode given text using the classic vigenere cipher.\n
@@ -7,31 +117,7 @@ def encode_vig(text: str, key: str) -> str:
     text: The plaintext to encode.\n
     key: The key to use in the cipher.
     '''
-    for character in key:
-        if (not character in ALPHABET):
-            return text
-    if len(key) == 0:
-        return text
-
-    text = text.lower()
-
-    key_index = 0
-    output = ""
-
-    for i in range(len(text)):
-        if (not text[i] in ALPHABET):
-            output += text[i]
-            continue
-
-        start = ALPHABET.index(text[i])
-        offset = ALPHABET.index(key[key_index])
-
-        output += ALPHABET[(start + offset) % len(ALPHABET)]
-
-        key_index += 1
-        key_index %= len(key)
-    
-    return output
+    return VIGENERE.encode(text, key)
 
 def decode_vig(text: str, key: str) -> str:
     '''
@@ -40,51 +126,22 @@ def decode_vig(text: str, key: str) -> str:
     text: The ciphertext to decode.\n
     key: The key to use in the cipher.
     '''
-    for character in key:
-        if (not character in ALPHABET):
-            return text
-    if len(key) == 0:
-        return text
-
-    text = text.lower()
-
-    key_index = 0
-    output = ""
-
-    for i in range(len(text)):
-        if (not text[i] in ALPHABET):
-            output += text[i]
-            continue
-
-        start = ALPHABET.index(text[i])
-        offset = ALPHABET.index(key[key_index])
-
-        output += ALPHABET[(len(ALPHABET) + start - offset) % len(ALPHABET)]
-
-        key_index += 1
-        key_index %= len(key)
-    
-    return output
+    return VIGENERE.decode(text, key)
 
 def reverse_vig(plaintext: str, ciphertext: str) -> str:
     '''
     Find the key that brings the given plaintext to the given ciphertext.
     '''
-    if (len(plaintext) != len(ciphertext)):
-        return ""
-    
-    key = ""
-    for i in range(len(plaintext)):
-        plain_letter = plaintext[i]
-        cipher_letter = ciphertext[i]
+    return VIGENERE.reverse(plaintext, ciphertext)
 
-        index = len(ALPHABET) - (ALPHABET.index(plain_letter) - ALPHABET.index(cipher_letter))
-        index %= len(ALPHABET)
-
-        key += ALPHABET[index]
-    
-    return key
+def encode_beaufort(text: str, key: str) -> str:
+    '''
+    Encode the given text using the beaufort style of vigenere cipher (the same as decoding it).\n
 
+    text: The plaintext to encode.\n
+    key: The key to use in the cipher.
+    '''
+    return BEAUFORT.encode(text, key)
 
 def decode_beaufort(text: str, key: str) -> str:
     '''
@@ -93,32 +150,13 @@ def decode_beaufort(text: str, key: str) -> str:
     text: The ciphertext to decode.\n
     key: The key to use in the cipher.
     '''
-    for character in key:
-        if (not character in ALPHABET):
-            return text
-        
-    if len(key) == 0:
-        return text
-
-    text = text.lower()
-
-    key_index = 0
-    output = ""
-
-    for i in range(len(text)):
-        if (not text[i] in ALPHABET):
-            output += text[i]
-            continue
-
-        start = ALPHABET.index(text[i])
-        offset = ALPHABET.index(key[key_index])
-
-        output += ALPHABET[(len(ALPHABET) - start + offset) % len(ALPHABET)]
+    return BEAUFORT.decode(text, key)
 
-        key_index += 1
-        key_index %= len(key)
-    
-    return output
+def reverse_beaufort(plaintext: str, ciphertext: str) -> str:
+    '''
+    Find the beaufort key that brings the given plaintext to the given ciphertext.
+    '''
+    return BEAUFORT.reverse(plaintext, ciphertext)
 
 def encode_variant_beaufort(text: str, key: str) -> str:
     '''
@@ -127,32 +165,7 @@ def encode_variant_beaufort(text: str, key: str) -> str:
     text: The plaintext to encode.\n
     key: The key to use in the cipher.
     '''
-    for character in key:
-        if (not character in ALPHABET):
-            return text
-        
-    if len(key) == 0:
-        return text
-
-    text = text.lower()
-
-    key_index = 0
-    output = ""
-
-    for i in range(len(text)):
-        if (not text[i] in ALPHABET):
-            output += text[i]
-            continue
-
-        start = ALPHABET.index(text[i])
-        offset = ALPHABET.index(key[key_index])
-
-        output += ALPHABET[(len(ALPHABET) + start - offset) % len(ALPHABET)]
-
-        key_index += 1
-        key_index %= len(key)
-    
-    return output
+    return VARIANT_BEAUFORT.encode(text, key)
 
 def decode_variant_beaufort(text: str, key: str) -> str:
     '''
@@ -161,29 +174,26 @@ def decode_variant_beaufort(text: str, key: str) -> str:
     text: The ciphertext to decode.\n
     key: The key to use in the cipher.
     '''
-    for character in key:
-        if (not character in ALPHABET):
-            return text
-        
-    if len(key) == 0:
-        return text
-
-    text = text.lower()
-
-    key_index = 0
-    output = ""
+    return VARIANT_BEAUFORT.decode(text, key)
 
-    for i in range(len(text)):
-        if (not text[i] in ALPHABET):
-            output += text[i]
-            continue
-
-        start = ALPHABET.index(text[i])
-        offset = ALPHABET.index(key[key_index])
+def reverse_variant_beaufort(plaintext: str, ciphertext: str) -> str:
+    '''
+    Find the variant beaufort key that brings the given plaintext to the given ciphertext.
+    '''
+    return VARIANT_BEAUFORT.reverse(plaintext, ciphertext)
 
-        output += ALPHABET[(start + offset) % len(ALPHABET)]
+# Every cipher by name, as its (encode, decode, reverse) functions
+CIPHER_FUNCS: dict[str, tuple[Callable[[str, str], str], Callable[[str, str], str], Callable[[str, str], str]]] = {
+    VIGENERE.name: (encode_vig, decode_vig, reverse_vig),
+    BEAUFORT.name: (encode_beaufort, decode_beaufort, reverse_beaufort),
+    VARIANT_BEAUFORT.name: (encode_variant_beaufort, decode_variant_beaufort, reverse_variant_beaufort),
+}
 
-        key_index += 1
-        key_index %= len(key)
-    
-    return output
\ No newline at end of file
+def get_cipher_funcs(name: str) -> tuple[Callable[[str, str], str], Callable[[str, str], str], Callable[[str, str], str]]:
+    '''
+    Returns the (encode, decode, reverse) functions of the cipher with the given name (see CIPHER_FUNCS).
+    Raises a ValueError if there is no cipher with that name.
+    '''
+    if (not name in CIPHER_FUNCS):
+        raise ValueError(f'Unknown cipher "{name}", expected one of {tuple(CIPHER_FUNCS)}')
+    return CIPHER_FUNCS[name]
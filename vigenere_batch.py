@@ -0,0 +1,150 @@
+import numpy as np
+from vigenere import ALPHABET, decode_vig, decode_beaufort, decode_variant_beaufort
+
+def is_batchable(text: str) -> bool:
+    '''
+    Returns whether or not the text can be decoded in batches and give exactly what the single key functions give.
+    '''
+    return text.isascii()
+
+class PreparedText:
+    def __init__(self, text: str, alphabet: list[str] = ALPHABET):
+        '''
+        Holds a ciphertext converted to integer arrays, so it can be decoded against many keys at once.\n
+
+        text: The ciphertext to prepare.\n
+        alphabet: A list of characters representing the possible characters in the alphabet.
+        '''
+        self.text = text.lower()
+        self.alphabet = alphabet
+
+        # Every character has to be a single byte, and lowering some non ascii characters changes the length of the text,
+        # so those texts have to be decoded one key at a time (see is_batchable)
+        if (not is_batchable(text)):
+            raise ValueError("Only ascii text can be decoded in batches")
+
+        # The lowered text as ascii codes, non alphabet characters are copied straight from this
+        self.template = np.frombuffer(self.text.encode('ascii'), dtype=np.uint8)
+
+        # The text as given, which is what an invalid key decodes to
+        self.original = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+
+        # Where the alphabet characters are in the text, and their index in the alphabet
+        lookup = {character: index for index, character in enumerate(alphabet)}
+        positions = [i for i in range(len(self.text)) if self.text[i] in lookup]
+        self.letter_positions = np.array(positions, dtype=np.intp)
+        self.letters = np.array([lookup[self.text[i]] for i in positions], dtype=np.int16)
+
+        # Maps an alphabet index back to its ascii code
+        self.alphabet_codes = np.frombuffer(''.join(alphabet).encode('ascii'), dtype=np.uint8)
+
+def keys_to_array(keys: list[str], alphabet: list[str] = ALPHABET) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Converts a block of keys into a padded matrix of alphabet indices.\n
+
+    Returns: (key_matrix, key_lengths, is_valid) where is_valid is False for keys that are empty or
+    contain a character not in the alphabet (the single key functions return the text unchanged for those)
+    '''
+    lookup = {character: index for index, character in enumerate(alphabet)}
+    max_length = max((len(key) for key in keys), default=0)
+
+    key_matrix = np.zeros((len(keys), max(max_length, 1)), dtype=np.int16)
+    key_lengths = np.ones(len(keys), dtype=np.intp)
+    is_valid = np.zeros(len(keys), dtype=bool)
+
+    for i in range(len(keys)):
+        key = keys[i]
+        if (len(key) == 0 or any(character not in lookup for character in key)):
+            continue
+
+        key_matrix[i, :len(key)] = [lookup[character] for character in key]
+        key_lengths[i] = len(key)
+        is_valid[i] = True
+
+    return (key_matrix, key_lengths, is_valid)
+
+def get_shifts(prepared: PreparedText, keys: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Gets the key shift applied to every letter of the text, for every key.\n
+
+    Returns: (shifts, is_valid) where shifts has the shape (len(keys), number of letters in the text)
+    '''
+    key_matrix, key_lengths, is_valid = keys_to_array(keys, prepared.alphabet)
+
+    # Only letters advance the key, so the key column of a letter is its letter index mod the key length
+    letter_index = np.arange(len(prepared.letters), dtype=np.intp)
+    key_columns = letter_index[None, :] % key_lengths[:, None]
+    shifts = np.take_along_axis(key_matrix, key_columns, axis=1)
+
+    return (shifts, is_valid)
+
+def build_output(prepared: PreparedText, plain_indices: np.ndarray, is_valid: np.ndarray) -> np.ndarray:
+    '''
+    Puts the decoded letter indices back into the full text, keeping every non alphabet character.\n
+
+    Returns: A 2-D uint8 matrix with one row of ascii codes per key
+    '''
+    output = np.repeat(prepared.template[None, :], len(plain_indices), axis=0)
+    output[:, prepared.letter_positions] = prepared.alphabet_codes[plain_indices]
+
+    # Invalid keys leave the text unchanged, same as the single key functions
+    output[~is_valid] = prepared.original
+
+    return output
+
+def prepare(text: str | PreparedText) -> PreparedText:
+    '''
+    Returns the given text as a PreparedText, preparing it if it hasn't been already.
+    '''
+    if (isinstance(text, PreparedText)):
+        return text
+    return PreparedText(text)
+
+def batch_decode_vig(text: str | PreparedText, keys: list[str]) -> np.ndarray:
+    '''
+    Decode the given text with every given key using the classic vigenere cipher.\n
+
+    text: The ciphertext to decode. Pass a PreparedText to avoid converting the text on every call.\n
+    keys: The block of keys to use in the cipher.
+    '''
+    prepared = prepare(text)
+    shifts, is_valid = get_shifts(prepared, keys)
+    plain_indices = (prepared.letters[None, :] - shifts) % len(prepared.alphabet)
+    return build_output(prepared, plain_indices, is_valid)
+
+def batch_decode_beaufort(text: str | PreparedText, keys: list[str]) -> np.ndarray:
+    '''
+    Decode the given text with every given key using the beaufort style of vigenere cipher.\n
+
+    text: The ciphertext to decode. Pass a PreparedText to avoid converting the text on every call.\n
+    keys: The block of keys to use in the cipher.
+    '''
+    prepared = prepare(text)
+    shifts, is_valid = get_shifts(prepared, keys)
+    plain_indices = (shifts - prepared.letters[None, :]) % len(prepared.alphabet)
+    return build_output(prepared, plain_indices, is_valid)
+
+def batch_decode_variant_beaufort(text: str | PreparedText, keys: list[str]) -> np.ndarray:
+    '''
+    Decode the given text with every given key using the variant beaufort style of vigenere cipher.\n
+
+    text: The ciphertext to decode. Pass a PreparedText to avoid converting the text on every call.\n
+    keys: The block of keys to use in the cipher.
+    '''
+    prepared = prepare(text)
+    shifts, is_valid = get_shifts(prepared, keys)
+    plain_indices = (prepared.letters[None, :] + shifts) % len(prepared.alphabet)
+    return build_output(prepared, plain_indices, is_valid)
+
+def matrix_to_strings(matrix: np.ndarray) -> list[str]:
+    '''
+    Converts a matrix returned by one of the batch decode functions back into a list of strings.
+    '''
+    return [row.tobytes().decode('ascii') for row in matrix]
+
+# The batch version of each single key decode function, so solvers can look one up from their cipher_func
+BATCH_DECODERS = {
+    decode_vig: batch_decode_vig,
+    decode_beaufort: batch_decode_beaufort,
+    decode_variant_beaufort: batch_decode_variant_beaufort,
+}